@@ -1,4 +1,5 @@
 import os
+import sys
 import json
 import time
 import chromadb
@@ -6,24 +7,52 @@ import PyPDF2
 from tqdm import tqdm
 from dotenv import load_dotenv
 from openai import OpenAI
-from sentence_transformers import SentenceTransformer
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
+from embedding_backend import load_embedder
+from reranker import CrossEncoderReranker
+from context_packing import count_words, from_chroma, pack_context
+from llm_cache import ResponseCache
 
 # --- Configuration ---
 load_dotenv()  # make sure OPENAI_API_KEY is in your .env
-INPUT_JSON_PATH         = r"D:\bot_dgi\questions.json"
+INPUT_JSON_PATH         = os.getenv("QUESTIONS_PATH", "./questions.json")
 OUTPUT_JSON_PATH        = "./finetuning_dataset.json"
-CHROMA_DB_PATH          = r"D:\bot_dgi\pdf-to-text-chroma-search\db"
+CHROMA_DB_PATH          = os.getenv("CHROMA_DB_PATH", "./src/db")
 CHROMA_COLLECTION_NAME  = "my_collection"
 EMBEDDING_MODEL_NAME    = "louisbrulenaudet/lemone-gte-embed-max"
 OPENAI_API_KEY          = os.getenv("OPENAI_API_KEY")
 MAX_RETRIES             = 3
 RETRY_DELAY             = 0  # seconds
+RERANK                  = os.getenv("RERANK", "0") == "1"   # cross-encoder over a wider pool
+N_RESULTS               = 30 if RERANK else 8               # hits retrieved from Chroma
+KEEP                    = 2                                  # hits kept after re-ranking
+CONTEXT_WORDS           = int(os.getenv("CONTEXT_WORDS", "1500"))   # context budget per prompt (count_words estimate, not model tokens)
+OPENAI_MODEL            = "gpt-4o-mini-2024-07-18"
+TEMPERATURE             = 0.0
+LLM_CACHE_MODE          = os.getenv("LLM_CACHE_MODE", "exact")  # exact | template | off
+
+# Shared by every request; the response cache regenerates entries when it changes
+SYSTEM_PROMPT   = "Vous êtes un assistant AI."
+PROMPT_TEMPLATE = """Vous êtes un assistant expert en droit fiscal marocain.  
+Vos connaissances proviennent *exclusivement* du document Code Fiscal Marocain et des extraits ci‑dessous.  
+Répondez de façon détaillée et rigoureuse à la question **UNIQUEMENT** à partir de ces informations. Indiquez explicitement la reference
+utilise du context.
+
+Contexte :
+{context_string}
+
+Question : {question}
+
+Réponse :"""
 
 # --- Init clients / models ---
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
 chroma_client = chromadb.PersistentClient(path=CHROMA_DB_PATH)
 collection    = chroma_client.get_collection(name=CHROMA_COLLECTION_NAME)
-embed_model   = SentenceTransformer(EMBEDDING_MODEL_NAME, trust_remote_code=True)
+embed_model   = load_embedder(EMBEDDING_MODEL_NAME)
+reranker      = CrossEncoderReranker() if RERANK else None
+llm_cache     = ResponseCache(mode=LLM_CACHE_MODE)
 
 # --- Load questions ---
 with open(INPUT_JSON_PATH, 'r', encoding='utf-8') as f:
@@ -32,19 +61,27 @@ with open(INPUT_JSON_PATH, 'r', encoding='utf-8') as f:
 
 # --- Build fine‑tuning data ---
 fine_tuning_data = []
+prompt_words     = []   # count_words estimate of the prompt
+prompt_tokens    = []   # prompt tokens reported by the API
 
 for item in tqdm(questions_list, desc="Building examples"):
     question = item.get("question")
     if not question:
         continue
 
-    # 1) Retrieve up to 2 context snippets from ChromaDB
+    # 1) Retrieve context snippets from ChromaDB (re-ranked down to KEEP if enabled),
+    #    then dedupe / merge them into at most CONTEXT_WORDS words
     q_vec = embed_model.encode(question).tolist()
-    hits = collection.query(
+    results = collection.query(
         query_embeddings=[q_vec],
-        n_results=4,
-        include=["documents"]
-    )["documents"][0]
+        n_results=N_RESULTS,
+        include=["documents", "metadatas", "distances"]
+    )
+    passages = from_chroma(results)
+    if reranker and passages:
+        best = reranker.rerank(question, [p["text"] for p in passages], keep=KEEP)
+        passages = [dict(passages[i], score=score) for i, _, score in best]
+    hits, _ = pack_context(passages, budget=CONTEXT_WORDS)
     if hits:
         context_string = "\n---\n".join(
             f"Extrait {i+1}:\n{doc}" for i, doc in enumerate(hits)
@@ -52,31 +89,32 @@ for item in tqdm(questions_list, desc="Building examples"):
     else:
         context_string = "Aucun extrait pertinent trouvé."
 
-    # 2) Build the prompt template (French)
-    prompt = f"""Vous êtes un assistant expert en droit fiscal marocain.  
-Vos connaissances proviennent *exclusivement* du document Code Fiscal Marocain et des extraits ci‑dessous.  
-Répondez de façon détaillée et rigoureuse à la question **UNIQUEMENT** à partir de ces informations. Indiquez explicitement la reference
-utilise du context.
+    # 2) Build the prompt (French)
+    prompt = PROMPT_TEMPLATE.format(context_string=context_string, question=question)
 
-Contexte :
-{context_string}
+    prompt_words.append(count_words(prompt))
+    tqdm.write(f"prompt words (estimate): {prompt_words[-1]}")
 
-Question : {question}
-
-Réponse :"""
-
-    # 3) Query GPT‑4o
+    # 3) Query GPT‑4o (unless this prompt was already answered)
+    cache_args = dict(template=SYSTEM_PROMPT + PROMPT_TEMPLATE, item=question)
+    answer = llm_cache.get("openai", OPENAI_MODEL, TEMPERATURE, SYSTEM_PROMPT + prompt, **cache_args)
     for attempt in range(1, MAX_RETRIES + 1):
+        if answer is not None:
+            break
         try:
             resp = openai_client.chat.completions.create(
-                model="gpt-4o-mini-2024-07-18",
+                model=OPENAI_MODEL,
                 messages=[
-                    {"role": "system", "content": "Vous êtes un assistant AI."},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user",   "content": prompt}
                 ],
-                temperature=0.0,
+                temperature=TEMPERATURE,
             )
             answer = resp.choices[0].message.content.strip()
+            if resp.usage:
+                prompt_tokens.append(resp.usage.prompt_tokens)
+                tqdm.write(f"prompt tokens (API): {prompt_tokens[-1]}")
+            llm_cache.put("openai", OPENAI_MODEL, TEMPERATURE, SYSTEM_PROMPT + prompt, answer, **cache_args)
             break
         except Exception as e:
             if attempt == MAX_RETRIES:
@@ -94,4 +132,14 @@ Réponse :"""
 with open(OUTPUT_JSON_PATH, 'w', encoding='utf-8') as f:
     json.dump({"data": fine_tuning_data}, f, ensure_ascii=False, indent=2)
 
+if prompt_words:
+    print(f"Prompt words (estimate): mean {sum(prompt_words) / len(prompt_words):.0f}, max {max(prompt_words)}")
+if prompt_tokens:
+    print(f"Prompt tokens (API, {len(prompt_tokens)} calls): mean {sum(prompt_tokens) / len(prompt_tokens):.0f}, "
+          f"max {max(prompt_tokens)}")
+print(f"LLM cache: {llm_cache.hits} hits, {llm_cache.misses} misses")
+llm_cache.close()
+if reranker:
+    print(f"Re-rank cache: {reranker.cache.hits} hits, {reranker.cache.misses} misses")
+    reranker.close()
 print(f"Dataset ready: {OUTPUT_JSON_PATH}")
@@ -1,23 +1,34 @@
 import os
+import sys
+import atexit
+import glob
+import time
 import argparse
 import logging
 import json
 import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from src.preprocessor.extractor import PDFExtractor
 from src.preprocessor.cleaner import TextCleaner
+from src.preprocessor.normalizer import TextNormalizer
 from src.preprocessor.mapper import ArticleMapper
+from src.preprocessor.tables import TableDetector
+from src.preprocessor.document_pool import DocumentPool
+from src.utils.profiling import PipelineProfiler
 
-def setup_logging(debug=False):
+INPUT_SUFFIXES = ('.pdf', '.txt')
+
+def setup_logging(debug=False, log_file='pdf_processor.log'):
     """Setup logging configuration"""
     level = logging.DEBUG if debug else logging.INFO
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
     logging.basicConfig(
         level=level,
         format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler('pdf_processor.log')
-        ]
+        handlers=handlers
     )
     return logging.getLogger("PDFProcessor")
 
@@ -26,60 +37,225 @@ def save_to_json(data, filepath):
     with open(filepath, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
 
-def main():
-    # Set up argument parser
-    parser = argparse.ArgumentParser(description="Process law PDF and extract articles")
-    parser.add_argument("--input", type=str, required=True, help="Path to input file (PDF or text)")
-    parser.add_argument("--output", type=str, default="output", help="Path to output directory")
-    parser.add_argument("--debug", action="store_true", help="Enable debug mode")
-    args = parser.parse_args()
-    
-    # Setup logging
-    logger = setup_logging(debug=args.debug)
-    
-    # Create output directory if it doesn't exist
-    output_dir = Path(args.output)
+def write_text(filepath, text):
+    """Write text to a file and return the number of bytes written"""
+    data = text.encode("utf-8")
+    with open(filepath, "wb") as f:
+        f.write(data)
+    return len(data)
+
+def write_articles(output_dir, articles, articles_format="files"):
+    """Write the mapped articles and return the number of bytes written.
+
+    "files" writes one article_<num>.txt per article; "jsonl" writes a single
+    articles.jsonl with one {"article", "content"} object per line.
+    """
+    if articles_format == "jsonl":
+        lines = (json.dumps({"article": num, "content": content}, ensure_ascii=False)
+                 for num, content in articles.items())
+        return write_text(output_dir / "articles.jsonl", "".join(line + "\n" for line in lines))
+
+    articles_dir = output_dir / "articles"
+    articles_dir.mkdir(exist_ok=True)
+    written = 0
+    for article_num, content in articles.items():
+        # Clean article number for filename (remove special characters)
+        safe_num = re.sub(r'[^\w\.]', '_', article_num)
+        written += write_text(articles_dir / f"article_{safe_num}.txt", content)
+    return written
+
+def process_document(input_path, output_dir, extractor, cleaner, mapper, logger,
+                     profile=False, articles_format="files"):
+    """Run extract → clean → map → write for one document and return a summary."""
+    output_dir = Path(output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    logger.info(f"Starting preprocessing of {args.input}")
+    profiler = PipelineProfiler(logger=logger, trace_memory=profile)
+    extractor.profiler = profiler
+    if profile:
+        profiler.start_profile()
+    
+    logger.info(f"Starting preprocessing of {input_path}")
     
     # Extract text from PDF
-    extractor = PDFExtractor(logger=logger)
-    raw_text = extractor.extract(args.input)
+    with profiler.stage("extract", bytes_in=os.path.getsize(input_path)) as stage:
+        raw_text = extractor.extract(str(input_path))
+        stage["bytes_out"] = len(raw_text.encode("utf-8"))
     
     # Save raw extracted text
-    with open(output_dir / "raw_text.txt", "w", encoding="utf-8") as f:
-        f.write(raw_text)
+    with profiler.stage("write") as stage:
+        stage["bytes_out"] = write_text(output_dir / "raw_text.txt", raw_text)
     logger.info(f"Raw text saved to {output_dir}/raw_text.txt")
     
+    # Save structured table rows
+    if extractor.tables:
+        with profiler.stage("write") as stage:
+            save_to_json(extractor.tables, output_dir / "tables.json")
+            stage["bytes_out"] = os.path.getsize(output_dir / "tables.json")
+        logger.info(f"{len(extractor.tables)} tables saved to {output_dir}/tables.json")
+    
     # Clean and normalize text
-    cleaner = TextCleaner(logger=logger)
-    clean_text = cleaner.clean(raw_text)
+    with profiler.stage("clean", bytes_in=len(raw_text.encode("utf-8"))) as stage:
+        clean_text = cleaner.clean(raw_text)
+        stage["bytes_out"] = len(clean_text.encode("utf-8"))
     
     # Save cleaned text
-    with open(output_dir / "clean_text.txt", "w", encoding="utf-8") as f:
-        f.write(clean_text)
+    with profiler.stage("write") as stage:
+        stage["bytes_out"] = write_text(output_dir / "clean_text.txt", clean_text)
     logger.info(f"Clean text saved to {output_dir}/clean_text.txt")
     
     # Extract articles and map to content
-    mapper = ArticleMapper(logger=logger)
-    article_map = mapper.map_articles(clean_text)
+    with profiler.stage("map", bytes_in=len(clean_text.encode("utf-8"))) as stage:
+        article_map = mapper.map_articles(clean_text)
+        stage["bytes_out"] = sum(len(c.encode("utf-8")) for c in article_map['articles'].values())
     
-    # Save article map to JSON
-    save_to_json(article_map, output_dir / "article_map.json")
-    logger.info(f"Article mapping saved to {output_dir}/article_map.json")
+    with profiler.stage("write") as stage:
+        # Save article map to JSON
+        save_to_json(article_map, output_dir / "article_map.json")
+        logger.info(f"Article mapping saved to {output_dir}/article_map.json")
+        
+        stage["bytes_out"] += write_articles(output_dir, article_map['articles'], articles_format)
+        stage["bytes_out"] += os.path.getsize(output_dir / "article_map.json")
     
-    # Save individual articles as separate files
-    articles_dir = output_dir / "articles"
-    articles_dir.mkdir(exist_ok=True)
+    logger.info(f"{len(article_map['articles'])} articles saved to {output_dir} ({articles_format})")
     
-    for article_num, content in article_map['articles'].items():
-        # Clean article number for filename (remove special characters)
-        safe_num = re.sub(r'[^\w\.]', '_', article_num)
-        with open(articles_dir / f"article_{safe_num}.txt", "w", encoding="utf-8") as f:
-            f.write(content)
+    if profile:
+        profiler.stop_profile(output_dir / "profile.pstats")
+    profiler.save(output_dir / "metrics.json")
+    return {'articles': len(article_map['articles']), 'tables': len(extractor.tables)}
+
+def find_inputs(spec):
+    """Return the documents of a batch spec (directory or glob), or None for a single file."""
+    if os.path.isdir(spec):
+        paths = [p for p in Path(spec).iterdir() if p.suffix.lower() in INPUT_SUFFIXES]
+    elif glob.has_magic(spec):
+        paths = [Path(p) for p in glob.glob(spec, recursive=True) if Path(p).suffix.lower() in INPUT_SUFFIXES]
+    else:
+        return None
+    return sorted(p for p in paths if p.is_file())
+
+def output_namespaces(inputs, output_dir):
+    """One output directory per document, named after it (suffixed on name clashes).
+
+    Every input's own name is reserved first, so a "cgi-2" suffix never takes
+    the directory of a document actually called cgi-2. Names are compared
+    case-insensitively, as on Windows and macOS file systems.
+    """
+    stems = {path.stem.casefold() for path in inputs}
+    used = set()
+    dirs = []
+    for path in inputs:
+        name = path.stem
+        if name.casefold() in used:
+            n = 2
+            while f"{name}-{n}".casefold() in used | stems:
+                n += 1
+            name = f"{name}-{n}"
+        used.add(name.casefold())
+        dirs.append(Path(output_dir) / name)
+    return dirs
+
+# Components are created once per worker process and reused for every document it handles
+_worker = {}
+
+def _init_worker(debug, log_file, table_cache, wordlist):
+    logger = setup_logging(debug=debug, log_file=log_file)
+    table_detector = TableDetector(logger=logger, cache_path=table_cache, persist=False)
+    pool = DocumentPool(logger=logger)
+    atexit.register(pool.close)
+    _worker.update(
+        logger=logger,
+        table_detector=table_detector,
+        extractor=PDFExtractor(logger=logger, table_detector=table_detector, pool=pool),
+        cleaner=TextCleaner(logger=logger, normalizer=TextNormalizer(logger=logger, wordlist=wordlist)),
+        mapper=ArticleMapper(logger=logger),
+    )
+
+def _process_in_worker(input_path, output_dir, profile, articles_format):
+    start = time.perf_counter()
+    try:
+        summary = process_document(input_path, output_dir, _worker['extractor'], _worker['cleaner'],
+                                   _worker['mapper'], _worker['logger'], profile, articles_format)
+        summary['status'] = 'ok'
+    except Exception as e:
+        _worker['logger'].error(f"Failed to process {input_path}: {e}")
+        summary = {'status': 'error', 'error': str(e)}
+    summary.update(input=str(input_path), output=str(output_dir), seconds=time.perf_counter() - start,
+                   table_cache=_worker['table_detector'].take_fresh())
+    return summary
+
+def run_batch(inputs, args, logger):
+    """Process many documents concurrently, each into its own output namespace."""
+    output_dirs = output_namespaces(inputs, args.output)
+    workers = min(args.workers or os.cpu_count() or 1, len(inputs))
+    logger.info(f"Processing {len(inputs)} documents with {workers} workers")
+    
+    start = time.perf_counter()
+    results = []
+    # Workers only read the table cache; their new entries are merged and written here, once
+    table_cache = TableDetector(logger=logger, cache_path=args.table_cache)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(args.debug, args.log_file, args.table_cache, args.wordlist)) as pool:
+        futures = [pool.submit(_process_in_worker, path, out, args.profile, args.articles)
+                   for path, out in zip(inputs, output_dirs)]
+        for future in as_completed(futures):
+            result = future.result()
+            table_cache.merge(result.pop('table_cache'))
+            results.append(result)
+            logger.info(f"[{len(results)}/{len(inputs)}] {result['input']}: {result['status']} "
+                        f"({result['seconds']:.1f}s)")
+    
+    table_cache.save_cache()
+    results.sort(key=lambda r: r['input'])
+    failed = [r for r in results if r['status'] != 'ok']
+    save_to_json({'documents': results, 'failed': len(failed),
+                  'seconds': time.perf_counter() - start}, Path(args.output) / "batch_summary.json")
+    logger.info(f"Batch completed: {len(results) - len(failed)} ok, {len(failed)} failed "
+                f"- summary in {args.output}/batch_summary.json")
+    return not failed
+
+def main():
+    # Set up argument parser
+    parser = argparse.ArgumentParser(description="Process law PDF and extract articles")
+    parser.add_argument("--input", type=str, required=True,
+                        help="Path to input file (PDF or text), or a directory / glob of them for batch mode")
+    parser.add_argument("--output", type=str, default="output", help="Path to output directory")
+    parser.add_argument("--debug", action="store_true", help="Enable debug mode")
+    parser.add_argument("--log-file", type=str, default="pdf_processor.log", help="Path to log file (empty to disable)")
+    parser.add_argument("--profile", action="store_true", help="Dump a cProfile trace and trace peak memory per stage")
+    parser.add_argument("--table-cache", type=str, default=None, help="Path to a JSON cache of per-page table detection results")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes in batch mode (default: CPU count)")
+    parser.add_argument("--articles", choices=("files", "jsonl"), default=None,
+                        help="Article output: one file per article or a single articles.jsonl "
+                             "(default: files for one document, jsonl in batch mode)")
+    parser.add_argument("--wordlist", type=str, default=None,
+                        help="French word list (one word per line) that validates OCR fixes")
+    args = parser.parse_args()
+    
+    # Setup logging
+    logger = setup_logging(debug=args.debug, log_file=args.log_file)
+    
+    # Create output directory if it doesn't exist
+    output_dir = Path(args.output)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    inputs = find_inputs(args.input)
+    if inputs is not None:
+        if not inputs:
+            logger.error(f"No PDF or text documents match {args.input}")
+            sys.exit(1)
+        args.articles = args.articles or "jsonl"
+        if not run_batch(inputs, args, logger):
+            sys.exit(1)
+        return
     
-    logger.info(f"Individual articles saved to {articles_dir}")
+    table_detector = TableDetector(logger=logger, cache_path=args.table_cache)
+    cleaner = TextCleaner(logger=logger, normalizer=TextNormalizer(logger=logger, wordlist=args.wordlist))
+    with DocumentPool(logger=logger) as pool:
+        extractor = PDFExtractor(logger=logger, table_detector=table_detector, pool=pool)
+        process_document(args.input, output_dir, extractor, cleaner,
+                         ArticleMapper(logger=logger), logger, profile=args.profile,
+                         articles_format=args.articles or "files")
     logger.info("Preprocessing completed successfully")
 
 if __name__ == "__main__":
@@ -7,11 +7,18 @@ class TableParser:
         for row in table:
             structured_line = self.extract_row_data(row)
             structured_lines.append(structured_line)
-        return structured_lines
+        return self.clean_table_data(structured_lines)
 
     def extract_row_data(self, row):
-        return [cell.strip() for cell in row]  # Assuming row is a list of cell data
+        # Merged cells come back as None; multi-line cells are joined into one line
+        return [" ".join((cell or "").split()) for cell in row]
 
     def clean_table_data(self, data):
-        # Implement any necessary cleaning logic for table data
-        return data
\ No newline at end of file
+        """Drop rows and columns that are empty in every cell."""
+        rows = [row for row in data if any(row)]
+        if not rows:
+            return []
+        width = max(len(row) for row in rows)
+        rows = [row + [""] * (width - len(row)) for row in rows]
+        keep = [i for i in range(width) if any(row[i] for row in rows)]
+        return [[row[i] for i in keep] for row in rows]
@@ -0,0 +1,112 @@
+import hashlib
+import re
+from collections import Counter
+
+# Lines that are boilerplate wherever they appear, even in documents too short
+# for the frequency statistics to say anything.
+DEFAULT_PATTERNS = [
+    r'\d+',
+    r'(?:\d+\s+)?CODE GÉNÉRAL DES IMPÔTS(?:\s+\d+)?',
+    r'Bulletin Officiel',
+]
+
+# Repeated headings are running banners, but their first occurrence is the real one.
+HEADING_PATTERN = re.compile(r'(?:Article|ARTICLE|SECTION|CHAPITRE|TITRE|LIVRE|PARTIE)\b')
+
+PAGE_BREAK = '\f'
+
+class BoilerplateDetector:
+    """Find and strip lines repeated across the pages of a document.
+
+    Running headers, footers, page numbers and section banners are not adjacent
+    to each other in the extracted text, so comparing a line with the previous
+    one misses them. Every line is normalised and hashed; a hash is boilerplate
+    when it occurs on at least `min_page_ratio` of the pages, or at the same
+    position among the first/last `edge_lines` lines of at least
+    `position_ratio` of the pages. The pages are then rewritten in one pass.
+
+    Pages are separated by form feeds in the extractor output. Text without
+    page breaks is treated as one page and only `patterns` apply.
+    """
+
+    def __init__(self, logger=None, min_page_ratio=0.5, position_ratio=0.3, edge_lines=2,
+                 min_pages=3, max_numbered_words=6, patterns=DEFAULT_PATTERNS):
+        self.logger = logger
+        self.min_page_ratio = min_page_ratio
+        self.position_ratio = position_ratio
+        self.edge_lines = edge_lines
+        self.min_pages = min_pages
+        self.max_numbered_words = max_numbered_words
+        self.patterns = re.compile('|'.join(f'(?:{p})' for p in patterns)) if patterns else None
+        self.stats = {'pages': 0, 'repeated': 0, 'lines_removed': 0, 'bytes_removed': 0}
+
+    def line_key(self, line, ignore_numbers=False):
+        """Hash of a line with spacing normalised away.
+
+        With `ignore_numbers`, numbers in short non-heading lines are replaced
+        so "Page 12" and "Page 13" hash the same; longer lines that differ by a
+        number, like footnotes citing different finance laws, stay distinct.
+        """
+        words = line.split()
+        normalized = ' '.join(words)
+        if ignore_numbers and len(words) <= self.max_numbered_words and not HEADING_PATTERN.match(normalized):
+            normalized = re.sub(r'\d+', '#', normalized)
+        return hashlib.blake2b(normalized.encode('utf-8'), digest_size=8).digest()
+
+    def detect(self, pages):
+        """Return the hashes of lines repeated on many pages and of lines repeated at page edges."""
+        on_pages = Counter()
+        at_position = Counter()
+        for page in pages:
+            lines = [line for line in page.split('\n') if line.strip()]
+            on_pages.update({self.line_key(line) for line in lines})
+            edges = {(pos, self.line_key(line, True)) for pos, line in enumerate(lines[:self.edge_lines])}
+            edges |= {(-pos - 1, self.line_key(line, True))
+                      for pos, line in enumerate(reversed(lines[-self.edge_lines:]))}
+            at_position.update(edges)
+
+        if len(pages) < self.min_pages:
+            return set(), set()
+        page_threshold = max(self.min_pages, self.min_page_ratio * len(pages))
+        position_threshold = max(self.min_pages, self.position_ratio * len(pages))
+        repeated = {key for key, count in on_pages.items() if count >= page_threshold}
+        positional = {key for (_, key), count in at_position.items() if count >= position_threshold}
+        return repeated, positional
+
+    def split_pages(self, text):
+        return text.split(PAGE_BREAK)
+
+    def strip(self, text):
+        """Remove boilerplate lines and page breaks from the text."""
+        pages = self.split_pages(text)
+        repeated, positional = self.detect(pages)
+        seen_headings = set()
+        removed = removed_bytes = 0
+        kept_pages = []
+        for page in pages:
+            kept = []
+            for line in page.split('\n'):
+                stripped = line.strip()
+                if stripped:
+                    drop = bool(self.patterns and self.patterns.fullmatch(stripped))
+                    if not drop and (repeated or positional):
+                        key = self.line_key(stripped)
+                        if key in repeated or self.line_key(stripped, True) in positional:
+                            # Keep the first occurrence of a repeated heading for the mapper
+                            drop = not HEADING_PATTERN.match(stripped) or key in seen_headings
+                            seen_headings.add(key)
+                    if drop:
+                        removed += 1
+                        removed_bytes += len(line.encode('utf-8')) + 1
+                        continue
+                kept.append(line)
+            kept_pages.append('\n'.join(kept))
+
+        self.stats['pages'] += len(pages)
+        self.stats['repeated'] += len(repeated | positional)
+        self.stats['lines_removed'] += removed
+        self.stats['bytes_removed'] += removed_bytes
+        if self.logger:
+            self.logger.info(f"Removed {removed} boilerplate lines ({removed_bytes} bytes, "
+                             f"{len(repeated | positional)} repeated lines) from {len(pages)} pages")
+        return '\n\n'.join(kept_pages)
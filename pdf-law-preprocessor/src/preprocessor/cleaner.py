@@ -1,8 +1,12 @@
 import re
+from src.preprocessor.boilerplate import BoilerplateDetector
+from src.preprocessor.normalizer import TextNormalizer
 
 class TextCleaner:
-    def __init__(self, logger=None):
+    def __init__(self, logger=None, boilerplate=None, normalizer=None):
         self.logger = logger
+        self.boilerplate = boilerplate or BoilerplateDetector(logger=logger)
+        self.normalizer = normalizer or TextNormalizer(logger=logger)
     
     def clean(self, text):
         """Clean the extracted text."""
@@ -22,39 +26,12 @@ class TextCleaner:
         return text
     
     def _remove_headers_footers(self, text):
-        """Remove headers and footers from the text."""
-        text = re.sub(r'\n\d+\n', '\n', text)
-        
-        patterns = [
-            r'\nCODE GÉNÉRAL DES IMPÔTS\n',
-            r'\n\d+ CODE GÉNÉRAL DES IMPÔTS\n',
-            r'\nBulletin Officiel\n'
-        ]
-        
-        for pattern in patterns:
-            text = re.sub(pattern, '\n', text)
-            
-        return text
+        """Remove headers, footers, page numbers and other lines repeated across pages."""
+        return self.boilerplate.strip(text)
     
     def _fix_ocr_errors(self, text):
-        """Fix common OCR errors."""
-        replacements = {
-            '0': 'O',  
-            'rn': 'm',
-            'ii': 'n',
-            '—': '-',
-            '–': '-',
-            '•': '-',
-        }
-        
-        for old, new in replacements.items():
-            if old == '0' and new == 'O':
-                pattern = r'([A-Za-z])0([A-Za-z])'
-                text = re.sub(pattern, r'\1O\2', text)
-            else:
-                text = text.replace(old, new)
-            
-        return text
+        """Normalise Unicode and fix OCR errors the lexicon confirms."""
+        return self.normalizer.normalize(text)
     
     def _normalize_whitespace(self, text):
         """Normalize whitespace in the text."""
@@ -0,0 +1,140 @@
+import os
+from collections import OrderedDict
+from contextlib import contextmanager
+import fitz
+
+class LRUCache:
+    """Bounded mapping that drops its least recently used entries and counts hits."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+
+    def get(self, key, load):
+        """Return the cached value for `key`, calling `load()` on a miss."""
+        if key in self._items:
+            self.hits += 1
+            self._items.move_to_end(key)
+            return self._items[key]
+        self.misses += 1
+        value = load()
+        if self.capacity > 0:
+            self._items[key] = value
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+        return value
+
+    def discard(self, predicate):
+        """Drop the entries whose key matches `predicate`."""
+        for key in [key for key in self._items if predicate(key)]:
+            del self._items[key]
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._items)
+
+class DocumentPool:
+    """Keep PyMuPDF documents open across stages, with LRU caches of their pages.
+
+    Every stage of the extractor (table of contents scan, text extraction,
+    table detection) used to load its own `fitz.Page` objects, and the
+    document itself was never closed. The pool opens each file once per
+    process and hands it out with `with pool.open(path) as doc:`. Loaded
+    pages and their text pages are kept in bounded LRU caches, so a page
+    read by several stages is parsed once. Documents stay open after their
+    lease ends, up to `max_documents`, and are reopened when the file changes
+    on disk. Closing the pool, or leaving its `with` block, closes them all.
+    """
+
+    def __init__(self, logger=None, max_documents=4, max_pages=64, max_textpages=64):
+        self.logger = logger
+        self.max_documents = max_documents
+        self._documents = OrderedDict()    # (path, mtime, size) -> {'doc', 'leases'}
+        self._owned = {}                   # id(doc) -> key, for documents the pool opened
+        self.document_hits = 0
+        self.document_misses = 0
+        self.pages = LRUCache(max_pages)
+        self.textpages = LRUCache(max_textpages)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @contextmanager
+    def open(self, path):
+        """Lease the document at `path`, opening it if the pool does not hold it yet."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        if key in self._documents:
+            self.document_hits += 1
+            self._documents.move_to_end(key)
+        else:
+            self.document_misses += 1
+            for stale in [k for k in self._documents if k[0] == path]:
+                self._close(stale)
+            self._documents[key] = {'doc': fitz.open(path), 'leases': 0}
+            self._owned[id(self._documents[key]['doc'])] = key
+        entry = self._documents[key]
+        entry['leases'] += 1
+        try:
+            yield entry['doc']
+        finally:
+            entry['leases'] -= 1
+            self._evict()
+
+    def page(self, doc, page_num):
+        """Return a loaded page; pages of documents the pool did not open are not cached."""
+        key = self._owned.get(id(doc))
+        if key is None:
+            return doc[page_num]
+        return self.pages.get((key, page_num), lambda: doc[page_num])
+
+    def textpage(self, doc, page_num):
+        """Return the page's TextPage, built with the flags of `get_text("text")`."""
+        return self._textpage(doc, self.page(doc, page_num), page_num)
+
+    def page_text(self, doc, page_num):
+        """Return the plain text of a page, reusing its cached TextPage."""
+        page = self.page(doc, page_num)
+        return page.get_text("text", textpage=self._textpage(doc, page, page_num))
+
+    def hit_rates(self):
+        opened = self.document_hits + self.document_misses
+        return {'documents': self.document_hits / opened if opened else 0.0, 'pages': self.pages.hit_rate(),
+                'textpages': self.textpages.hit_rate()}
+
+    def close(self):
+        """Close every document the pool holds, leased or not."""
+        for key in list(self._documents):
+            self._close(key)
+        if self.logger:
+            rates = self.hit_rates()
+            self.logger.info(f"Document pool hit rates: documents {rates['documents']:.0%}, "
+                             f"pages {rates['pages']:.0%}, text pages {rates['textpages']:.0%}")
+
+    def _evict(self):
+        """Close the least recently used documents no stage holds beyond `max_documents`."""
+        idle = [key for key, entry in self._documents.items() if not entry['leases']]
+        for key in idle[:max(len(self._documents) - self.max_documents, 0)]:
+            self._close(key)
+
+    def _textpage(self, doc, page, page_num):
+        key = self._owned.get(id(doc))
+        load = lambda: page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+        return load() if key is None else self.textpages.get((key, page_num), load)
+
+    def _close(self, key):
+        entry = self._documents.pop(key)
+        # Pages must go before their document is closed
+        self.pages.discard(lambda k: k[0] == key)
+        self.textpages.discard(lambda k: k[0] == key)
+        del self._owned[id(entry['doc'])]
+        entry['doc'].close()
@@ -1,16 +1,27 @@
 import re
 import os
-import fitz 
+import time
+from src.preprocessor.navigator import DocumentNavigator
+from src.preprocessor.tables import TableDetector
+from src.preprocessor.boilerplate import PAGE_BREAK
+from src.preprocessor.document_pool import DocumentPool
 
 class PDFExtractor:
-    def __init__(self, logger=None):
+    def __init__(self, logger=None, profiler=None, table_detector=None, pool=None):
         self.logger = logger
+        self.profiler = profiler
+        self.table_detector = table_detector or TableDetector(logger=logger)
+        # Without a shared pool each document is closed as soon as it is extracted
+        self.pool = pool or DocumentPool(logger=logger, max_documents=0)
+        self.tables = []
+        self.navigator = None
 
     def extract(self, pdf_path):
         """Extract text from a PDF file with special handling for legal documents."""
         if self.logger:
             self.logger.info(f"Extracting text from {pdf_path}")
-        
+        self.tables = []
+
         if not os.path.exists(pdf_path):
             if self.logger:
                 self.logger.error(f"PDF file not found: {pdf_path}")
@@ -18,33 +29,43 @@ class PDFExtractor:
         
         try:
             if pdf_path.lower().endswith('.pdf'):
-                pdf_document = fitz.open(pdf_path)
-                text = ""
-                toc_end_page = self._find_toc_end_page(pdf_document)
-                for page_num, page in enumerate(pdf_document):
-                    if page_num <= toc_end_page:
-                        continue
-                    if self.logger and page_num % 10 == 0:
-                        self.logger.debug(f"Processing page {page_num+1}/{len(pdf_document)}")
-                    page_text = page.get_text("text")
-                    page_text = self._remove_page_numbers(page_text)
-                    
-                    tables = page.find_tables()
-                    if tables and len(tables.tables) > 0:
-                        if self.logger:
-                            self.logger.debug(f"Found {len(tables.tables)} tables on page {page_num+1}")
-                        for table in tables.tables:
-                            table_text = self._process_table(table)
-                            page_text += "\n\n" + table_text + "\n\n"
-                    
-                    page_text = self._process_article_text(page_text)
-                    
-                    text += page_text + "\n\n"
+                pages = []
+                with self.pool.open(pdf_path) as pdf_document:
+                    self.navigator = DocumentNavigator(pdf_document, logger=self.logger, pool=self.pool)
+                    toc_end_page = self.navigator.find_toc_end_page()
+                    for page_num in range(toc_end_page + 1, len(pdf_document)):
+                        if self.logger and page_num % 10 == 0:
+                            self.logger.debug(f"Processing page {page_num+1}/{len(pdf_document)}")
+                        page_start = time.perf_counter()
+                        page = self.pool.page(pdf_document, page_num)
+                        page_text = self.navigator.page_text(page_num)
+                        
+                        tables = self.table_detector.extract(page)
+                        if tables:
+                            if self.logger:
+                                self.logger.debug(f"Found {len(tables)} tables on page {page_num+1}")
+                            for rows in tables:
+                                self.tables.append({'page': page_num + 1, 'rows': rows})
+                                table_text = self._process_table(rows)
+                                page_text += "\n\n" + table_text + "\n\n"
+                        
+                        page_text = self._process_article_text(page_text)
+                        
+                        pages.append(page_text)
+                        if self.profiler:
+                            self.profiler.record_page('extract', page_num, time.perf_counter() - page_start)
+                
+                # Pages stay separated so the cleaner can find their running headers and footers
+                text = PAGE_BREAK.join(pages)
+                self.table_detector.save_cache()
+                if self.logger:
+                    stats = self.table_detector.stats
+                    self.logger.info(f"Table detection ran on {stats['candidates']}/{stats['pages']} pages "
+                                     f"({stats['cache_hits']} cached), found {stats['tables']} tables")
             else:
                 with open(pdf_path, 'r', encoding='utf-8') as f:
                     text = f.read()
                     
-                text = self._remove_page_numbers(text)
                 text = self._process_article_text(text)
             
             text = self._post_process_text(text)
@@ -60,41 +81,11 @@ class PDFExtractor:
             raise
 
     def _find_toc_end_page(self, pdf_document):
-        toc_end_page = 0
-        for i in range(min(30, len(pdf_document))):
-            page_text = pdf_document[i].get_text("text")
-            if "TABLE DES MATIÈRES" in page_text or "SOMMAIRE" in page_text:
-                toc_end_page = i
-                j = i + 1
-                while j < min(50, len(pdf_document)):
-                    next_text = pdf_document[j].get_text("text")
-                    if "ARTICLE PREMIER" in next_text or "TITRE PREMIER" in next_text:
-                        return j - 1
-                    j += 1
-                
-        return toc_end_page
-
-    def _remove_page_numbers(self, text):
-        """Remove page numbers from text."""
-        page_number_pattern = r'\n\d+\n'
-        text = re.sub(page_number_pattern, '\n', text)
-        header_footer_pattern = r'\n+CODE GÉNÉRAL DES IMPÔTS\n+'
-        text = re.sub(header_footer_pattern, '\n', text)
-        
-        return text
+        return DocumentNavigator(pdf_document, logger=self.logger, pool=self.pool).find_toc_end_page()
 
-    def _process_table(self, table):
-        """Process a detected table and convert it to text representation."""
-        rows = []
-        for row_cells in table.cells:
-            row_text = []
-            for cell in row_cells:
-                # Extract text from the cell area
-                row_text.append(cell.text.strip())
-            
-            rows.append(" | ".join(row_text))
-        
-        return "\n".join(ows)
+    def _process_table(self, rows):
+        """Convert the parsed rows of a table to a text representation."""
+        return "\n".join(" | ".join(row) for row in rows)
 
     def _process_article_text(self, text):
         article_pattern = r'(Article\s+\d+[\w\.\-]*)\s*[\.\-]\s*(.*?)(?=\n)'
@@ -111,7 +102,6 @@ class PDFExtractor:
     def _post_process_text(self, text):
         text = re.sub(r'\n{3,}', '\n\n', text)
         text = re.sub(r' {2,}', ' ', text)
-        text = text.replace('I', 'I').replace('l', 'l').replace('O', 'O').replace('0', '0')
         text = re.sub(r'(\.)(\w)', r'\1 \2', text)
         
         return text
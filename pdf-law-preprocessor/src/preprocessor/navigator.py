@@ -0,0 +1,94 @@
+import re
+
+TOC_MARKERS = ("TABLE DES MATIÈRES", "SOMMAIRE")
+BODY_MARKERS = ("ARTICLE PREMIER", "TITRE PREMIER")
+
+class DocumentNavigator:
+    """Locate the table of contents and the start of the legal body of a PDF.
+
+    The PDF outline and named destinations are tried first since they cost no
+    text extraction at all. Otherwise the first pages are read once, and their
+    text is kept together with a keyword -> pages index so the extraction loop
+    does not have to render them again.
+    """
+
+    def __init__(self, pdf_document, logger=None, toc_scan_pages=30, body_scan_pages=50, pool=None):
+        self.pdf_document = pdf_document
+        self.logger = logger
+        self.pool = pool
+        self.toc_scan_pages = toc_scan_pages
+        self.body_scan_pages = body_scan_pages
+        self.index = {}
+        self._texts = {}
+
+    def page_text(self, page_num):
+        """Return the text of a page, reusing it if the scan already extracted it."""
+        if page_num in self._texts:
+            return self._texts[page_num]
+        return self._read_page(page_num)
+
+    def pages_with(self, keyword):
+        """Return the indexed pages containing a marker keyword."""
+        return self.index.get(keyword, [])
+
+    def find_toc_end_page(self):
+        """Return the index of the last page before the body of the document."""
+        body_page = self._find_in_outline()
+        if body_page is None:
+            body_page = self._find_in_named_destinations()
+        if body_page is not None:
+            if self.logger:
+                self.logger.debug(f"Body starts on page {body_page + 1} (from PDF navigation data)")
+            return max(body_page - 1, 0)
+
+        self._build_index()
+        toc_pages = [p for p in self._pages_with_any(TOC_MARKERS) if p < self.toc_scan_pages]
+        body_pages = self._pages_with_any(BODY_MARKERS)
+        for toc_page in toc_pages:
+            following = [p for p in body_pages if p > toc_page]
+            if following:
+                return following[0] - 1
+
+        return toc_pages[-1] if toc_pages else 0
+
+    def _find_in_outline(self):
+        """Return the 0-based body start page from the outline, if it has one."""
+        for _, title, page in self.pdf_document.get_toc():
+            if page > 0 and self._matches(title, BODY_MARKERS):
+                return page - 1
+        return None
+
+    def _find_in_named_destinations(self):
+        """Return the 0-based body start page from named destinations, if any."""
+        if not hasattr(self.pdf_document, "resolve_names"):
+            return None
+        pages = []
+        for name, target in self.pdf_document.resolve_names().items():
+            page = target.get("page", -1)
+            if page >= 0 and self._matches(name, BODY_MARKERS):
+                pages.append(page)
+        return min(pages) if pages else None
+
+    def _build_index(self):
+        """Extract each scanned page once and record which markers it contains."""
+        last_page = min(max(self.toc_scan_pages, self.body_scan_pages), len(self.pdf_document))
+        for page_num in range(last_page):
+            text = self._read_page(page_num)
+            self._texts[page_num] = text
+            for marker in TOC_MARKERS + BODY_MARKERS:
+                if marker in text:
+                    self.index.setdefault(marker, []).append(page_num)
+
+    def _read_page(self, page_num):
+        if self.pool:
+            return self.pool.page_text(self.pdf_document, page_num)
+        return self.pdf_document[page_num].get_text("text")
+
+    def _pages_with_any(self, markers):
+        return sorted({page for marker in markers for page in self.pages_with(marker)})
+
+    @staticmethod
+    def _matches(label, markers):
+        """Compare a label to markers ignoring case, spacing and punctuation."""
+        squashed = re.sub(r'[\W_]+', '', label).upper()
+        return any(re.sub(r'\W+', '', marker) in squashed for marker in markers)
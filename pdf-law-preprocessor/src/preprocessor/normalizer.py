@@ -0,0 +1,120 @@
+import re
+import unicodedata
+from collections import Counter
+
+# Typographic variants mapped to the plain characters the rest of the pipeline
+# matches on. Applied with one str.translate pass after NFC normalisation.
+CHAR_MAP = {
+    # spaces: no-break, narrow no-break, figure, thin; zero-width and soft hyphen go away
+    '\xa0': ' ', '\u202f': ' ', '\u2007': ' ', '\u2009': ' ',
+    '\u200b': '', '\xad': '', '\ufeff': '',
+    # dashes and minus
+    '\u2010': '-', '\u2011': '-', '\u2012': '-', '\u2013': '-', '\u2014': '-', '\u2015': '-',
+    '\u2212': '-',
+    # bullets, including the private-use glyphs of Symbol/Wingdings fonts
+    '\u2022': '-', '\u2023': '-', '\u2043': '-', '\u25aa': '-', '\u25cf': '-',
+    '\uf0a7': '-', '\uf0b7': '-', '\uf0d8': '-',
+    # apostrophes and double quotes (French guillemets are kept)
+    '\u2018': "'", '\u2019': "'", '\u201b': "'", '\u2032': "'", '\xb4': "'",
+    '\u201c': '"', '\u201d': '"', '\u201e': '"',
+    # ligatures
+    '\ufb00': 'ff', '\ufb01': 'fi', '\ufb02': 'fl', '\ufb03': 'ffi', '\ufb04': 'ffl',
+    '\u2026': '...',
+}
+
+# Character sequences OCR engines produce for the letters on the right.
+OCR_CONFUSIONS = [
+    ('rn', 'm'),
+    ('ii', 'n'),
+    ('cl', 'd'),
+    ('vv', 'w'),
+    ('0', 'o'),
+]
+
+WORD_PATTERN = re.compile(r'[^\W_]+')
+ROMAN_PATTERN = re.compile(r'[IVXLCDM]+')
+
+def load_wordlist(path):
+    """Read a word-per-line list (Hunspell .dic entries like "mot/S" included)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return {line.split('/', 1)[0].strip().lower() for line in f if line.strip()}
+
+class TextNormalizer:
+    """Normalise Unicode and fix OCR confusions in one pass over the text.
+
+    NFC composition runs once, then every single-character substitution
+    goes through a precomputed `str.translate` table. Multi-character
+    OCR fixes ("rn" read for "m") are not replaced blindly: only words
+    outside the lexicon that contain a confusion are looked at, and a
+    fix is applied when the corrected word is a known word. Known words
+    are those of the `wordlist` plus, for vocabulary the list lacks, words
+    that occur in the document itself more often than the suspect form.
+    """
+
+    def __init__(self, logger=None, wordlist=None, char_map=CHAR_MAP, confusions=OCR_CONFUSIONS,
+                 min_count=2, min_length=4):
+        self.logger = logger
+        self.table = str.maketrans(char_map)
+        self.lexicon = load_wordlist(wordlist) if isinstance(wordlist, str) else set(wordlist or ())
+        self.confusions = confusions
+        self.min_count = min_count
+        self.min_length = min_length
+        self.suspect = re.compile(
+            r'\b[^\W_]*(?:' + '|'.join(re.escape(old) for old, _ in confusions) + r')[^\W_]*\b',
+            re.IGNORECASE)
+        self.stats = {'words_checked': 0, 'words_fixed': 0}
+        self.fixes = Counter()
+
+    def normalize(self, text):
+        """Return the text composed, with canonical characters and OCR fixes applied."""
+        fixed_before = self.stats['words_fixed']
+        text = unicodedata.normalize('NFC', text).translate(self.table)
+        counts = Counter(word.lower() for word in WORD_PATTERN.findall(text))
+        decisions = {}
+
+        def fix(match):
+            word = match.group()
+            if word not in decisions:
+                self.stats['words_checked'] += 1
+                decisions[word] = self.correct(word, counts)
+            fixed = decisions[word]
+            if fixed != word:
+                self.stats['words_fixed'] += 1
+                self.fixes[(word, fixed)] += 1
+            return fixed
+
+        text = self.suspect.sub(fix, text)
+        if self.logger:
+            self.logger.info(f"Normalised text: {self.stats['words_fixed'] - fixed_before} OCR fixes "
+                             f"out of {len(decisions)} suspect words")
+        return text
+
+    def known(self, word, counts, than=0):
+        word = word.lower()
+        return word in self.lexicon or counts[word] >= max(self.min_count, than + 1)
+
+    def correct(self, word, counts):
+        """Return the dictionary-validated correction of a word, or the word itself."""
+        lower = word.lower()
+        if lower in self.lexicon or ROMAN_PATTERN.fullmatch(word) or not any(c.isalpha() for c in word):
+            return word
+        for old, new in self.confusions:
+            if old not in lower:
+                continue
+            # every occurrence first, then each one alone ("rnoderne" → "moderne" needs only the first)
+            candidates = [lower.replace(old, new)]
+            start = lower.find(old)
+            while start != -1 and lower.count(old) > 1:
+                candidates.append(lower[:start] + new + lower[start + len(old):])
+                start = lower.find(old, start + 1)
+            for candidate in candidates:
+                if len(candidate) >= self.min_length and self.known(candidate, counts, counts[lower]):
+                    return self._match_case(word, candidate)
+        return word
+
+    def _match_case(self, original, candidate):
+        if original.isupper():
+            return candidate.upper()
+        if original[0].isupper():
+            return candidate[0].upper() + candidate[1:]
+        return candidate
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+import fitz
+from src.parsers.table_parser import TableParser
+
+class TableDetector:
+    """Run PyMuPDF table detection only on pages that look like they hold a table.
+
+    `page.find_tables()` is by far the most expensive analysis PyMuPDF offers, and
+    most pages of a legal code have none. A page is a candidate when its vector
+    drawings contain enough thin horizontal and vertical rules to form a grid;
+    detection is then clipped to the area covered by those rules so the filled
+    background boxes around ordinary text are not mistaken for cells.
+    """
+
+    def __init__(self, logger=None, min_rules=3, rule_thickness=1.5, min_rule_length=10,
+                 cache_path=None, persist=True):
+        self.logger = logger
+        self.min_rules = min_rules
+        self.rule_thickness = rule_thickness
+        self.min_rule_length = min_rule_length
+        self.cache_path = cache_path
+        # Batch workers read the cache but leave writing it to the parent process
+        self.persist = persist
+        self.parser = TableParser()
+        self.stats = {'pages': 0, 'candidates': 0, 'cache_hits': 0, 'tables': 0}
+        self._cache = {}
+        self.fresh = {}
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                self._cache = json.load(f)
+
+    def find_candidate_area(self, page):
+        """Return the rectangle covered by table rules, or None if the page has no grid."""
+        horizontal = vertical = 0
+        area = fitz.Rect()
+        for drawing in page.get_drawings():
+            for item in drawing['items']:
+                if item[0] == 'l':
+                    rect = fitz.Rect(item[1], item[2]).normalize()
+                elif item[0] == 're':
+                    rect = fitz.Rect(item[1])
+                else:
+                    continue
+                if rect.height <= self.rule_thickness and rect.width >= self.min_rule_length:
+                    horizontal += 1
+                elif rect.width <= self.rule_thickness and rect.height >= self.min_rule_length:
+                    vertical += 1
+                else:
+                    continue
+                area |= rect
+
+        if horizontal >= self.min_rules and vertical >= self.min_rules:
+            return area
+        return None
+
+    def extract(self, page):
+        """Return the tables of a page as lists of cleaned rows."""
+        self.stats['pages'] += 1
+        key = self._page_hash(page)
+        if key in self._cache:
+            self.stats['cache_hits'] += 1
+            self.stats['tables'] += len(self._cache[key])
+            return self._cache[key]
+
+        tables = []
+        area = self.find_candidate_area(page)
+        if area is not None:
+            self.stats['candidates'] += 1
+            for table in page.find_tables(clip=area).tables:
+                rows = self.parser.parse_table(table.extract())
+                if rows:
+                    tables.append(rows)
+
+        self.stats['tables'] += len(tables)
+        self._cache[key] = tables
+        self.fresh[key] = tables
+        return tables
+
+    def take_fresh(self):
+        """Return the results detected since the last call, for another process to save."""
+        fresh, self.fresh = self.fresh, {}
+        return fresh
+
+    def merge(self, entries):
+        """Add results detected by other processes (batch workers) to the cache."""
+        self._cache.update(entries)
+
+    def save_cache(self):
+        """Persist the per-page results so unchanged pages are skipped next run."""
+        if not self.cache_path or not self.persist:
+            return
+        # Keep entries another run wrote since this one loaded the file, and
+        # replace the file atomically so a reader never sees a partial write.
+        if os.path.exists(self.cache_path):
+            try:
+                with open(self.cache_path, 'r', encoding='utf-8') as f:
+                    self._cache = {**json.load(f), **self._cache}
+            except ValueError:
+                pass
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._cache, f, ensure_ascii=False)
+        os.replace(tmp_path, self.cache_path)
+
+    def _page_hash(self, page):
+        """Hash the page content stream together with its size and the detector settings."""
+        digest = hashlib.sha1(page.read_contents())
+        digest.update(repr(tuple(page.rect)).encode())
+        digest.update(repr((self.min_rules, self.rule_thickness, self.min_rule_length)).encode())
+        return digest.hexdigest()
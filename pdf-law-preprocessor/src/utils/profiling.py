@@ -0,0 +1,150 @@
+import cProfile
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Upper bounds (in milliseconds) of the per-page timing histogram buckets
+PAGE_TIME_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+
+def _peak_rss_kb():
+    """Return the process-lifetime peak resident set size in KiB, if available."""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class PipelineProfiler:
+    """Collect per-stage and per-page metrics for a preprocessing run.
+
+    Stages are timed with the `stage` context manager. Entering the same stage
+    name several times accumulates into a single record, so interleaved writes
+    can all be reported under "write".
+
+    The peak RSS is a process-lifetime high-water mark that earlier stages (and,
+    in batch workers, earlier documents) have already raised, so a stage only
+    reports how far it pushed it up (`rss_growth_kb`), 0 when it stayed below.
+    `peak_python_memory` (with `trace_memory`) is the stage's own heap peak.
+    """
+
+    def __init__(self, logger=None, trace_memory=False, slowest_pages=10):
+        self.logger = logger
+        self.trace_memory = trace_memory
+        self.slowest_pages = slowest_pages
+        self.stages = {}
+        self.pages = {}
+        self._profile = None
+        self._started = time.time()
+
+    @contextmanager
+    def stage(self, name, bytes_in=0):
+        """Time a pipeline stage. The yielded dict accepts a `bytes_out` value."""
+        record = self.stages.setdefault(name, {
+            'wall_time': 0.0,
+            'cpu_time': 0.0,
+            'bytes_in': 0,
+            'bytes_out': 0,
+            'calls': 0,
+            'peak_python_memory': 0,
+            'rss_growth_kb': None,
+        })
+        io = {'bytes_out': 0}
+
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+
+        rss_start = _peak_rss_kb()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield io
+        finally:
+            record['wall_time'] += time.perf_counter() - wall_start
+            record['cpu_time'] += time.process_time() - cpu_start
+            record['bytes_in'] += bytes_in
+            record['bytes_out'] += io['bytes_out']
+            record['calls'] += 1
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                record['peak_python_memory'] = max(record['peak_python_memory'], peak)
+            if rss_start is not None:
+                record['rss_growth_kb'] = (record['rss_growth_kb'] or 0) + _peak_rss_kb() - rss_start
+
+            if self.logger:
+                self.logger.debug(
+                    f"Stage '{name}' took {record['wall_time']:.3f}s wall, "
+                    f"{record['cpu_time']:.3f}s CPU"
+                )
+
+    def record_page(self, stage, page_num, seconds):
+        """Record the time spent on a single page within a stage."""
+        self.pages.setdefault(stage, []).append((page_num, seconds))
+
+    def page_histogram(self, stage):
+        """Bucket the page timings of a stage into a histogram keyed by upper bound."""
+        labels = [f"<{bound}ms" for bound in PAGE_TIME_BUCKETS_MS]
+        labels.append(f">={PAGE_TIME_BUCKETS_MS[-1]}ms")
+        histogram = dict.fromkeys(labels, 0)
+
+        for _, seconds in self.pages.get(stage, []):
+            millis = seconds * 1000
+            for bound, label in zip(PAGE_TIME_BUCKETS_MS, labels):
+                if millis < bound:
+                    histogram[label] += 1
+                    break
+            else:
+                histogram[labels[-1]] += 1
+
+        return histogram
+
+    def start_profile(self):
+        """Start collecting a cProfile trace of the whole run."""
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop_profile(self, filepath):
+        """Stop the cProfile trace and dump it in pstats format."""
+        if self._profile is None:
+            return
+        self._profile.disable()
+        self._profile.dump_stats(str(filepath))
+        self._profile = None
+        if self.logger:
+            self.logger.info(f"Profile saved to {filepath}")
+
+    def to_dict(self):
+        """Return the collected metrics as a JSON-serialisable dict."""
+        pages = {}
+        for stage, timings in self.pages.items():
+            slowest = sorted(timings, key=lambda item: item[1], reverse=True)
+            pages[stage] = {
+                'count': len(timings),
+                'total_time': sum(seconds for _, seconds in timings),
+                'histogram': self.page_histogram(stage),
+                'slowest': [
+                    {'page': page_num + 1, 'time': seconds}
+                    for page_num, seconds in slowest[:self.slowest_pages]
+                ],
+            }
+
+        return {
+            'started_at': self._started,
+            'total_wall_time': sum(s['wall_time'] for s in self.stages.values()),
+            'stages': self.stages,
+            'pages': pages,
+        }
+
+    def save(self, filepath):
+        """Write the collected metrics to a JSON file."""
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        if self.logger:
+            self.logger.info(f"Metrics saved to {filepath}")
@@ -0,0 +1,57 @@
+import argparse
+import json
+import logging
+import os
+import tempfile
+import unittest
+from pathlib import Path
+import fitz
+from src.main import find_inputs, output_namespaces, run_batch
+
+class TestBatchInputs(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        for name in ("b.pdf", "a.txt", "notes.md"):
+            (self.root / name).write_text("Article 1.- Test", encoding="utf-8")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_single_file_is_not_a_batch(self):
+        self.assertIsNone(find_inputs(str(self.root / "b.pdf")))
+
+    def test_directory_collects_documents(self):
+        self.assertEqual([p.name for p in find_inputs(str(self.root))], ["a.txt", "b.pdf"])
+
+    def test_glob_collects_documents(self):
+        self.assertEqual([p.name for p in find_inputs(os.path.join(self.tmp.name, "*.pdf"))], ["b.pdf"])
+
+    def test_output_namespaces_are_unique(self):
+        inputs = [Path("x/cgi.pdf"), Path("y/cgi.pdf"), Path("y/cgi.txt"), Path("z/loi.pdf")]
+        names = [d.name for d in output_namespaces(inputs, "out")]
+        self.assertEqual(names, ["cgi", "cgi-2", "cgi-3", "loi"])
+
+    def test_suffixes_skip_names_of_other_inputs(self):
+        inputs = [Path("x/cgi.pdf"), Path("y/cgi.pdf"), Path("z/cgi-2.pdf"), Path("z/CGI.txt")]
+        names = [d.name for d in output_namespaces(inputs, "out")]
+        self.assertEqual(names, ["cgi", "cgi-3", "cgi-2", "CGI-4"])
+
+    def test_table_cache_keeps_every_worker_entries(self):
+        for name in ("a.pdf", "b.pdf"):
+            document = fitz.open()
+            for n in range(3):
+                document.new_page().insert_text((72, 72), f"Article {n + 1}.- {name} page {n}")
+            document.save(str(self.root / name))
+            document.close()
+        cache = self.root / "tables.json"
+        args = argparse.Namespace(output=str(self.root / "out"), debug=False, log_file="", table_cache=str(cache),
+                                  workers=2, profile=False, articles="jsonl", wordlist=None)
+        self.assertTrue(run_batch(find_inputs(os.path.join(self.tmp.name, "*.pdf")), args,
+                                  logging.getLogger("test")))
+        # the pages after each document's first (read as its table of contents), from both workers
+        self.assertEqual(len(json.loads(cache.read_text(encoding="utf-8"))), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from src.preprocessor.boilerplate import BoilerplateDetector, PAGE_BREAK
+
+def page(num, body):
+    return (f"{num}\nRecueil des lois\nLes dispositions suivantes s'appliquent à compter du {num} janvier.\n"
+            f"{body}\nElles sont reprises dans le texte consolidé.\nÉdition 2025 - page {num}")
+
+class TestBoilerplateDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.detector = BoilerplateDetector()
+
+    def test_strips_running_headers_and_footers(self):
+        text = PAGE_BREAK.join(page(n, f"Texte propre à la page {n}.") for n in range(1, 6))
+        cleaned = self.detector.strip(text)
+        self.assertNotIn("Recueil des lois", cleaned)
+        self.assertNotIn("Édition 2025", cleaned)
+        self.assertNotIn(PAGE_BREAK, cleaned)
+        for n in range(1, 6):
+            self.assertIn(f"Texte propre à la page {n}.", cleaned)
+
+    def test_keeps_first_occurrence_of_repeated_heading(self):
+        pages = [f"TITRE PREMIER.- IMPÔT SUR LES SOCIÉTÉS\nLe paragraphe {n} précise le champ d'application.\n"
+                 f"Les exonérations sont prévues à l'article {n + 6}." for n in range(4)]
+        cleaned = self.detector.strip(PAGE_BREAK.join(pages))
+        self.assertEqual(cleaned.count("TITRE PREMIER"), 1)
+        self.assertIn("Le paragraphe 3 précise", cleaned)
+
+    def test_long_lines_differing_by_numbers_are_kept(self):
+        pages = [f"Corps {n}\n{n} Article {n} de la loi de finances n° {n}-24 pour l'année budgétaire 2025"
+                 for n in range(1, 6)]
+        cleaned = self.detector.strip(PAGE_BREAK.join(pages))
+        self.assertIn("5 Article 5 de la loi de finances", cleaned)
+
+    def test_patterns_apply_without_page_breaks(self):
+        text = "Article 1.- Objet\n12\nCODE GÉNÉRAL DES IMPÔTS\nLe présent code."
+        self.assertEqual(self.detector.strip(text), "Article 1.- Objet\nLe présent code.")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import tempfile
+import unittest
+from pathlib import Path
+import fitz
+from src.preprocessor.document_pool import DocumentPool, LRUCache
+
+def write_pdf(path, texts):
+    document = fitz.open()
+    for text in texts:
+        document.new_page().insert_text((72, 72), text)
+    document.save(path)
+    document.close()
+
+class TestDocumentPool(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = str(Path(self.tmp.name) / "code.pdf")
+        write_pdf(self.path, ["TITRE PREMIER", "Article 1.- Objet"])
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_documents_and_pages_are_reused(self):
+        with DocumentPool() as pool:
+            with pool.open(self.path) as first:
+                self.assertEqual(pool.page_text(first, 1), first[1].get_text("text"))
+            with pool.open(self.path) as second:
+                self.assertIs(second, first)
+                pool.page_text(second, 1)
+            self.assertEqual(pool.hit_rates(), {'documents': 0.5, 'pages': 0.5, 'textpages': 0.5})
+        self.assertTrue(first.is_closed)
+
+    def test_idle_documents_beyond_the_limit_are_closed(self):
+        pool = DocumentPool(max_documents=0)
+        with pool.open(self.path) as document:
+            pool.page(document, 0)
+            self.assertFalse(document.is_closed)
+        self.assertTrue(document.is_closed)
+        self.assertEqual(len(pool.pages), 0)
+
+    def test_changed_file_is_reopened(self):
+        with DocumentPool() as pool:
+            with pool.open(self.path) as old:
+                pass
+            write_pdf(self.path, ["TITRE II", "Article 2.- Champ", "Article 3.- Taux"])
+            with pool.open(self.path) as new:
+                self.assertEqual(len(new), 3)
+            self.assertTrue(old.is_closed)
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(2)
+        for key in ("a", "b", "a", "c"):
+            cache.get(key, lambda: key.upper())
+        self.assertEqual(cache.get("b", lambda: "reloaded"), "reloaded")
+        self.assertEqual((cache.hits, cache.misses), (1, 4))
+
+if __name__ == '__main__':
+    unittest.main()
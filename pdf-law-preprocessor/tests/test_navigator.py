@@ -0,0 +1,59 @@
+import unittest
+from src.preprocessor.navigator import DocumentNavigator
+
+class FakePage:
+    def __init__(self, text, document):
+        self.text = text
+        self.document = document
+
+    def get_text(self, option="text"):
+        self.document.renders += 1
+        return self.text
+
+class FakeDocument:
+    def __init__(self, texts, toc=None, names=None):
+        self.pages = [FakePage(text, self) for text in texts]
+        self.toc = toc or []
+        self.names = names or {}
+        self.renders = 0
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __getitem__(self, page_num):
+        return self.pages[page_num]
+
+    def get_toc(self):
+        return self.toc
+
+    def resolve_names(self):
+        return self.names
+
+class TestDocumentNavigator(unittest.TestCase):
+
+    def test_uses_outline_without_rendering(self):
+        document = FakeDocument(["x"] * 10, toc=[[1, "Sommaire", 2], [1, "Article premier", 6]])
+        navigator = DocumentNavigator(document)
+        self.assertEqual(navigator.find_toc_end_page(), 4)
+        self.assertEqual(document.renders, 0)
+
+    def test_uses_named_destinations(self):
+        document = FakeDocument(["x"] * 10, names={"titre_premier": {"page": 3}})
+        self.assertEqual(DocumentNavigator(document).find_toc_end_page(), 2)
+
+    def test_text_index_renders_each_page_once(self):
+        texts = ["Préface", "TABLE DES MATIÈRES", "suite", "TITRE PREMIER", "corps"]
+        document = FakeDocument(texts)
+        navigator = DocumentNavigator(document)
+        self.assertEqual(navigator.find_toc_end_page(), 2)
+        self.assertEqual(navigator.pages_with("TITRE PREMIER"), [3])
+        self.assertEqual(document.renders, len(texts))
+        self.assertEqual(navigator.page_text(3), "TITRE PREMIER")
+        self.assertEqual(document.renders, len(texts))
+
+    def test_no_markers(self):
+        document = FakeDocument(["a", "b", "c"])
+        self.assertEqual(DocumentNavigator(document).find_toc_end_page(), 0)
+
+if __name__ == '__main__':
+    unittest.main()
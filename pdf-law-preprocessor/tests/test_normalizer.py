@@ -0,0 +1,34 @@
+import unittest
+import unicodedata
+from src.preprocessor.normalizer import TextNormalizer
+
+class TestTextNormalizer(unittest.TestCase):
+
+    def setUp(self):
+        self.normalizer = TextNormalizer()
+
+    def test_maps_typographic_characters(self):
+        text = "Article\u00a01\u2019objet \u2013 \u2022 la \ufb01scalit\u00e9\u2026"
+        self.assertEqual(self.normalizer.normalize(text), "Article 1'objet - - la fiscalité...")
+
+    def test_composes_accents(self):
+        decomposed = unicodedata.normalize('NFD', "exonération")
+        self.assertEqual(self.normalizer.normalize(decomposed), "exonération")
+
+    def test_real_words_are_not_rewritten(self):
+        text = "Le gouvernement interne fixe le taux moderne. Article II."
+        self.assertEqual(self.normalizer.normalize(text), text)
+
+    def test_fixes_confusions_confirmed_by_the_document(self):
+        text = "Le montant est versé. Le montant est dû. Le rnontant est fixé. C0DE et CODE et CODE."
+        normalized = self.normalizer.normalize(text)
+        self.assertEqual(normalized.count("montant"), 3)
+        self.assertIn("CODE et CODE et CODE", normalized)
+
+    def test_fixes_confusions_confirmed_by_the_wordlist(self):
+        normalizer = TextNormalizer(wordlist={"moderne"})
+        self.assertEqual(normalizer.normalize("Un régime rnoderne."), "Un régime moderne.")
+        self.assertEqual(normalizer.stats['words_fixed'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+from src.utils.profiling import PipelineProfiler, resource
+
+class TestPipelineProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.profiler = PipelineProfiler()
+
+    def test_stage_accumulates_calls(self):
+        with self.profiler.stage("write", bytes_in=10) as stage:
+            stage["bytes_out"] = 5
+        with self.profiler.stage("write", bytes_in=20) as stage:
+            stage["bytes_out"] = 7
+        record = self.profiler.stages["write"]
+        self.assertEqual(record["calls"], 2)
+        self.assertEqual(record["bytes_in"], 30)
+        self.assertEqual(record["bytes_out"], 12)
+        self.assertGreaterEqual(record["wall_time"], 0)
+
+    @unittest.skipIf(resource is None, "resource is not available")
+    def test_rss_reports_growth_not_lifetime_peak(self):
+        # touch more than the process peak so far, whatever earlier tests allocated
+        size = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss + 16 * 1024) * 1024
+        with self.profiler.stage("extract"):
+            grown = bytearray(size)
+            grown[::4096] = b"x" * len(grown[::4096])
+        del grown
+        with self.profiler.stage("clean"):
+            pass
+        self.assertGreater(self.profiler.stages["extract"]["rss_growth_kb"], 0)
+        self.assertEqual(self.profiler.stages["clean"]["rss_growth_kb"], 0)
+
+    def test_page_histogram(self):
+        self.profiler.record_page("extract", 0, 0.001)
+        self.profiler.record_page("extract", 1, 0.2)
+        self.profiler.record_page("extract", 2, 5.0)
+        histogram = self.profiler.page_histogram("extract")
+        self.assertEqual(histogram["<5ms"], 1)
+        self.assertEqual(histogram["<250ms"], 1)
+        self.assertEqual(histogram[">=2500ms"], 1)
+
+    def test_slowest_pages_reported(self):
+        self.profiler.record_page("extract", 4, 0.5)
+        self.profiler.record_page("extract", 9, 1.5)
+        metrics = self.profiler.to_dict()
+        self.assertEqual(metrics["pages"]["extract"]["slowest"][0]["page"], 10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+from src.parsers.table_parser import TableParser
+
+class TestTableParser(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = TableParser()
+
+    def test_parse_table_handles_merged_cells(self):
+        table = [
+            ["Tranches\n(en dirhams)", None, "Montant"],
+            ["Moins de 500", None, " 300 "],
+        ]
+        expected = [
+            ["Tranches (en dirhams)", "Montant"],
+            ["Moins de 500", "300"],
+        ]
+        self.assertEqual(self.parser.parse_table(table), expected)
+
+    def test_parse_table_drops_empty_rows(self):
+        table = [["", None], ["Taux", "10%"], [None, None]]
+        self.assertEqual(self.parser.parse_table(table), [["Taux", "10%"]])
+
+    def test_parse_empty_table(self):
+        self.assertEqual(self.parser.parse_table([]), [])
+
+if __name__ == '__main__':
+    unittest.main()
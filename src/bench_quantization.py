@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Measure what int8 / binary quantisation costs in recall on the questions of
+updated_questions.json, against exact float32 search over the same chunks.
+
+recall@k here is the overlap between the quantised top-k and the exact
+top-k, i.e. the loss caused by quantisation alone.
+
+Usage
+-----
+python bench_quantization.py --model louisbrulenaudet/lemone-gte-embed-max
+python bench_quantization.py --model sentence-transformers/all-MiniLM-L6-v2 --index ./index_minilm
+
+pip install numpy sentence-transformers
+"""
+from __future__ import annotations
+import argparse, json, time
+from pathlib import Path
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from quantization import QuantizedIndex
+from structure_chunker import chunk_structure
+# ────────────────────────────────────────────────────────────────────────────
+STRUCTURE_PATH = Path("cgi_structure.json")
+QUESTIONS_PATH = Path("updated_questions.json")
+MODEL_NAME     = "louisbrulenaudet/lemone-gte-embed-max"
+INDEX_DIR      = Path("./index")
+KS             = (1, 2, 4, 10)
+MODES          = ("float", "int8", "binary")
+# ────────────────────────────────────────────────────────────────────────────
+
+def build_or_load(model, index_dir: Path, chunks: list[dict]) -> QuantizedIndex:
+    """Reuse a saved index when it was built from the same chunk ids."""
+    ids = [c["id"] for c in chunks]
+    if (index_dir / "ids.json").exists():
+        index = QuantizedIndex.load(index_dir)
+        if index.ids == ids:
+            return index
+    vectors = model.encode([c["text"] for c in chunks], batch_size=32,
+                           normalize_embeddings=True, show_progress_bar=True)
+    index = QuantizedIndex(np.asarray(vectors, dtype=np.float32), ids)
+    index.save(index_dir)
+    return QuantizedIndex.load(index_dir)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--model", default=MODEL_NAME)
+    ap.add_argument("--index", type=Path, default=INDEX_DIR)
+    ap.add_argument("--structure", type=Path, default=STRUCTURE_PATH)
+    ap.add_argument("--questions", type=Path, default=QUESTIONS_PATH)
+    ap.add_argument("--output", type=Path, default=Path("bench_quantization.json"))
+    args = ap.parse_args()
+
+    model  = SentenceTransformer(args.model, trust_remote_code=True)
+    chunks = chunk_structure(json.loads(args.structure.read_text(encoding="utf-8")))
+    index  = build_or_load(model, args.index, chunks)
+
+    questions = [q["question"] for q in json.loads(args.questions.read_text(encoding="utf-8"))["questions"]]
+    queries   = model.encode(questions, normalize_embeddings=True)
+
+    k_max   = max(KS)
+    results = {"model": args.model, "chunks": len(index), "queries": len(questions),
+               "bytes": index.nbytes(), "modes": {}}
+    exact   = [[i for i, _ in index.search(q, k_max, "float")] for q in queries]
+
+    for mode in MODES:
+        latencies, hits = [], []
+        for q in queries:
+            t0 = time.perf_counter()
+            hits.append([i for i, _ in index.search(q, k_max, mode)])
+            latencies.append(time.perf_counter() - t0)
+        recall = {
+            f"recall@{k}": float(np.mean([len(set(h[:k]) & set(e[:k])) / k for h, e in zip(hits, exact)]))
+            for k in KS
+        }
+        results["modes"][mode] = {**recall, "mean_latency_ms": 1000 * float(np.mean(latencies))}
+
+    args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    print(f"{results['chunks']} chunks, {results['queries']} queries – {args.model}")
+    print("  bytes: " + ", ".join(f"{m}={b / 1e6:.1f} MB" for m, b in results["bytes"].items()))
+    for mode, row in results["modes"].items():
+        cols = "  ".join(f"{k}={v:.3f}" for k, v in row.items())
+        print(f"  {mode:<7} {cols}")
+
+if __name__ == "__main__":
+    main()
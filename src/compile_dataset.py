@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compile generated Q/A records into a pre-tokenised, packed training set.
+
+1. read records from merge_hint.py ({"data": [{prompt, completion}]}) and/or
+   fine_tuning_dataset_build.py ({"questions": [{question, answer}]}) output
+2. drop near-duplicate questions (MinHash, see near_dedup.py)
+3. tokenise every conversation once with the target tokenizer's chat template
+4. pack the sequences into fixed-length bins (first-fit decreasing)
+5. write the bins as .npy files the notebook memory-maps directly
+
+Output directory
+----------------
+input_ids.npy     int32  (bins, seq_len)   pad_token_id after the last sequence
+labels.npy        int32  (bins, seq_len)   -100 on prompts and padding
+position_ids.npy  int32  (bins, seq_len)   restart at 0 for every packed sequence
+meta.json         tokenizer, seq_len, counts, padding ratio
+
+In the notebook:
+
+    ids = np.load("packed/input_ids.npy", mmap_mode="r")
+    dataset = Dataset.from_dict({"input_ids": ids, "labels": ..., "position_ids": ...})
+
+Usage
+-----
+python compile_dataset.py finetuning_dataset.json merge_hint_dataset.json --tokenizer unsloth/Llama-3.2-3B-Instruct
+
+pip install numpy transformers
+"""
+from __future__ import annotations
+import argparse, json, re
+from pathlib import Path
+import numpy as np
+
+from near_dedup import near_duplicate_groups
+# ────────────────────────────────────────────────────────────────────────────
+TOKENIZER  = "unsloth/Llama-3.2-3B-Instruct"
+SEQ_LEN    = 4096          # max_seq_length of the training notebook
+THRESHOLD  = 0.8           # question similarity above which records are merged
+OUTPUT_DIR = Path("packed")
+IGNORE     = -100
+# ────────────────────────────────────────────────────────────────────────────
+# merge_hint.py prompts end with "Question : …\n\nRéponse :"
+QUESTION_RX = re.compile(r"Question\s*:\s*(.+?)\s*Réponse\s*:\s*$", re.S)
+
+
+def load_records(paths: list[Path]) -> list[dict]:
+    """[{question, answer, source}] from either generator's output format."""
+    records = []
+    for path in paths:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        for item in data.get("questions", []):
+            records.append({"question": item.get("question", ""), "answer": item.get("answer", ""),
+                            "source": path.name})
+        for item in data.get("data", []):
+            m = QUESTION_RX.search(item.get("prompt", ""))
+            records.append({"question": m.group(1) if m else item.get("prompt", ""),
+                            "answer": item.get("completion", "").strip(), "source": path.name})
+    # generation failures are not training data
+    return [r for r in records if r["question"].strip() and r["answer"].strip()
+            and not r["answer"].startswith(("Error:", "[ERREUR]"))]
+
+
+def dedupe(records: list[dict], threshold: float = THRESHOLD) -> list[dict]:
+    """Keep the record with the longest answer of each near-duplicate question group."""
+    groups = near_duplicate_groups([r["question"] for r in records], threshold=threshold)
+    return [records[max(g, key=lambda i: len(records[i]["answer"]))] for g in groups]
+
+
+def tokenize(tokenizer, record: dict) -> tuple[list[int], int]:
+    """Token ids of the whole conversation and the length of its prompt part."""
+    convo = [{"role": "user", "content": record["question"]},
+             {"role": "assistant", "content": record["answer"]}]
+    if getattr(tokenizer, "chat_template", None):
+        prompt = tokenizer.apply_chat_template(convo[:1], tokenize=True, add_generation_prompt=True)
+        ids    = tokenizer.apply_chat_template(convo, tokenize=True, add_generation_prompt=False)
+        if hasattr(ids, "keys"):                                  # BatchEncoding on newer transformers
+            prompt, ids = prompt["input_ids"], ids["input_ids"]
+    else:
+        prompt = tokenizer(record["question"] + "\n")["input_ids"]
+        ids    = prompt + tokenizer(record["answer"], add_special_tokens=False)["input_ids"]
+        if tokenizer.eos_token_id is not None:
+            ids = ids + [tokenizer.eos_token_id]
+    return list(ids), len(prompt)
+
+
+def pack(lengths: list[int], seq_len: int) -> list[list[int]]:
+    """First-fit decreasing: indices of the sequences in each bin."""
+    bins, free = [], []
+    for i in sorted(range(len(lengths)), key=lambda i: -lengths[i]):
+        for b, room in enumerate(free):
+            if lengths[i] <= room:
+                bins[b].append(i)
+                free[b] -= lengths[i]
+                break
+        else:
+            bins.append([i])
+            free.append(seq_len - lengths[i])
+    return bins
+
+
+def write_packed(sequences: list[tuple[list[int], int]], seq_len: int, pad_id: int,
+                 out_dir: Path) -> dict:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    bins  = pack([len(ids) for ids, _ in sequences], seq_len)
+    shape = (len(bins), seq_len)
+    arrays = {
+        name: np.lib.format.open_memmap(out_dir / f"{name}.npy", mode="w+", dtype=np.int32, shape=shape)
+        for name in ("input_ids", "labels", "position_ids")
+    }
+    arrays["input_ids"][:] = pad_id
+    arrays["labels"][:] = IGNORE
+    arrays["position_ids"][:] = 0
+
+    for b, members in enumerate(bins):
+        pos = 0
+        for i in members:
+            ids, n_prompt = sequences[i]
+            end = pos + len(ids)
+            arrays["input_ids"][b, pos:end] = ids
+            arrays["labels"][b, pos + n_prompt:end] = ids[n_prompt:]
+            arrays["position_ids"][b, pos:end] = np.arange(len(ids))
+            pos = end
+    for arr in arrays.values():
+        arr.flush()
+
+    used = sum(len(ids) for ids, _ in sequences)
+    return {"bins": len(bins), "tokens": used, "padding_ratio": 1 - used / max(len(bins) * seq_len, 1)}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Dedupe, tokenise and pack generated Q/A records")
+    ap.add_argument("inputs", type=Path, nargs="+")
+    ap.add_argument("--tokenizer", default=TOKENIZER)
+    ap.add_argument("--seq-len", type=int, default=SEQ_LEN)
+    ap.add_argument("--threshold", type=float, default=THRESHOLD)
+    ap.add_argument("--output", type=Path, default=OUTPUT_DIR)
+    args = ap.parse_args()
+
+    from transformers import AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(args.tokenizer)
+    pad_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+
+    records = load_records(args.inputs)
+    unique  = dedupe(records, args.threshold)
+
+    sequences, truncated = [], 0
+    for record in unique:
+        ids, n_prompt = tokenize(tokenizer, record)
+        if len(ids) > args.seq_len:
+            ids, truncated = ids[:args.seq_len], truncated + 1
+        sequences.append((ids, min(n_prompt, len(ids))))
+
+    stats = write_packed(sequences, args.seq_len, pad_id, args.output)
+    meta  = {"tokenizer": args.tokenizer, "seq_len": args.seq_len, "pad_token_id": pad_id,
+             "records": len(records), "deduplicated": len(records) - len(unique),
+             "sequences": len(sequences), "truncated": truncated, **stats,
+             "sources": sorted({r["source"] for r in unique})}
+    (args.output / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    print(f"{len(records)} records → {len(unique)} after dedup → {stats['bins']} bins of "
+          f"{args.seq_len} tokens ({stats['padding_ratio']:.1%} padding) in {args.output}")
+
+if __name__ == "__main__":
+    main()
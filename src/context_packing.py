@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Assemble retrieved passages into a prompt context under a word budget.
+
+    passages = from_chroma(results)        # or any [{text, score, group, position, header?}]
+    spans, stats = pack_context(passages, budget=1500)
+
+Steps
+-----
+1. best score first; passages contained in an already kept one are dropped
+2. the text a passage shares with a kept neighbour (page overlap, repeated
+   sentences at chunk borders) is cut off
+3. passages are kept while they fit the budget; a passage that does not fit
+   is skipped so a smaller, lower-scored one can still use the space
+4. kept passages of the same group (article, source file) at consecutive
+   positions (chunk index, page) are merged into one span, in reading order
+
+`stats` carries the size of the packed spans (`words`) and what was dropped.
+Sizes are `count_words` counts (words and punctuation marks), only an
+approximation of model tokens; pass `count=` to measure with a real
+tokenizer instead.
+"""
+from __future__ import annotations
+from typing import Callable
+
+from structure_chunker import count_words
+# ────────────────────────────────────────────────────────────────────────────
+BUDGET      = 1500       # words of context per prompt
+MIN_OVERLAP = 20         # shortest shared edge (chars) treated as overlap
+MAX_OVERLAP = 1000       # longest edge compared
+# ────────────────────────────────────────────────────────────────────────────
+
+def _norm(text: str) -> str:
+    return " ".join(text.split())
+
+
+def overlap(a: str, b: str) -> int:
+    """Length of the longest suffix of `a` that is a prefix of `b` (0 below MIN_OVERLAP)."""
+    for size in range(min(len(a), len(b), MAX_OVERLAP), MIN_OVERLAP - 1, -1):
+        if a.endswith(b[:size]):
+            return size
+    return 0
+
+
+def from_chroma(results: dict, query: int = 0) -> list[dict]:
+    """Passages of one query of a Chroma result (documents + optional metadatas/distances)."""
+    docs  = results["documents"][query]
+    metas = (results.get("metadatas") or [[None] * len(docs)])[query]
+    dists = (results.get("distances") or [[float(i) for i in range(len(docs))]])[query]
+    return [{"text": doc, "score": -dist,
+             "group": (meta or {}).get("source"), "position": (meta or {}).get("page")}
+            for doc, meta, dist in zip(docs, metas, dists)]
+
+
+def from_chunks(chunks: list[dict], scores: list[float]) -> list[dict]:
+    """Passages from structure_chunker chunks: one article per group, its path as header."""
+    return [{"text": c["body"], "score": s, "group": c["id"].split("#")[0],
+             "position": c["chunk_index"], "header": c["path"]}
+            for c, s in zip(chunks, scores)]
+
+
+def _trim(p: dict, neighbour: dict) -> int:
+    """Cut the text `p` shares with a neighbour of the same group; return chars removed."""
+    head = overlap(neighbour["text"], p["text"])          # neighbour ends where p starts
+    if head and p["text"][head:].strip():
+        p["text"] = p["text"][head:].lstrip()
+        return head
+    tail = overlap(p["text"], neighbour["text"])          # p ends where neighbour starts
+    if tail and p["text"][:-tail].strip():
+        p["text"] = p["text"][:-tail].rstrip()
+        return tail
+    return 0
+
+
+def pack_context(passages: list[dict], budget: int = BUDGET,
+                 count: Callable[[str], int] = count_words) -> tuple[list[str], dict]:
+    """Return the packed spans (best first) and packing stats."""
+    ranked = sorted((dict(p, text=_norm(p["text"])) for p in passages if p["text"].strip()),
+                    key=lambda p: -p["score"])
+    kept, used = [], 0
+    stats = {"passages": len(passages), "duplicates": 0, "over_budget": 0, "trimmed_chars": 0}
+
+    for p in ranked:
+        if any(p["text"] in k["text"] for k in kept):
+            stats["duplicates"] += 1
+            continue
+        same = [k for k in kept if p["group"] is not None and k["group"] == p["group"]]
+        for k in same:
+            stats["trimmed_chars"] += _trim(p, k)
+        size = count(p["text"]) + (count(p["header"]) if p.get("header") and not same else 0)
+        if used + size > budget:
+            stats["over_budget"] += 1
+            continue
+        kept.append(p)
+        used += size
+
+    # merge consecutive positions of the same group; spans ordered by their best score
+    spans: list[list[dict]] = []
+    for p in sorted(kept, key=lambda p: (p["group"] is None, str(p["group"]), p["position"] or 0)):
+        last = spans[-1][-1] if spans else None
+        if (last and p["group"] is not None and p["group"] == last["group"]
+                and p["position"] is not None and last["position"] is not None
+                and p["position"] - last["position"] == 1):
+            spans[-1].append(p)
+        else:
+            spans.append([p])
+    spans.sort(key=lambda span: -max(p["score"] for p in span))
+
+    texts = [(f"{span[0]['header']}\n" if span[0].get("header") else "") + " ".join(p["text"] for p in span)
+             for span in spans]
+    stats.update(kept=len(kept), spans=len(spans), words=sum(count(t) for t in texts))
+    return texts, stats
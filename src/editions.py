@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Versioned, content-addressed store of CGI editions.
+
+Every edition of the code is added from its cgi_structure.json. Article texts
+are stored once under sha1(content), so an article that did not change
+between two editions costs one row in the edition's manifest, not a copy.
+The vector index works the same way: chunks are indexed in Chroma under the
+hash of their text and flagged with the editions that contain them
+(`edition_2025: True`). Indexing a new edition only embeds the chunks no
+earlier edition had, and queries filter on the flag.
+
+Articles are matched across editions by key: their number ("6", "161 bis"),
+scoped by TITRE > CHAPITRE when the number also appears in another part of
+the code (annexed decrees restart at article 1).
+
+Usage
+-----
+python editions.py add 2025 cgi_structure.json
+python editions.py add 2026 cgi_structure_2026.json
+python editions.py list
+python editions.py diff 2025 2026 --output diff_2025_2026.json
+python editions.py index 2026                     # embeds only new or changed chunks
+python editions.py search "taux de l'IS" --edition 2026
+python editions.py export 2025 cgi_structure_2025.json
+
+pip install chromadb sentence-transformers
+"""
+from __future__ import annotations
+import argparse, difflib, hashlib, json, re, sqlite3, time
+from collections import Counter
+from pathlib import Path
+
+from structure_chunker import article_number, chunk_structure, clean_heading
+# ────────────────────────────────────────────────────────────────────────────
+STORE_PATH   = Path("editions.sqlite")
+DB_PATH      = "./db"
+COLLECTION   = "cgi_editions"
+MODEL_NAME   = "louisbrulenaudet/lemone-gte-embed-max"
+ENCODE_BATCH = 32
+UPSERT_BATCH = 256
+N_RESULTS    = 5
+# ────────────────────────────────────────────────────────────────────────────
+EDITION_RX = re.compile(r"^[\w.-]+$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects  (hash TEXT PRIMARY KEY, content TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS editions (name TEXT PRIMARY KEY, source TEXT, added REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS articles (
+    edition  TEXT NOT NULL,
+    key      TEXT NOT NULL,
+    ordinal  INTEGER NOT NULL,
+    titre    TEXT NOT NULL,
+    chapitre TEXT NOT NULL,
+    id       TEXT NOT NULL,
+    name     TEXT NOT NULL,
+    hash     TEXT NOT NULL REFERENCES objects(hash),
+    PRIMARY KEY (edition, key)
+);
+"""
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def edition_flag(edition: str) -> str:
+    """Chroma metadata key marking the chunks of an edition."""
+    return f"edition_{edition}"
+
+
+def article_keys(structure: list) -> list[tuple]:
+    """(key, titre, chapitre, article) for every article, in document order.
+
+    The key is the article number when it is unique in the edition. Numbers
+    that restart in annexed texts are scoped by TITRE > CHAPITRE, and counted
+    within that scope if they still repeat, so one insertion or deletion does
+    not shift the keys of unrelated articles.
+    """
+    entries = [(article_number(a["id"]) or a["id"], t["titre"], c["chapitre"], a)
+               for t in structure for c in t["chapitres"] for a in c["articles"]]
+    numbers = Counter(number for number, *_ in entries)
+    seen, out = Counter(), []
+    for number, titre, chapitre, a in entries:
+        key = number
+        if numbers[number] > 1:
+            key = f"{number}@{clean_heading(titre)} > {clean_heading(chapitre)}"
+            seen[key] += 1
+            if seen[key] > 1:
+                key = f"{key}#{seen[key]}"
+        out.append((key, titre, chapitre, a))
+    return out
+
+
+class EditionStore:
+    """SQLite manifests of editions over a shared, content-addressed article store."""
+
+    def __init__(self, path: Path | str = STORE_PATH):
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript(SCHEMA)
+
+    def editions(self) -> list[str]:
+        return [r[0] for r in self.conn.execute("SELECT name FROM editions ORDER BY name")]
+
+    def add(self, edition: str, structure: list, source: str = "") -> dict:
+        """Store an edition (replacing any previous version of it) and return counts."""
+        if not EDITION_RX.match(edition):
+            raise ValueError(f"edition names are letters, digits, '.', '-' or '_': {edition!r}")
+        rows, objects = [], {}
+        for ordinal, (key, titre, chapitre, a) in enumerate(article_keys(structure)):
+            h = content_hash(a["content"])
+            objects[h] = a["content"]
+            rows.append((edition, key, ordinal, titre, chapitre, a["id"], a["name"], h))
+
+        with self.conn:
+            before = self.conn.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+            self.conn.execute("DELETE FROM articles WHERE edition = ?", (edition,))
+            self.conn.executemany("INSERT OR IGNORE INTO objects VALUES (?, ?)", objects.items())
+            self.conn.executemany("INSERT INTO articles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("INSERT OR REPLACE INTO editions VALUES (?, ?, ?)", (edition, source, time.time()))
+            after = self.conn.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+        return {"articles": len(rows), "new_objects": after - before}
+
+    def manifest(self, edition: str) -> dict[str, dict]:
+        """key → {ordinal, titre, chapitre, id, name, hash} of an edition."""
+        cur = self.conn.execute("SELECT key, ordinal, titre, chapitre, id, name, hash FROM articles "
+                                "WHERE edition = ? ORDER BY ordinal", (edition,))
+        cols = ("ordinal", "titre", "chapitre", "id", "name", "hash")
+        manifest = {r[0]: dict(zip(cols, r[1:])) for r in cur}
+        if not manifest and edition not in self.editions():
+            raise KeyError(f"unknown edition: {edition}")
+        return manifest
+
+    def content(self, h: str) -> str:
+        return self.conn.execute("SELECT content FROM objects WHERE hash = ?", (h,)).fetchone()[0]
+
+    def structure(self, edition: str) -> list:
+        """Rebuild the cgi_structure.json tree of an edition."""
+        tree = []
+        for entry in self.manifest(edition).values():
+            if not tree or tree[-1]["titre"] != entry["titre"]:
+                tree.append({"titre": entry["titre"], "chapitres": []})
+            chapitres = tree[-1]["chapitres"]
+            if not chapitres or chapitres[-1]["chapitre"] != entry["chapitre"]:
+                chapitres.append({"chapitre": entry["chapitre"], "articles": []})
+            chapitres[-1]["articles"].append({"id": entry["id"], "name": entry["name"],
+                                              "content": self.content(entry["hash"])})
+        return tree
+
+    def stats(self) -> dict:
+        stored = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(content)), 0) FROM objects").fetchone()
+        logical = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(o.content)), 0) "
+                                    "FROM articles a JOIN objects o ON o.hash = a.hash").fetchone()
+        per_edition = dict(self.conn.execute("SELECT edition, COUNT(*) FROM articles GROUP BY edition"))
+        return {"editions": per_edition, "objects": stored[0], "stored_chars": stored[1],
+                "articles": logical[0], "logical_chars": logical[1]}
+
+    def close(self):
+        self.conn.close()
+# ---------------------------------------------------------------------------
+
+def diff_editions(store: EditionStore, old: str, new: str, text: bool = False) -> dict:
+    """Article-level changes from edition `old` to edition `new`."""
+    a, b = store.manifest(old), store.manifest(new)
+    report = {"from": old, "to": new, "added": [], "removed": [], "modified": [], "moved": [],
+              "unchanged": 0}
+    for key, entry in b.items():
+        if key not in a:
+            report["added"].append({"key": key, "id": entry["id"], "name": entry["name"]})
+    for key, entry in a.items():
+        if key not in b:
+            report["removed"].append({"key": key, "id": entry["id"], "name": entry["name"]})
+            continue
+        other = b[key]
+        if entry["hash"] != other["hash"]:
+            before, after = store.content(entry["hash"]).split(), store.content(other["hash"]).split()
+            change = {"key": key, "id": other["id"], "name": other["name"],
+                      "similarity": round(difflib.SequenceMatcher(None, before, after, autojunk=False).ratio(), 3),
+                      "words": len(after) - len(before)}
+            if text:
+                change["diff"] = list(difflib.unified_diff(
+                    store.content(entry["hash"]).splitlines(), store.content(other["hash"]).splitlines(),
+                    f"{old}/{entry['id']}", f"{new}/{other['id']}", lineterm=""))
+            report["modified"].append(change)
+        else:
+            report["unchanged"] += 1
+        if (entry["titre"], entry["chapitre"]) != (other["titre"], other["chapitre"]):
+            report["moved"].append({"key": key, "id": other["id"],
+                                    "from": [entry["titre"], entry["chapitre"]],
+                                    "to": [other["titre"], other["chapitre"]]})
+    return report
+# ---------------------------------------------------------------------------
+
+def open_collection(db_path: str = DB_PATH, name: str = COLLECTION):
+    import chromadb
+    return chromadb.PersistentClient(path=db_path).get_or_create_collection(name=name)
+
+
+def index_edition(store: EditionStore, edition: str, collection, embedder,
+                  batch_size: int = ENCODE_BATCH) -> dict:
+    """Flag the chunks of an edition in Chroma, embedding only texts not indexed yet."""
+    flag   = edition_flag(edition)
+    chunks = {content_hash(c["text"]): c for c in chunk_structure(store.structure(edition))}
+    ids    = list(chunks)
+
+    existing = {}
+    for i in range(0, len(ids), UPSERT_BATCH):
+        got = collection.get(ids=ids[i:i + UPSERT_BATCH], include=["metadatas"])
+        existing.update(zip(got["ids"], got["metadatas"]))
+
+    # Chunks shared with another edition keep their vector and gain this edition's flag
+    shared = [h for h, meta in existing.items() if not meta.get(flag)]
+    for i in range(0, len(shared), UPSERT_BATCH):
+        batch = shared[i:i + UPSERT_BATCH]
+        collection.update(ids=batch, metadatas=[{**existing[h], flag: True} for h in batch])
+
+    new = [h for h in ids if h not in existing]
+    for i in range(0, len(new), UPSERT_BATCH):
+        batch = new[i:i + UPSERT_BATCH]
+        docs  = [chunks[h]["text"] for h in batch]
+        vecs  = embedder.encode(docs, batch_size=batch_size, show_progress_bar=False)
+        collection.add(ids=batch, embeddings=[v.tolist() for v in vecs], documents=docs, metadatas=[
+            {"article": chunks[h]["article"], "path": chunks[h]["path"],
+             "chunk_index": chunks[h]["chunk_index"], flag: True}
+            for h in batch
+        ])
+
+    # Chunks this edition no longer contains lose its flag (re-indexing a replaced edition)
+    stale = collection.get(where={flag: True}, include=["metadatas"])
+    dropped = [(h, meta) for h, meta in zip(stale["ids"], stale["metadatas"]) if h not in chunks]
+    for i in range(0, len(dropped), UPSERT_BATCH):
+        batch = dropped[i:i + UPSERT_BATCH]
+        collection.update(ids=[h for h, _ in batch],
+                          metadatas=[{**meta, flag: False} for _, meta in batch])
+
+    return {"chunks": len(ids), "embedded": len(new), "reused": len(existing), "unflagged": len(dropped)}
+
+
+def search(collection, embedder, query: str, edition: str | None = None, n_results: int = N_RESULTS) -> dict:
+    """Chroma query restricted to one edition's chunks."""
+    where = {edition_flag(edition): True} if edition else None
+    vec = embedder.encode([query], show_progress_bar=False)[0]
+    return collection.query(query_embeddings=[vec.tolist()], n_results=n_results, where=where)
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Versioned, content-addressed CGI editions")
+    ap.add_argument("--store", type=Path, default=STORE_PATH)
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--collection", default=COLLECTION)
+    ap.add_argument("--model", default=MODEL_NAME)
+    sub = ap.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("add", help="store an edition from its cgi_structure.json")
+    p.add_argument("edition")
+    p.add_argument("structure", type=Path)
+    sub.add_parser("list", help="editions and storage shared between them")
+    p = sub.add_parser("diff", help="article-level diff between two editions")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--text", action="store_true", help="include a unified diff of modified articles")
+    p.add_argument("--output", type=Path)
+    p = sub.add_parser("index", help="embed an edition into Chroma, reusing shared chunks")
+    p.add_argument("edition")
+    p = sub.add_parser("search", help="query one edition")
+    p.add_argument("query")
+    p.add_argument("--edition")
+    p.add_argument("-n", type=int, default=N_RESULTS)
+    p = sub.add_parser("export", help="write an edition back as cgi_structure.json")
+    p.add_argument("edition")
+    p.add_argument("output", type=Path)
+    args = ap.parse_args()
+
+    store = EditionStore(args.store)
+    if args.command == "add":
+        counts = store.add(args.edition, json.loads(args.structure.read_text(encoding="utf-8")),
+                           source=str(args.structure))
+        print(f"{args.edition}: {counts['articles']} articles, {counts['new_objects']} new texts stored")
+
+    elif args.command == "list":
+        stats = store.stats()
+        for edition, n in stats["editions"].items():
+            print(f"{edition:>10}  {n} articles")
+        print(f"{stats['articles']} articles in {len(stats['editions'])} editions → {stats['objects']} "
+              f"stored texts ({stats['stored_chars']:,} of {stats['logical_chars']:,} chars)")
+
+    elif args.command == "diff":
+        report = diff_editions(store, args.old, args.new, text=args.text)
+        if args.output:
+            args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"{args.old} → {args.new}: {len(report['added'])} added, {len(report['removed'])} removed, "
+              f"{len(report['modified'])} modified, {len(report['moved'])} moved, "
+              f"{report['unchanged']} unchanged")
+        for change in sorted(report["modified"], key=lambda c: c["similarity"])[:10]:
+            print(f"  ~ {change['id']:<30} similarity {change['similarity']:.2f} ({change['words']:+d} words)")
+
+    elif args.command == "index":
+        from embedding_backend import load_embedder
+        counts = index_edition(store, args.edition, open_collection(args.db, args.collection),
+                               load_embedder(args.model))
+        print(f"{args.edition}: {counts['chunks']} chunks, {counts['embedded']} embedded, "
+              f"{counts['reused']} reused from other editions")
+
+    elif args.command == "search":
+        from embedding_backend import load_embedder
+        res = search(open_collection(args.db, args.collection), load_embedder(args.model),
+                     args.query, args.edition, args.n)
+        for meta, doc, dist in zip(res["metadatas"][0], res["documents"][0], res["distances"][0]):
+            print(f"[{dist:.3f}] {meta['path']}\n{doc[:300]}\n")
+
+    elif args.command == "export":
+        args.output.write_text(json.dumps(store.structure(args.edition), ensure_ascii=False, indent=2),
+                               encoding="utf-8")
+        print(f"{args.edition} → {args.output}")
+    store.close()
+
+if __name__ == "__main__":
+    main()
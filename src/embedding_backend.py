@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Selectable embedding backend: eager PyTorch (SentenceTransformer) or an ONNX
+export of the same model run with ONNX Runtime, optionally with dynamic int8
+weight quantisation.
+
+Every script that embeds text goes through `load_embedder()`, configured from
+the environment (or a .env file):
+
+    EMBEDDING_BACKEND   torch | onnx          (default: torch)
+    EMBEDDING_QUANTIZE  1 to use the int8 ONNX model
+    EMBEDDING_THREADS   intra-op threads       (default: library default)
+    EMBEDDING_DEVICE    cpu | cuda | …         (default: SentenceTransformer's choice, CUDA if available)
+    ONNX_CACHE_DIR      where exports are kept (default: ./onnx)
+
+The first `onnx` load exports the model; later loads reuse the export.
+
+Usage
+-----
+python embedding_backend.py export --model louisbrulenaudet/lemone-gte-embed-max --quantize
+python embedding_backend.py parity --model louisbrulenaudet/lemone-gte-embed-max --quantize
+python embedding_backend.py bench  --model louisbrulenaudet/lemone-gte-embed-max --threads 4
+
+pip install sentence-transformers onnx onnxruntime
+"""
+from __future__ import annotations
+import argparse, inspect, json, os, re, time
+from pathlib import Path
+import numpy as np
+# ────────────────────────────────────────────────────────────────────────────
+PARITY_MIN_COS = 0.99
+SAMPLE_TEXTS   = [
+    "Quelles sont les entreprises bénéficiaires du régime suspensif ?",
+    "L'impôt sur les sociétés s'applique sur l'ensemble des produits, bénéfices et revenus.",
+    "Sont exonérées de la taxe sur la valeur ajoutée les ventes portant sur le pain et le lait.",
+    "Le taux de la retenue à la source sur les produits des actions est fixé à 10%.",
+    "Article 73.- Taux de l'impôt",
+]
+# ────────────────────────────────────────────────────────────────────────────
+
+def export_dir(model_name: str) -> Path:
+    return Path(os.getenv("ONNX_CACHE_DIR", "./onnx")) / re.sub(r"[^\w.-]+", "__", model_name)
+
+
+def _pooling_mode(pooling) -> str:
+    """'mean' / 'cls' / 'max' / 'lasttoken' across sentence-transformers versions."""
+    if pooling is None:
+        return "mean"
+    if hasattr(pooling, "get_pooling_mode_str"):
+        return pooling.get_pooling_mode_str()
+    mode = pooling.pooling_mode
+    return mode if isinstance(mode, str) else mode[0]
+
+
+def export_onnx(model_name: str, quantize: bool = False, opset: int = 17) -> Path:
+    """Export the transformer of a SentenceTransformer model (and its pooling setup)."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    out = export_dir(model_name)
+    fp32 = out / "model.onnx"
+    if not (out / "embedding_config.json").exists():          # written last
+        out.mkdir(parents=True, exist_ok=True)
+        st = SentenceTransformer(model_name, trust_remote_code=True, device="cpu")
+        transformer = st[0].auto_model.eval()
+        tokenizer   = st.tokenizer
+        input_names = [n for n in tokenizer.model_input_names
+                       if n in ("input_ids", "attention_mask", "token_type_ids")]
+
+        class Encoder(torch.nn.Module):
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+
+            def forward(self, *inputs):
+                return self.model(**dict(zip(input_names, inputs)))[0]
+
+        dummy = tokenizer(SAMPLE_TEXTS[:2], padding=True, return_tensors="pt")
+        dynamic = {n: {0: "batch", 1: "sequence"} for n in input_names}
+        dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        # the TorchScript exporter handles remote-code models; newer torch defaults to dynamo
+        legacy = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+        with torch.no_grad():
+            torch.onnx.export(Encoder(transformer), tuple(dummy[n] for n in input_names), str(fp32),
+                              input_names=input_names, output_names=["last_hidden_state"],
+                              dynamic_axes=dynamic, opset_version=opset, **legacy)
+
+        pooling = next((m for m in st if isinstance(m, Pooling)), None)
+        tokenizer.save_pretrained(out)
+        (out / "embedding_config.json").write_text(json.dumps({
+            "model_name":     model_name,
+            "pooling":        _pooling_mode(pooling),
+            "normalize":      any(isinstance(m, Normalize) for m in st),
+            "max_seq_length": st.max_seq_length,
+        }, indent=2), encoding="utf-8")
+        print(f"Exported {model_name} → {fp32}")
+
+    if quantize and not (out / "model_qint8.onnx").exists():
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(fp32), str(out / "model_qint8.onnx"), weight_type=QuantType.QInt8)
+        print(f"Quantised {fp32} → {out / 'model_qint8.onnx'}")
+
+    return out
+
+
+class OnnxEmbedder:
+    """Drop-in for the parts of SentenceTransformer.encode the scripts use."""
+
+    def __init__(self, model_name: str, quantize: bool = False, threads: int | None = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        out = export_onnx(model_name, quantize=quantize)
+        self.config    = json.loads((out / "embedding_config.json").read_text(encoding="utf-8"))
+        self.tokenizer = AutoTokenizer.from_pretrained(out)
+        self.max_seq_length = self.config["max_seq_length"]
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            str(out / ("model_qint8.onnx" if quantize else "model.onnx")),
+            sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return int(self.encode("x").shape[-1])
+
+    def _embed(self, texts: list[str]) -> np.ndarray:
+        enc = self.tokenizer(texts, padding=True, truncation=True,
+                             max_length=self.max_seq_length, return_tensors="np")
+        hidden = self.session.run(None, {n: enc[n].astype(np.int64) for n in self.input_names})[0]
+        mask   = enc["attention_mask"][..., None].astype(hidden.dtype)
+        mode   = self.config["pooling"]
+        if mode == "cls":
+            return hidden[:, 0]
+        if mode == "max":
+            return np.where(mask > 0, hidden, -1e9).max(axis=1)
+        if mode == "lasttoken":
+            return hidden[np.arange(len(hidden)), enc["attention_mask"].sum(axis=1) - 1]
+        return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = False,
+               show_progress_bar: bool = False, convert_to_numpy: bool = True, **_) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts  = [sentences] if single else list(sentences)
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+
+        # batch similar lengths together to minimise padding, then restore order
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        out   = np.empty(len(texts), dtype=object)
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            for i, vec in zip(idx, self._embed([texts[i] for i in idx])):
+                out[i] = vec
+        vectors = np.stack(out).astype(np.float32)
+
+        if normalize_embeddings or self.config["normalize"]:
+            vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors[0] if single else vectors
+
+
+def load_embedder(model_name: str, backend: str | None = None, quantize: bool | None = None,
+                  threads: int | None = None, device: str | None = None):
+    """Return an object with SentenceTransformer's `encode` for the configured backend.
+
+    Unset arguments are read from the environment at call time, so scripts that
+    call load_dotenv() after importing this module still pick up their .env.
+    """
+    backend  = backend or os.getenv("EMBEDDING_BACKEND", "torch")
+    quantize = os.getenv("EMBEDDING_QUANTIZE", "0") == "1" if quantize is None else quantize
+    threads  = threads or int(os.getenv("EMBEDDING_THREADS", "0")) or None
+    device   = device or os.getenv("EMBEDDING_DEVICE") or None
+    if backend == "onnx":
+        return OnnxEmbedder(model_name, quantize=quantize, threads=threads)
+    if backend != "torch":
+        raise ValueError(f"unknown embedding backend: {backend}")
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+    if threads:
+        torch.set_num_threads(threads)
+    return SentenceTransformer(model_name, trust_remote_code=True, device=device)
+# ---------------------------------------------------------------------------
+
+def parity(model_name: str, quantize: bool, texts: list[str] = SAMPLE_TEXTS) -> float:
+    """Lowest cosine similarity between the PyTorch and ONNX embeddings of `texts`."""
+    ref = load_embedder(model_name, backend="torch").encode(texts, normalize_embeddings=True)
+    got = load_embedder(model_name, backend="onnx", quantize=quantize).encode(texts, normalize_embeddings=True)
+    return float((np.asarray(ref) * got).sum(axis=1).min())
+
+
+def bench(embedder, texts: list[str], repeats: int = 20, batch_size: int = 32) -> dict:
+    """Single-query latency percentiles and batched throughput."""
+    embedder.encode(texts[0])                                  # warm-up
+    lat = []
+    for i in range(repeats):
+        t0 = time.perf_counter()
+        embedder.encode(texts[i % len(texts)])
+        lat.append(time.perf_counter() - t0)
+    corpus = (texts * (1 + 256 // len(texts)))[:256]
+    t0 = time.perf_counter()
+    embedder.encode(corpus, batch_size=batch_size)
+    elapsed = time.perf_counter() - t0
+    return {"p50_ms": 1000 * float(np.percentile(lat, 50)),
+            "p95_ms": 1000 * float(np.percentile(lat, 95)),
+            "texts_per_s": len(corpus) / elapsed}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export, check and benchmark embedding backends")
+    ap.add_argument("command", choices=("export", "parity", "bench"))
+    ap.add_argument("--model", default="louisbrulenaudet/lemone-gte-embed-max")
+    ap.add_argument("--quantize", action="store_true")
+    ap.add_argument("--threads", type=int, default=None)
+    args = ap.parse_args()
+
+    if args.command == "export":
+        export_onnx(args.model, quantize=args.quantize)
+    elif args.command == "parity":
+        cos = parity(args.model, args.quantize)
+        status = "OK" if cos > PARITY_MIN_COS else "FAILED"
+        print(f"min cosine(torch, onnx{'-int8' if args.quantize else ''}) = {cos:.5f} → {status}")
+        if cos <= PARITY_MIN_COS:
+            raise SystemExit(1)
+    else:
+        configs = [("torch", False), ("onnx", False)] + ([("onnx", True)] if args.quantize else [])
+        for backend, quantize in configs:
+            emb = load_embedder(args.model, backend=backend, quantize=quantize, threads=args.threads)
+            res = bench(emb, SAMPLE_TEXTS)
+            name = backend + ("-int8" if quantize else "")
+            print(f"{name:<10} p50 {res['p50_ms']:.1f} ms  p95 {res['p95_ms']:.1f} ms  "
+                  f"{res['texts_per_s']:.1f} texts/s")
+
+if __name__ == "__main__":
+    main()
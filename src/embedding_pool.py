@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Multi-process embedding pool for bulk corpus encoding.
+
+Each worker process loads the model once (through `load_embedder`, so the
+PyTorch and ONNX backends both work) with its intra-op thread count pinned,
+takes text batches from a queue and writes the vectors straight into a
+shared-memory output buffer at the batch's offset. The parent never
+unpickles vectors: `encode()` returns a NumPy view of that buffer, already
+in input order.
+
+The returned array is only valid until the next `encode()` call on the same
+pool – copy it if you need to keep it.
+
+    with EmbeddingPool(MODEL_NAME, workers=8) as pool:
+        vectors = pool.encode(texts)
+
+Usage
+-----
+python embedding_pool.py --model louisbrulenaudet/lemone-gte-embed-max --workers 1 2 4 8
+
+pip install numpy sentence-transformers
+"""
+from __future__ import annotations
+import argparse, json, os, queue, time
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from pathlib import Path
+import numpy as np
+# ────────────────────────────────────────────────────────────────────────────
+BATCH_SIZE = 32
+POLL       = 1.0      # seconds between worker liveness checks while waiting for results
+# ────────────────────────────────────────────────────────────────────────────
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Open the parent's segment; the parent alone unlinks it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)     # 3.13+
+    except TypeError:
+        # before 3.13 workers share the parent's resource tracker, where
+        # registering the same name again is a no-op
+        return shared_memory.SharedMemory(name=name)
+
+
+def _worker(model_name, backend, quantize, threads, tasks, results):
+    # must happen before torch / onnxruntime spin up their thread pools
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    from embedding_backend import load_embedder
+
+    try:
+        model = load_embedder(model_name, backend=backend, quantize=quantize, threads=threads)
+        dim = int(np.asarray(model.encode(["x"])).shape[-1])
+    except Exception as e:
+        results.put(("error", repr(e)))
+        return
+    results.put(("ready", (dim, model.max_seq_length)))
+
+    segment = None
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        name, rows, start, texts, normalize = task
+        try:
+            if segment is None or segment.name != name:
+                if segment is not None:
+                    segment.close()
+                segment = _attach(name)
+            out = np.ndarray((rows, dim), dtype=np.float32, buffer=segment.buf)
+            out[start:start + len(texts)] = model.encode(texts, batch_size=len(texts),
+                                                         normalize_embeddings=normalize)
+            del out
+            results.put(("done", len(texts)))
+        except Exception as e:
+            results.put(("error", repr(e)))
+    if segment is not None:
+        segment.close()
+
+
+class EmbeddingPool:
+    def __init__(self, model_name: str, workers: int | None = None, threads: int | None = None,
+                 backend: str | None = None, quantize: bool | None = None,
+                 batch_size: int = BATCH_SIZE):
+        cores = os.cpu_count() or 1
+        self.workers    = workers or cores
+        self.threads    = threads or max(cores // self.workers, 1)
+        self.batch_size = batch_size
+
+        self._segment: shared_memory.SharedMemory | None = None
+        ctx = mp.get_context("spawn")                  # fresh interpreters, no forked torch state
+        self._tasks   = ctx.Queue()
+        self._results = ctx.Queue()
+        self._procs   = [
+            ctx.Process(target=_worker, daemon=True,
+                        args=(model_name, backend, quantize, self.threads, self._tasks, self._results))
+            for _ in range(self.workers)
+        ]
+        for p in self._procs:
+            p.start()
+
+        ready = {self._wait("ready") for _ in self._procs}
+        self.dim, self.max_seq_length = ready.pop()
+
+    def _wait(self, expected: str):
+        # a worker killed by the OOM killer or a segfault never answers: check liveness while waiting
+        while True:
+            try:
+                kind, value = self._results.get(timeout=POLL)
+                break
+            except queue.Empty:
+                dead = [p for p in self._procs if not p.is_alive()]
+                if dead:
+                    self.close()
+                    raise RuntimeError(f"embedding worker {dead[0].pid} died (exit code {dead[0].exitcode})")
+        if kind == "error":
+            self.close()
+            raise RuntimeError(f"embedding worker failed: {value}")
+        assert kind == expected, kind
+        return value
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, sentences, batch_size: int | None = None, normalize_embeddings: bool = False,
+               **_) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts  = [sentences] if single else list(sentences)
+        size   = batch_size or self.batch_size
+        rows   = len(texts)
+        if not rows:
+            return np.empty((0, self.dim), dtype=np.float32)
+
+        nbytes = rows * self.dim * 4
+        if self._segment is None or self._segment.size < nbytes:
+            self._release()
+            self._segment = shared_memory.SharedMemory(create=True, size=nbytes)
+
+        n_batches = 0
+        for start in range(0, rows, size):
+            self._tasks.put((self._segment.name, rows, start, texts[start:start + size],
+                             normalize_embeddings))
+            n_batches += 1
+        for _ in range(n_batches):
+            self._wait("done")
+
+        out = np.ndarray((rows, self.dim), dtype=np.float32, buffer=self._segment.buf)
+        return out[0] if single else out
+
+    def _release(self):
+        if self._segment is not None:
+            try:
+                self._segment.close()
+            except BufferError:                        # a caller still holds a view
+                pass
+            self._segment.unlink()
+            self._segment = None
+
+    def close(self):
+        for _ in self._procs:
+            self._tasks.put(None)
+        for p in self._procs:
+            p.join(timeout=10)
+            if p.is_alive():                           # stuck on a task another worker's death orphaned
+                p.terminate()
+        self._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+# ---------------------------------------------------------------------------
+
+def main():
+    from structure_chunker import chunk_structure
+
+    ap = argparse.ArgumentParser(description="Measure bulk encoding throughput vs worker count")
+    ap.add_argument("--model", default="louisbrulenaudet/lemone-gte-embed-max")
+    ap.add_argument("--structure", type=Path, default=Path("cgi_structure.json"))
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--limit", type=int, default=512, help="chunks to encode")
+    args = ap.parse_args()
+
+    texts = [c["text"] for c in chunk_structure(json.loads(args.structure.read_text(encoding="utf-8")))]
+    texts = texts[:args.limit]
+    for n in args.workers:
+        with EmbeddingPool(args.model, workers=n) as pool:
+            t0 = time.perf_counter()
+            pool.encode(texts)
+            elapsed = time.perf_counter() - t0
+        print(f"{n:>3} workers × {pool.threads} threads: {len(texts) / elapsed:.1f} texts/s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Retrieval evaluation: recall@k, MRR and query latency per configuration.
+
+The gold articles of a question are the CGI articles its reference answer
+cites ("l'article 94 du CGI", "articles 101 à 104", "article 221 ter" …);
+citations of other texts ("article 19 du décret …", "article 8 de la LF
+2025") are ignored, and questions without any CGI citation are skipped.
+
+A configuration is backend × chunking × search mode:
+
+    backends   torch | onnx | onnx-int8          (embedding_backend.py)
+    chunkings  structure-256 | structure-512 | article
+    modes      float | int8 | binary             (quantization.py)
+
+With --route every mode is also run as "<mode>+route": the question is routed
+to its TITRE partitions first (query_router.py) and only those are searched,
+or everything when the router is unsure.
+
+Chunks are ranked by the index and collapsed to articles in rank order, so
+recall@k counts gold articles among the first k distinct articles. Latency
+covers embedding the question plus the search (and routing).
+
+Usage
+-----
+python evaluate_retrieval.py --questions updated_questions.json finetuning_dataset.json
+python evaluate_retrieval.py --backends torch onnx-int8 --chunkings structure-256 article --modes float binary
+python evaluate_retrieval.py --modes float binary --route
+
+pip install numpy sentence-transformers
+"""
+from __future__ import annotations
+import argparse, json, re, time
+from pathlib import Path
+import numpy as np
+
+from embedding_backend import load_embedder
+from quantization import QuantizedIndex
+from query_router import QueryRouter
+from structure_chunker import PATH_SEP, chunk_structure, iter_articles
+# ────────────────────────────────────────────────────────────────────────────
+STRUCTURE_PATH = Path("cgi_structure.json")
+QUESTIONS      = [Path("updated_questions.json")]
+MODEL_NAME     = "louisbrulenaudet/lemone-gte-embed-max"
+KS             = (1, 3, 5, 10)
+SEARCH_DEPTH   = 100     # chunks ranked before collapsing to articles
+BACKENDS       = ("torch",)
+CHUNKINGS      = ("structure-256", "article")
+MODES          = ("float", "int8", "binary")
+# ────────────────────────────────────────────────────────────────────────────
+SUFFIX = r"(?:bis|ter|quater|quinquies|sexies|septies|octies|nonies|decies)"
+NUM    = rf"(?:premier|\d+)(?:\s+{SUFFIX})?(?:\s*-\s*[IVX]+\b)?(?:\s*\([^)]{{0,20}}\))?"
+REF_RX  = re.compile(rf"\barticles?\s+({NUM}(?:\s*(?:,|\bet\b|\bà\b)\s*{NUM})*)", re.I)
+ITEM_RX = re.compile(rf"(premier|\d+)(?:\s+({SUFFIX}))?|(\bà\b)", re.I)
+# a citation followed by one of these points into another text
+EXTERNAL_RX = re.compile(r"\s*(?:du décret|de la loi|de la lf|de l'arrêté|du dahir|de l'ordonnance)", re.I)
+
+
+def base_number(number: str | None) -> str | None:
+    """'9 bis' → '9 bis', '125 III' / '6 A' → '125' / '6'."""
+    if not number:
+        return None
+    m = ITEM_RX.match(number)
+    return " ".join(p.lower() for p in m.groups()[:2] if p) if m else None
+
+
+def gold_articles(answer: str) -> list[str]:
+    """CGI article numbers cited by an answer, in first-citation order."""
+    refs = []
+    for m in REF_RX.finditer(answer):
+        if EXTERNAL_RX.match(answer, m.end()):
+            continue
+        items, span = ITEM_RX.findall(m.group(1)), False
+        for num, suffix, to in items:
+            if to:
+                span = True
+                continue
+            num = "1" if num.lower() == "premier" else num
+            if span and refs and refs[-1].isdigit() and int(refs[-1]) < int(num) <= int(refs[-1]) + 50:
+                refs.extend(str(n) for n in range(int(refs[-1]) + 1, int(num)))
+            span = False
+            refs.append(f"{num} {suffix.lower()}" if suffix else num)
+    return list(dict.fromkeys(refs))
+
+
+def load_questions(paths: list[Path]) -> list[dict]:
+    out = []
+    for path in paths:
+        for item in json.loads(path.read_text(encoding="utf-8"))["questions"]:
+            gold = gold_articles(item.get("answer") or "")
+            if gold:
+                out.append({"question": item["question"], "gold": gold, "source": path.name})
+    return out
+# ---------------------------------------------------------------------------
+
+def build_chunks(structure: list, chunking: str) -> list[dict]:
+    """[{id, number, text}] for one chunking strategy."""
+    if chunking.startswith("structure-"):
+        return chunk_structure(structure, max_tokens=int(chunking.split("-", 1)[1]))
+    if chunking == "article":
+        chunks = []
+        for a in iter_articles(structure):
+            head = a["id"] if not a["name"] else f"{a['id']} – {a['name']}"
+            path = PATH_SEP.join(p for p in (a["titre"], a["chapitre"], head) if p)
+            chunks.append({"id": f"{a['ordinal']}:{a['number'] or a['id']}", "number": a["number"],
+                           "titre": a["titre"], "text": f"{path}\n{' '.join(a['content'].split())}"})
+        return chunks
+    raise ValueError(f"unknown chunking: {chunking}")
+
+
+def load_backend(model_name: str, backend: str):
+    name, _, variant = backend.partition("-")
+    return load_embedder(model_name, backend=name, quantize=variant == "int8")
+
+
+def rank_articles(index: QuantizedIndex, numbers: dict, query: np.ndarray, mode: str,
+                  depth: int = SEARCH_DEPTH, where: dict | None = None) -> list[str]:
+    ranked = []
+    for chunk_id, _ in index.search(query, depth, mode, where=where):
+        number = numbers[chunk_id]
+        if number and number not in ranked:
+            ranked.append(number)
+    return ranked
+
+
+def score(ranked: list[list[str]], gold: list[list[str]], latencies: list[float]) -> dict:
+    row = {}
+    for k in KS:
+        row[f"recall@{k}"] = float(np.mean([len(set(r[:k]) & set(g)) / len(g) for r, g in zip(ranked, gold)]))
+    row["mrr"] = float(np.mean([
+        next((1 / (i + 1) for i, n in enumerate(r) if n in g), 0.0) for r, g in zip(ranked, gold)]))
+    for p in (50, 95, 99):
+        row[f"p{p}_ms"] = 1000 * float(np.percentile(latencies, p))
+    return row
+
+
+def evaluate(model_name: str, structure: list, questions: list[dict], backends, chunkings, modes,
+             route: bool = False) -> dict:
+    results = {}
+    gold = [q["gold"] for q in questions]
+    for backend in backends:
+        embedder = load_backend(model_name, backend)
+        embedder.encode(questions[0]["question"])                       # warm-up
+        for chunking in chunkings:
+            chunks  = build_chunks(structure, chunking)
+            numbers = {c["id"]: base_number(c["number"]) for c in chunks}
+            t0 = time.perf_counter()
+            vectors = embedder.encode([c["text"] for c in chunks], batch_size=32, normalize_embeddings=True)
+            build_s = time.perf_counter() - t0
+            index = QuantizedIndex(np.asarray(vectors, dtype=np.float32), [c["id"] for c in chunks],
+                                   payloads=[{"titre": c["titre"]} for c in chunks])
+            router = QueryRouter.from_structure(structure, index) if route else None
+
+            for mode, routed in [(m, False) for m in modes] + [(m, True) for m in modes if router]:
+                ranked, latencies, n_routed = [], [], 0
+                for q in questions:
+                    t0 = time.perf_counter()
+                    query = embedder.encode(q["question"], normalize_embeddings=True)
+                    titres = router.route(q["question"], query).titres if routed else []
+                    n_routed += bool(titres)
+                    ranked.append(rank_articles(index, numbers, query, mode,
+                                                where={"titre": titres} if titres else None))
+                    latencies.append(time.perf_counter() - t0)
+                name = f"{backend}/{chunking}/{mode}" + ("+route" if routed else "")
+                results[name] = {**score(ranked, gold, latencies), "chunks": len(chunks),
+                                 "index_bytes": index.nbytes()[mode if mode != "float" else "float32"],
+                                 "encode_corpus_s": build_s, **({"routed": n_routed} if routed else {})}
+                print(f"  {name:<36} " + "  ".join(
+                    f"{k}={v:.3f}" for k, v in results[name].items() if k.startswith(("recall", "mrr")))
+                      + f"  p95={results[name]['p95_ms']:.1f}ms")
+    return results
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Compare retrieval configurations on cited-article recall")
+    ap.add_argument("--model", default=MODEL_NAME)
+    ap.add_argument("--structure", type=Path, default=STRUCTURE_PATH)
+    ap.add_argument("--questions", type=Path, nargs="+", default=QUESTIONS)
+    ap.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    ap.add_argument("--chunkings", nargs="+", default=list(CHUNKINGS))
+    ap.add_argument("--modes", nargs="+", default=list(MODES))
+    ap.add_argument("--route", action="store_true", help="also search the routed TITRE partitions only")
+    ap.add_argument("--output", type=Path, default=Path("retrieval_eval.json"))
+    args = ap.parse_args()
+
+    structure = json.loads(args.structure.read_text(encoding="utf-8"))
+    questions = load_questions(args.questions)
+    if not questions:
+        raise SystemExit("No question cites a CGI article – nothing to evaluate.")
+    print(f"{len(questions)} questions with cited articles – {args.model}")
+
+    results = evaluate(args.model, structure, questions, args.backends, args.chunkings, args.modes,
+                       args.route)
+    args.output.write_text(json.dumps({
+        "model": args.model, "questions": len(questions), "ks": list(KS),
+        "configs": results,
+        "gold": [{"question": q["question"], "gold": q["gold"], "source": q["source"]} for q in questions],
+    }, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"→ {args.output}")
+
+if __name__ == "__main__":
+    main()
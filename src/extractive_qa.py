@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batched extractive question answering over retrieved chunks.
+
+Instead of concatenating the retrieved documents into one long context and
+running the QA pipeline once per question, every (question, chunk) pair is
+scored as its own example: the pairs of many questions are tokenised together
+(chunks longer than the model window are split into strided windows), sorted
+by length and run through the model in padded batches. For each question the
+answer span with the best score over all of its chunks wins.
+
+Scores follow the transformers QA pipeline: p(start) · p(end), softmax over
+the context tokens of the window, so they are comparable across chunks.
+
+    qa = ExtractiveQA()
+    answers = qa.answer([(question, [chunk1, chunk2, ...]), ...])
+
+Usage
+-----
+python extractive_qa.py --questions updated_questions.json --db ./db --collection vector_db --top-k 4
+
+pip install torch transformers chromadb
+"""
+from __future__ import annotations
+import argparse, json, time
+from pathlib import Path
+import numpy as np
+# ────────────────────────────────────────────────────────────────────────────
+MODEL_NAME     = "cmarkea/distilcamembert-base-qa"
+EMBEDDER_NAME  = "louisbrulenaudet/lemone-gte-embed-max"
+QUESTIONS_PATH = Path("updated_questions.json")
+BATCH_SIZE     = 32       # windows per forward pass
+MAX_LENGTH     = 384      # tokens per window (question + context)
+STRIDE         = 128      # tokens shared by consecutive windows of a long chunk
+MAX_ANSWER_LEN = 64       # tokens
+TOP_K          = 4        # chunks retrieved per question
+# ────────────────────────────────────────────────────────────────────────────
+
+def _softmax(x: np.ndarray) -> np.ndarray:
+    e = np.exp(x - x.max())
+    return e / e.sum()
+
+
+def best_span(start_logits: np.ndarray, end_logits: np.ndarray, context_mask: np.ndarray,
+              max_answer_len: int = MAX_ANSWER_LEN) -> tuple[int, int, float]:
+    """(start token, end token, score) of the best span inside the context tokens."""
+    start_logits = np.where(context_mask, start_logits, -np.inf)
+    end_logits   = np.where(context_mask, end_logits, -np.inf)
+    p_start, p_end = _softmax(start_logits), _softmax(end_logits)
+    # outer product restricted to start <= end < start + max_answer_len
+    scores = np.triu(np.tril(np.outer(p_start, p_end), max_answer_len - 1))
+    start, end = np.unravel_index(np.argmax(scores), scores.shape)
+    return int(start), int(end), float(scores[start, end])
+
+
+class ExtractiveQA:
+    def __init__(self, model_name: str = MODEL_NAME, batch_size: int = BATCH_SIZE,
+                 max_length: int = MAX_LENGTH, stride: int = STRIDE,
+                 max_answer_len: int = MAX_ANSWER_LEN, threads: int | None = None):
+        import torch
+        from transformers import AutoModelForQuestionAnswering, AutoTokenizer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.torch          = torch
+        self.tokenizer      = AutoTokenizer.from_pretrained(model_name)
+        self.model          = AutoModelForQuestionAnswering.from_pretrained(model_name).eval()
+        self.batch_size     = batch_size
+        self.max_length     = max_length
+        self.stride         = stride
+        self.max_answer_len = max_answer_len
+
+    def _windows(self, pairs: list[tuple[str, str]]) -> dict:
+        """Tokenise all pairs at once; long chunks overflow into strided windows."""
+        return self.tokenizer(
+            [q for q, _ in pairs], [c for _, c in pairs],
+            truncation="only_second", max_length=self.max_length, stride=self.stride,
+            return_overflowing_tokens=True, return_offsets_mapping=True,
+        )
+
+    def answer(self, items: list[tuple[str, list[str]]]) -> list[dict]:
+        """Best span for each (question, chunks) item.
+
+        Returns one dict per item: answer, score, chunk (index into its chunks),
+        start / end (character offsets inside that chunk).
+        """
+        pairs, owner = [], []
+        for q_idx, (question, chunks) in enumerate(items):
+            for c_idx, chunk in enumerate(chunks):
+                if chunk and chunk.strip():
+                    pairs.append((question, chunk))
+                    owner.append((q_idx, c_idx))
+
+        best = [{"answer": "", "score": 0.0, "chunk": None, "start": None, "end": None} for _ in items]
+        if not pairs:
+            return best
+
+        enc     = self._windows(pairs)
+        n_win   = len(enc["input_ids"])
+        lengths = [len(ids) for ids in enc["input_ids"]]
+        order   = sorted(range(n_win), key=lambda i: -lengths[i])      # similar lengths → less padding
+
+        for start in range(0, n_win, self.batch_size):
+            idx   = order[start:start + self.batch_size]
+            batch = self.tokenizer.pad(
+                {k: [enc[k][i] for i in idx] for k in enc.keys()
+                 if k not in ("offset_mapping", "overflow_to_sample_mapping")},
+                return_tensors="pt")
+            with self.torch.no_grad():
+                out = self.model(**batch)
+            starts, ends = out.start_logits.numpy(), out.end_logits.numpy()
+
+            for row, i in enumerate(idx):
+                seq_ids = enc.sequence_ids(i)
+                mask    = np.array([s == 1 for s in seq_ids] + [False] * (starts.shape[1] - len(seq_ids)))
+                s_tok, e_tok, score = best_span(starts[row], ends[row], mask, self.max_answer_len)
+
+                q_idx, c_idx = owner[enc["overflow_to_sample_mapping"][i]]
+                if score > best[q_idx]["score"]:
+                    chunk = items[q_idx][1][c_idx]
+                    s_chr = enc["offset_mapping"][i][s_tok][0]
+                    e_chr = enc["offset_mapping"][i][e_tok][1]
+                    best[q_idx] = {"answer": chunk[s_chr:e_chr], "score": score,
+                                   "chunk": c_idx, "start": s_chr, "end": e_chr}
+        return best
+# ---------------------------------------------------------------------------
+
+def main():
+    import chromadb
+    from embedding_backend import load_embedder
+
+    ap = argparse.ArgumentParser(description="Answer a question set with batched extractive QA")
+    ap.add_argument("--questions", type=Path, default=QUESTIONS_PATH)
+    ap.add_argument("--db", default="./db")
+    ap.add_argument("--collection", default="vector_db")
+    ap.add_argument("--embedder", default=EMBEDDER_NAME)
+    ap.add_argument("--model", default=MODEL_NAME)
+    ap.add_argument("--top-k", type=int, default=TOP_K)
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    ap.add_argument("--threads", type=int, default=None)
+    ap.add_argument("--output", type=Path, default=Path("extractive_qa.json"))
+    args = ap.parse_args()
+
+    data      = json.loads(args.questions.read_text(encoding="utf-8"))["questions"]
+    questions = [item["question"] for item in data]
+
+    t0 = time.perf_counter()
+    collection = chromadb.PersistentClient(path=args.db).get_collection(name=args.collection)
+    q_vecs = load_embedder(args.embedder).encode(questions, batch_size=32)
+    hits   = collection.query(query_embeddings=np.asarray(q_vecs).tolist(), n_results=args.top_k,
+                              include=["documents"])["documents"]
+    t_retrieve = time.perf_counter() - t0
+
+    qa = ExtractiveQA(args.model, batch_size=args.batch_size, threads=args.threads)
+    t0 = time.perf_counter()
+    answers = qa.answer(list(zip(questions, hits)))
+    t_qa = time.perf_counter() - t0
+
+    results = [{"question": q, "answer": a["answer"], "score": a["score"], "chunk": a["chunk"],
+                "real_answer": item.get("answer")} for q, a, item in zip(questions, answers, data)]
+    args.output.write_text(json.dumps({
+        "model": args.model, "top_k": args.top_k, "questions": len(questions),
+        "retrieval_s": t_retrieve, "qa_s": t_qa,
+        "questions_per_s": len(questions) / (t_retrieve + t_qa),
+        "results": results,
+    }, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    print(f"{len(questions)} questions: retrieval {t_retrieve:.1f}s, QA {t_qa:.1f}s "
+          f"→ {len(questions) / (t_retrieve + t_qa):.2f} questions/s  ({args.output})")
+
+if __name__ == "__main__":
+    main()
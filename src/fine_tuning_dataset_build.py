@@ -1,6 +1,8 @@
 import google.generativeai as genai
 import chromadb
-from sentence_transformers import SentenceTransformer
+from embedding_backend import load_embedder
+from context_packing import count_words, from_chroma, pack_context
+from llm_cache import ResponseCache
 import json
 import os
 import time
@@ -10,16 +12,59 @@ from dotenv import load_dotenv
 # --- Configuration ---
 load_dotenv()  # Charge les variables d'environnement depuis le fichier .env
 
-PDF_PATH = r"D:\bot_dgi\pdf-to-text-chroma-search\input\CGI_FR_2025 (1)_compressed.pdf"
-INPUT_JSON_PATH = r"D:\bot_dgi\questions.json"
+PDF_PATH = os.getenv("ATTACH_PDF_PATH", "./input/CGI_FR_2025 (1)_compressed.pdf")
+INPUT_JSON_PATH = os.getenv("QUESTIONS_PATH", "./questions.json")
 OUTPUT_JSON_PATH = "./finetuning_dataset.json"
-CHROMA_DB_PATH = "./db"
+CHROMA_DB_PATH = os.getenv("CHROMA_DB_PATH", "./db")
 CHROMA_COLLECTION_NAME = "my_collection"
 EMBEDDING_MODEL_NAME = "louisbrulenaudet/lemone-gte-embed-max"
 GEMINI_MODEL_NAME = "gemini-1.5-pro-latest"
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 MAX_RETRIES = 3
 DEFAULT_RETRY_DELAY = 5  # seconds
+N_RESULTS = 6  # candidates retrieved, then packed into CONTEXT_WORDS
+CONTEXT_WORDS = int(os.getenv("CONTEXT_WORDS", "1500"))  # count_words estimate, not model tokens
+# Attaching the whole code to every call dominates latency and cost; the packed
+# context is usually enough. Set ATTACH_FULL_PDF=1 to restore the old behaviour.
+ATTACH_FULL_PDF = os.getenv("ATTACH_FULL_PDF", "0") == "1"
+LLM_CACHE_MODE = os.getenv("LLM_CACHE_MODE", "exact")  # exact | template | off
+
+# What the model is told its knowledge comes from: the attached PDF only when there is one
+PROMPT_SOURCES = {
+    "sources": "du document PDF fourni (Code Fiscal Marocain) et des extraits de contexte récupérés via une recherche vectorielle",
+    "task_sources": "dans le fichier PDF téléversé et les vecteurs de contexte fournis",
+    "answer_sources": "du PDF et des extraits de contexte",
+} if ATTACH_FULL_PDF else {
+    "sources": "des extraits du Code Fiscal Marocain récupérés via une recherche vectorielle et fournis ci-dessous",
+    "task_sources": "dans les extraits de contexte fournis",
+    "answer_sources": "des extraits de contexte",
+}
+
+# Prompt shared by every question; the response cache regenerates entries when it changes
+PROMPT_TEMPLATE = """
+    Vous êtes un assistant expert spécialisé en droit fiscal marocain. Vos connaissances proviennent *exclusivement* {sources}.
+
+    **Tâche :** Répondez de manière détaillée à la question suivante. Basez votre réponse *strictement* sur les informations disponibles {task_sources}.
+
+    {pdf_line}
+    **Vecteurs de Contexte issus de la Recherche Documentaire :**
+    ---
+    {context_string}
+    ---
+
+    **Question :**
+    {question}
+
+    **Instructions pour le Format de Réponse :**
+    1. Fournissez une réponse complète et détaillée dérivée *uniquement* {answer_sources}.
+    2. Identifiez le numéro d'article *principal* du PDF qui soutient l'essentiel de votre réponse. Si plusieurs articles sont pertinents, choisissez celui qui est le plus central. Si l'information provient principalement des extraits de contexte sans numéros d'article clairs, indiquez-le.
+    3. Structurez votre réponse *exactement* de la manière suivante :
+       `Selon l'Article [Numéro d'Article Principal ou "Extraits de Contexte"] : [Votre réponse détaillée utilisant les informations du PDF et/ou des contextes]. Références Utilisées : (Article X, Article Y du PDF ; Extrait de Contexte Z)`
+    4. Dans la partie "Références Utilisées", listez tous les articles spécifiques (ex. Article 5, Article 6 A) du PDF et/ou des extraits de contexte (ex. Extrait de Contexte 1, Extrait de Contexte 3) que vous avez utilisés pour formuler *l'intégralité* de la réponse.
+    5. Soyez précis et assurez-vous que la réponse est directement étayée par les documents fournis. N'ajoutez pas d'informations externes ni ne faites d'hypothèses.
+
+    **Réponse :**
+    """
 
 print("Initializing components...")
 
@@ -41,7 +86,7 @@ except Exception as e:
 # Load Embedding Model
 try:
     print(f"Loading embedding model: {EMBEDDING_MODEL_NAME}...")
-    embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME, trust_remote_code=True)
+    embedding_model = load_embedder(EMBEDDING_MODEL_NAME)
     print("Embedding model loaded successfully.")
 except Exception as e:
     print(f"Error loading embedding model: {e}")
@@ -66,22 +111,26 @@ except Exception as e:
     print(f"Error loading questions: {e}")
     exit(1)
 
-# --- Upload PDF to Gemini API ---
+# --- Upload PDF to Gemini API (only when attached to every call) ---
 pdf_file_object = None
-if not os.path.exists(PDF_PATH):
-     print(f"Error: PDF file not found at {PDF_PATH}")
-     exit(1)
+if ATTACH_FULL_PDF:
+    if not os.path.exists(PDF_PATH):
+         print(f"Error: PDF file not found at {PDF_PATH}")
+         exit(1)
 
-print(f"Uploading PDF '{PDF_PATH}' to Google...")
-try:
-    pdf_file_object = genai.upload_file(path=PDF_PATH, display_name="Moroccan Tax Code PDF")
-    print(f"PDF uploaded successfully. File URI: {pdf_file_object.uri}")
-except Exception as e:
-    print(f"Error uploading PDF file: {e}")
-    exit(1)
+    print(f"Uploading PDF '{PDF_PATH}' to Google...")
+    try:
+        pdf_file_object = genai.upload_file(path=PDF_PATH, display_name="Moroccan Tax Code PDF")
+        print(f"PDF uploaded successfully. File URI: {pdf_file_object.uri}")
+    except Exception as e:
+        print(f"Error uploading PDF file: {e}")
+        exit(1)
 
 # --- Process Questions and Generate Answers ---
+llm_cache = ResponseCache(mode=LLM_CACHE_MODE)
 fine_tuning_data = []
+prompt_words = []   # count_words estimate of the text prompt
+prompt_tokens = []  # prompt tokens reported by the API, attached PDF included
 print(f"\nProcessing {len(questions_list)} questions...")
 
 # Initialize Gemini Model
@@ -101,19 +150,20 @@ for item in tqdm(questions_list, desc="Generating Answers"):
 
     print(f"\nProcessing question: {question}")
 
-    # 1. Retrieve Context from ChromaDB (only 2 best matches)
+    # 1. Retrieve Context from ChromaDB, deduplicated and packed into CONTEXT_WORDS
     context_docs = []
     try:
         print("  Querying ChromaDB...")
         query_vector = embedding_model.encode(question).tolist()
         results = collection.query(
             query_embeddings=[query_vector],
-            n_results=2,  # Récupère au maximum 2 meilleures correspondances
-            include=["documents"]
+            n_results=N_RESULTS,
+            include=["documents", "metadatas", "distances"]
         )
         if results and results.get("documents") and results["documents"][0]:
-             context_docs = results["documents"][0]
-             print(f"  Retrieved {len(context_docs)} context snippets from ChromaDB.")
+             context_docs, pack_stats = pack_context(from_chroma(results), budget=CONTEXT_WORDS)
+             print(f"  Packed {pack_stats['kept']}/{pack_stats['passages']} context snippets "
+                   f"into {len(context_docs)} spans ({pack_stats['words']} words).")
         else:
             print("  No relevant documents found in ChromaDB for this question.")
     except Exception as e:
@@ -122,39 +172,31 @@ for item in tqdm(questions_list, desc="Generating Answers"):
     context_string = "\n---\n".join([f"Extrait de Contexte {i+1}:\n{doc}" for i, doc in enumerate(context_docs)]) if context_docs else "Aucun extrait de contexte pertinent trouvé dans le vector store."
 
     # 2. Construct Prompt for Gemini in French
-    prompt = f"""
-    Vous êtes un assistant expert spécialisé en droit fiscal marocain. Vos connaissances proviennent *exclusivement* du document PDF fourni (Code Fiscal Marocain) et des extraits de contexte récupérés via une recherche vectorielle.
-
-    **Tâche :** Répondez de manière détaillée à la question suivante. Basez votre réponse *strictement* sur les informations disponibles dans le fichier PDF téléversé et les vecteurs de contexte fournis.
-
-    **Fichier PDF téléversé :** {pdf_file_object.display_name if pdf_file_object else 'N/A'} [Référence interne : Vous avez accès au contenu de ce fichier]
-    **Vecteurs de Contexte issus de la Recherche Documentaire :**
-    ---
-    {context_string}
-    ---
-
-    **Question :**
-    {question}
-
-    **Instructions pour le Format de Réponse :**
-    1. Fournissez une réponse complète et détaillée dérivée *uniquement* du PDF et des extraits de contexte.
-    2. Identifiez le numéro d'article *principal* du PDF qui soutient l'essentiel de votre réponse. Si plusieurs articles sont pertinents, choisissez celui qui est le plus central. Si l'information provient principalement des extraits de contexte sans numéros d'article clairs, indiquez-le.
-    3. Structurez votre réponse *exactement* de la manière suivante :
-       `Selon l'Article [Numéro d'Article Principal ou "Extraits de Contexte"] : [Votre réponse détaillée utilisant les informations du PDF et/ou des contextes]. Références Utilisées : (Article X, Article Y du PDF ; Extrait de Contexte Z)`
-    4. Dans la partie "Références Utilisées", listez tous les articles spécifiques (ex. Article 5, Article 6 A) du PDF et/ou des extraits de contexte (ex. Extrait de Contexte 1, Extrait de Contexte 3) que vous avez utilisés pour formuler *l'intégralité* de la réponse.
-    5. Soyez précis et assurez-vous que la réponse est directement étayée par les documents fournis. N'ajoutez pas d'informations externes ni ne faites d'hypothèses.
-
-    **Réponse :**
-    """
-
-    # 3. Call Gemini API with Retry Logic and delay between calls
-    generated_answer = None
-    for attempt in range(MAX_RETRIES):
+    pdf_line = (f"**Fichier PDF téléversé :** {pdf_file_object.display_name} [Référence interne : Vous avez accès au contenu de ce fichier]"
+                if pdf_file_object else "**Fichier PDF téléversé :** N/A (seuls les extraits ci-dessous sont fournis)")
+    prompt = PROMPT_TEMPLATE.format(pdf_line=pdf_line, context_string=context_string, question=question,
+                                    **PROMPT_SOURCES)
+
+    prompt_words.append(count_words(prompt))
+    print(f"  Prompt words (estimate): {prompt_words[-1]}" + (" + attached PDF" if pdf_file_object else ""))
+
+    # 3. Call Gemini API with Retry Logic and delay between calls (cached answers skip both)
+    cache_args = dict(file_path=PDF_PATH if pdf_file_object else None,
+                      template=PROMPT_TEMPLATE, item=question)
+    generated_answer = llm_cache.get("gemini", GEMINI_MODEL_NAME, None, prompt, **cache_args)
+    cached = generated_answer is not None
+    if cached:
+        print("  Cached answer reused.")
+    for attempt in range(0 if cached else MAX_RETRIES):
         try:
             print(f"  Calling Gemini API (Attempt {attempt + 1}/{MAX_RETRIES})...")
-            response = model.generate_content([prompt, pdf_file_object])
+            response = model.generate_content([prompt, pdf_file_object] if pdf_file_object else prompt)
+            if response.usage_metadata:
+                 prompt_tokens.append(response.usage_metadata.prompt_token_count)
+                 print(f"  Prompt tokens (API): {prompt_tokens[-1]}")
             if response.parts:
                  generated_answer = response.text.strip()
+                 llm_cache.put("gemini", GEMINI_MODEL_NAME, None, prompt, generated_answer, **cache_args)
                  print("  Gemini response received.")
             elif response.prompt_feedback and response.prompt_feedback.block_reason:
                  print(f"  Warning: Prompt blocked. Reason: {response.prompt_feedback.block_reason}")
@@ -193,8 +235,16 @@ for item in tqdm(questions_list, desc="Generating Answers"):
          except Exception as e:
              print(f"  Error saving output JSON file: {e}")
     
-    # Delay after each successful call to prevent rate limit issues
-    print("  Waiting 10 seconds before processing the next question...")
-    time.sleep(10)
-
+    # Delay after each API call to prevent rate limit issues
+    if not cached:
+        print("  Waiting 10 seconds before processing the next question...")
+        time.sleep(10)
+
+if prompt_words:
+    print(f"\nPrompt words (estimate): mean {sum(prompt_words) / len(prompt_words):.0f}, max {max(prompt_words)}")
+if prompt_tokens:
+    print(f"Prompt tokens (API, {len(prompt_tokens)} calls): mean {sum(prompt_tokens) / len(prompt_tokens):.0f}, "
+          f"max {max(prompt_tokens)}")
+print(f"LLM cache: {llm_cache.hits} hits, {llm_cache.misses} misses")
+llm_cache.close()
 print("\nScript finished.")
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Persistent prompt → response cache for LLM generation (SQLite).
+
+An entry is keyed by (provider, model, temperature, normalised prompt hash,
+attached file hash). Prompts are normalised by collapsing whitespace, so
+re-indenting a template does not invalidate the cache.
+
+Modes
+-----
+exact     hit only for the same prompt (default)
+template  hit for the same item (e.g. the question) and the same prompt
+          template, even if the retrieved context changed – after a
+          template edit only the affected entries are regenerated
+off       never read (entries are still written)
+
+The database is trimmed to `max_bytes` of responses, least recently used
+entries first.
+
+    cache = ResponseCache(mode=os.getenv("LLM_CACHE_MODE", "exact"))
+    answer = cache.get("openai", MODEL, 0.0, prompt, template=TEMPLATE, item=question)
+    if answer is None:
+        answer = call_llm(prompt)
+        cache.put("openai", MODEL, 0.0, prompt, answer, template=TEMPLATE, item=question)
+
+Usage
+-----
+python llm_cache.py stats
+python llm_cache.py purge --model gpt-4o-mini-2024-07-18
+"""
+from __future__ import annotations
+import argparse, hashlib, os, sqlite3, time
+from pathlib import Path
+# ────────────────────────────────────────────────────────────────────────────
+CACHE_PATH = Path("llm_cache.sqlite")
+MAX_BYTES  = 256 * 1024 * 1024      # responses kept before LRU eviction
+MODES      = ("exact", "template", "off")
+# ────────────────────────────────────────────────────────────────────────────
+_file_hashes: dict[tuple, str] = {}
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _temp(temperature: float | None) -> float:
+    return -1.0 if temperature is None else float(temperature)     # None: provider default
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.split())
+
+
+def file_hash(path: str | Path | None) -> str:
+    """Content hash of an attached file, memoised on (path, size, mtime)."""
+    if not path:
+        return ""
+    st = os.stat(path)
+    key = (str(path), st.st_size, st.st_mtime_ns)
+    if key not in _file_hashes:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        _file_hashes[key] = h.hexdigest()
+    return _file_hashes[key]
+
+
+class ResponseCache:
+    def __init__(self, path: Path | str = CACHE_PATH, max_bytes: int = MAX_BYTES, mode: str = "exact"):
+        if mode not in MODES:
+            raise ValueError(f"unknown cache mode: {mode} (expected one of {MODES})")
+        self.mode      = mode
+        self.max_bytes = max_bytes
+        self.hits = self.misses = 0
+        self.conn = sqlite3.connect(str(path))
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key           TEXT PRIMARY KEY,
+                provider      TEXT NOT NULL,
+                model         TEXT NOT NULL,
+                temperature   REAL NOT NULL,
+                prompt_hash   TEXT NOT NULL,
+                file_hash     TEXT NOT NULL,
+                template_hash TEXT NOT NULL,
+                item_hash     TEXT NOT NULL,
+                response      TEXT NOT NULL,
+                size          INTEGER NOT NULL,
+                created       REAL NOT NULL,
+                last_used     REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS by_template ON responses
+                (provider, model, temperature, template_hash, item_hash, file_hash);
+            CREATE INDEX IF NOT EXISTS by_last_used ON responses (last_used);
+        """)
+
+    @staticmethod
+    def _key(provider, model, temperature, prompt_hash, f_hash) -> str:
+        return _sha256("\0".join((provider, model, repr(_temp(temperature)), prompt_hash, f_hash)))
+
+    def get(self, provider: str, model: str, temperature: float | None, prompt: str,
+            file_path: str | Path | None = None, template: str = "", item: str = "") -> str | None:
+        if self.mode == "off":
+            self.misses += 1
+            return None
+        f_hash = file_hash(file_path)
+        if self.mode == "template":
+            row = self.conn.execute(
+                "SELECT key, response FROM responses WHERE provider=? AND model=? AND temperature=?"
+                " AND template_hash=? AND item_hash=? AND file_hash=? ORDER BY created DESC LIMIT 1",
+                (provider, model, _temp(temperature), _sha256(normalize_prompt(template)),
+                 _sha256(item), f_hash)).fetchone()
+        else:
+            key = self._key(provider, model, temperature, _sha256(normalize_prompt(prompt)), f_hash)
+            row = self.conn.execute("SELECT key, response FROM responses WHERE key=?", (key,)).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        with self.conn:
+            self.conn.execute("UPDATE responses SET last_used=? WHERE key=?", (time.time(), row[0]))
+        return row[1]
+
+    def put(self, provider: str, model: str, temperature: float | None, prompt: str, response: str,
+            file_path: str | Path | None = None, template: str = "", item: str = "") -> None:
+        f_hash = file_hash(file_path)
+        p_hash = _sha256(normalize_prompt(prompt))
+        now    = time.time()
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (self._key(provider, model, temperature, p_hash, f_hash), provider, model,
+                 _temp(temperature), p_hash, f_hash, _sha256(normalize_prompt(template)),
+                 _sha256(item), response, len(response.encode("utf-8")), now, now))
+        self.evict()
+
+    def size(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the responses fit in max_bytes."""
+        excess = self.size() - self.max_bytes
+        if excess <= 0:
+            return 0
+        doomed, freed = [], 0
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if freed >= excess:
+                break
+            doomed.append((key,))
+            freed += size
+        with self.conn:
+            self.conn.executemany("DELETE FROM responses WHERE key=?", doomed)
+        return len(doomed)
+
+    def close(self):
+        self.conn.close()
+# ---------------------------------------------------------------------------
+
+def main():
+    ap = argparse.ArgumentParser(description="Inspect or purge the LLM response cache")
+    ap.add_argument("command", choices=("stats", "purge"))
+    ap.add_argument("--path", type=Path, default=CACHE_PATH)
+    ap.add_argument("--model", help="purge only this model's entries")
+    args = ap.parse_args()
+
+    cache = ResponseCache(args.path)
+    if args.command == "purge":
+        where, params = ("WHERE model=?", (args.model,)) if args.model else ("", ())
+        with cache.conn:
+            n = cache.conn.execute(f"DELETE FROM responses {where}", params).rowcount
+        print(f"Purged {n} entries")
+    for provider, model, n, size in cache.conn.execute(
+            "SELECT provider, model, COUNT(*), SUM(size) FROM responses GROUP BY provider, model"):
+        print(f"{provider:<8} {model:<32} {n:>6} entries  {size / 1e6:.1f} MB")
+    cache.close()
+
+if __name__ == "__main__":
+    main()
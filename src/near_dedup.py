@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MinHash near-duplicate detection for short and medium texts.
+
+Each text becomes a set of word shingles; `num_perm` MinHash values estimate
+the Jaccard similarity between two sets. LSH banding only compares texts that
+share at least one band, so the cost grows with the number of texts and not
+with the number of pairs. Candidate pairs are confirmed when their signature
+agreement is at least `threshold`.
+
+    groups = near_duplicate_groups(texts, threshold=0.85)
+    keep   = [g[0] for g in groups]                  # first text of each group
+
+When texts arrive as a stream (indexing), NearDuplicateIndex answers the same
+question one text at a time and remembers which copies each kept text stands for:
+
+    index = NearDuplicateIndex(threshold=0.9)
+    if index.add(text, key) is None: embed(text)      # else: a copy of an indexed text
+    index.duplicates                                  # {canonical key: [copy keys]}
+
+pip install numpy
+"""
+from __future__ import annotations
+import hashlib, re, unicodedata
+from collections import defaultdict
+import numpy as np
+# ────────────────────────────────────────────────────────────────────────────
+NUM_PERM  = 128
+BANDS     = 32           # 32 bands × 4 rows: pairs above ~0.5 Jaccard become candidates
+SHINGLE   = 3            # words per shingle
+THRESHOLD = 0.85
+SEED      = 1
+# ────────────────────────────────────────────────────────────────────────────
+_PRIME = (1 << 61) - 1
+_WORD  = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Lower-case, strip accents and punctuation: 'Où est-ce ?' → 'ou est ce'."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return " ".join(_WORD.findall("".join(c for c in text if not unicodedata.combining(c))))
+
+
+def shingles(text: str, size: int = SHINGLE) -> set[str]:
+    words = normalize(text).split()
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = SEED):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, items: set[str]) -> np.ndarray:
+        if not items:
+            return np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        h = np.fromiter((int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little")
+                         for s in items), dtype=np.uint64, count=len(items)) % _PRIME
+        # (a·h + b) mod p on uint64 may wrap; the wrap is a fixed permutation too
+        return ((h[:, None] * self.a[None, :] + self.b[None, :]) % _PRIME).min(axis=0)
+
+
+def signatures(texts: list[str], hasher: MinHasher | None = None, size: int = SHINGLE) -> np.ndarray:
+    hasher = hasher or MinHasher()
+    return np.stack([hasher.signature(shingles(t, size)) for t in texts]) if texts else \
+        np.empty((0, hasher.num_perm), dtype=np.uint64)
+
+
+def candidate_pairs(sigs: np.ndarray, bands: int = BANDS) -> set[tuple[int, int]]:
+    rows  = sigs.shape[1] // bands
+    pairs = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i, key in enumerate(map(bytes, sigs[:, band * rows:(band + 1) * rows])):
+            buckets[key].append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+def near_duplicate_groups(texts: list[str], threshold: float = THRESHOLD, bands: int = BANDS,
+                          size: int = SHINGLE) -> list[list[int]]:
+    """Partition text indices into groups of near-duplicates (each group sorted, groups by first index)."""
+    sigs   = signatures(texts, size=size)
+    parent = list(range(len(texts)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in candidate_pairs(sigs, bands):
+        if (sigs[i] == sigs[j]).mean() >= threshold:
+            ri, rj = find(i), find(j)
+            if ri != rj:
+                parent[max(ri, rj)] = min(ri, rj)
+
+    groups = defaultdict(list)
+    for i in range(len(texts)):
+        groups[find(i)].append(i)
+    return sorted(groups.values())
+
+
+class NearDuplicateIndex:
+    """Streaming LSH index of distinct texts.
+
+    `add` returns the key of the already indexed text a new text near-duplicates
+    (the one with the highest signature agreement), or None after indexing it.
+    The first text of a group is its canonical copy; later copies are not
+    indexed, only recorded in `duplicates` as back-references.
+    """
+
+    def __init__(self, threshold: float = THRESHOLD, bands: int = BANDS, size: int = SHINGLE,
+                 hasher: MinHasher | None = None):
+        self.hasher     = hasher or MinHasher()
+        self.threshold  = threshold
+        self.bands      = bands
+        self.rows       = self.hasher.num_perm // bands
+        self.size       = size
+        self.keys       = []
+        self.sigs       = []
+        self.buckets    = [defaultdict(list) for _ in range(bands)]
+        self.duplicates = defaultdict(list)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @property
+    def suppressed(self) -> int:
+        return sum(map(len, self.duplicates.values()))
+
+    def add(self, text: str, key=None):
+        key   = len(self.keys) if key is None else key
+        sig   = self.hasher.signature(shingles(text, self.size))
+        bands = [bytes(sig[b * self.rows:(b + 1) * self.rows]) for b in range(self.bands)]
+
+        best, best_score = None, self.threshold
+        seen = set()
+        for bucket, band in zip(self.buckets, bands):
+            for i in bucket.get(band, ()):
+                if i in seen:
+                    continue
+                seen.add(i)
+                score = (self.sigs[i] == sig).mean()
+                if score >= best_score:
+                    best, best_score = i, score
+        if best is not None:
+            self.duplicates[self.keys[best]].append(key)
+            return self.keys[best]
+
+        for bucket, band in zip(self.buckets, bands):
+            bucket[band].append(len(self.keys))
+        self.keys.append(key)
+        self.sigs.append(sig)
+        return None
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Build orchestrator: the preprocessing scripts as one DAG of cached stages.
+
+    source_pdf ─ clean ─ cleaned_pdf ─┬─ structure ─ cgi_structure ─ chunks ─ chunks_json ─ index ─ index_dir
+                                      └─ flat ────── articles_json
+
+Every artifact is content-addressed. A stage's key hashes its name, the
+source of the scripts it runs, its parameters and the hashes of its inputs:
+
+* same key, outputs intact            → skipped
+* same key, outputs missing/modified  → restored from .pipeline/objects
+* new key                             → run, outputs stored under their hash
+
+Stages whose inputs are ready run in parallel worker processes, so
+`structure` and `flat` extract from the cleaned PDF at the same time.
+
+Paths come from the environment (or .env): CGI_PDF (default
+./input/cgi_cleaned.pdf) and EMBEDDING_MODEL for the index stage. With
+CGI_TEXT set to the text dump, `structure` parses it instead of the cleaned
+PDF, so `chunks` and `index` build without the PDF; `clean` and `flat` still
+need it and are then left out of the default targets (name them to build them). All
+outputs land in --workdir (default .), where the other scripts expect them.
+
+Usage
+-----
+python pipeline.py                      # build everything that is stale
+python pipeline.py chunks --jobs 2      # only what `chunks` needs
+python pipeline.py --status
+python pipeline.py index --force structure
+
+pip install pymupdf numpy python-dotenv
+"""
+from __future__ import annotations
+import argparse, hashlib, json, os, shutil
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable
+# ────────────────────────────────────────────────────────────────────────────
+STATE_DIR = Path(".pipeline")
+JOBS      = 2
+SRC_DIR   = Path(__file__).resolve().parent
+# ────────────────────────────────────────────────────────────────────────────
+
+# ── stage bodies (top level so worker processes can import them) ────────────
+def run_clean(inputs: dict, outputs: dict, params: dict) -> None:
+    from processing import preprocess_pdf
+    preprocess_pdf(str(inputs["source_pdf"]), str(outputs["cleaned_pdf"]))
+
+
+def run_structure(inputs: dict, outputs: dict, params: dict) -> None:
+    from articles_extractor_structured import collect_structure
+    data = collect_structure(inputs["cleaned_pdf"])
+    outputs["cgi_structure"].write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def run_text_structure(inputs: dict, outputs: dict, params: dict) -> None:
+    from text_structure_extractor import collect_structure
+    data = collect_structure(inputs["source_text"])
+    outputs["cgi_structure"].write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def run_flat(inputs: dict, outputs: dict, params: dict) -> None:
+    from article_extractor import collect_articles
+    data = collect_articles(inputs["cleaned_pdf"])
+    outputs["articles_json"].write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def run_chunks(inputs: dict, outputs: dict, params: dict) -> None:
+    from structure_chunker import chunk_structure
+    structure = json.loads(inputs["cgi_structure"].read_text(encoding="utf-8"))
+    chunks = chunk_structure(structure, max_tokens=params["max_tokens"])
+    outputs["chunks_json"].write_text(json.dumps(chunks, ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def run_index(inputs: dict, outputs: dict, params: dict) -> None:
+    import numpy as np
+    from embedding_backend import load_embedder
+    from quantization import QuantizedIndex
+    from structure_chunker import HIERARCHY
+    chunks  = json.loads(inputs["chunks_json"].read_text(encoding="utf-8"))
+    model   = load_embedder(params["model"])
+    vectors = model.encode([c["text"] for c in chunks], batch_size=32, normalize_embeddings=True)
+    # the hierarchy travels with every vector so searches can be narrowed to a TITRE
+    payloads = [{f: c[f] for f in HIERARCHY} for c in chunks]
+    QuantizedIndex(np.asarray(vectors, dtype=np.float32), [c["id"] for c in chunks],
+                   payloads=payloads).save(outputs["index_dir"])
+
+
+@dataclass
+class Stage:
+    name:    str
+    run:     Callable[[dict, dict, dict], None]
+    inputs:  list[str]
+    outputs: list[str]
+    scripts: list[str]                               # sources whose edits invalidate the stage
+    params:  dict = field(default_factory=dict)
+    default: bool = True                             # built when no target is named
+
+
+def default_stages() -> tuple[dict[str, Path], list[Stage]]:
+    artifacts = {
+        "source_pdf":    Path(os.getenv("CGI_PDF", "./input/cgi_cleaned.pdf")),
+        "cleaned_pdf":   Path("cleaned.pdf"),
+        "cgi_structure": Path("cgi_structure.json"),
+        "articles_json": Path("articles.json"),
+        "chunks_json":   Path("chunks.json"),
+        "index_dir":     Path("index"),
+    }
+    stages = [
+        Stage("clean", run_clean, ["source_pdf"], ["cleaned_pdf"], ["processing.py"]),
+        Stage("structure", run_structure, ["cleaned_pdf"], ["cgi_structure"],
+              ["articles_extractor_structured.py"]),
+        Stage("flat", run_flat, ["cleaned_pdf"], ["articles_json"], ["article_extractor.py"]),
+        Stage("chunks", run_chunks, ["cgi_structure"], ["chunks_json"], ["structure_chunker.py"],
+              {"max_tokens": 256}),
+        Stage("index", run_index, ["chunks_json"], ["index_dir"],
+              ["embedding_backend.py", "quantization.py", "structure_chunker.py"],
+              {"model": os.getenv("EMBEDDING_MODEL", "louisbrulenaudet/lemone-gte-embed-max"),
+               "backend": os.getenv("EMBEDDING_BACKEND", "torch"),
+               "quantize": os.getenv("EMBEDDING_QUANTIZE", "0")}),
+    ]
+    if os.getenv("CGI_TEXT"):
+        # structure (and everything after it) from the text dump, without the PDF
+        artifacts["source_text"] = Path(os.environ["CGI_TEXT"])
+        stages[1] = Stage("structure", run_text_structure, ["source_text"], ["cgi_structure"],
+                          ["text_structure_extractor.py"])
+        for stage in (stages[0], stages[2]):         # clean and flat still read the PDF: build them by name
+            stage.default = False
+    return artifacts, stages
+# ---------------------------------------------------------------------------
+
+def _file_hash(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class Store:
+    """Content-addressed copies of artifacts plus the last key of every stage."""
+
+    def __init__(self, root: Path):
+        self.root    = root
+        self.objects = root / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.state_path = root / "state.json"
+        self.state = json.loads(self.state_path.read_text(encoding="utf-8")) if self.state_path.exists() else {}
+        self._hashes: dict[tuple, str] = {}
+
+    def hash(self, path: Path) -> str | None:
+        """sha256 of a file, or of a directory's (relative path, file hash) manifest."""
+        if not path.exists():
+            return None
+        if path.is_file():
+            st  = path.stat()
+            key = (str(path.resolve()), st.st_size, st.st_mtime_ns)
+            if key not in self._hashes:
+                self._hashes[key] = _file_hash(path)
+            return self._hashes[key]
+        manifest = {str(p.relative_to(path)): self.hash(p) for p in sorted(path.rglob("*")) if p.is_file()}
+        return hashlib.sha256(json.dumps(manifest, sort_keys=True).encode()).hexdigest()
+
+    def put(self, path: Path) -> str:
+        digest = self.hash(path)
+        if path.is_file():
+            obj = self.objects / digest
+            if not obj.exists():
+                shutil.copyfile(path, obj)
+        else:
+            manifest = {}
+            for p in sorted(path.rglob("*")):
+                if p.is_file():
+                    manifest[str(p.relative_to(path))] = self.put(p)
+            (self.objects / f"{digest}.dir.json").write_text(json.dumps(manifest), encoding="utf-8")
+        return digest
+
+    def has(self, digest: str) -> bool:
+        return (self.objects / digest).exists() or (self.objects / f"{digest}.dir.json").exists()
+
+    def restore(self, digest: str, path: Path) -> None:
+        manifest = self.objects / f"{digest}.dir.json"
+        if manifest.exists():
+            if path.exists():
+                shutil.rmtree(path)
+            for rel, file_digest in json.loads(manifest.read_text(encoding="utf-8")).items():
+                self.restore(file_digest, path / rel)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(self.objects / digest, path)
+
+    def save(self):
+        self.state_path.write_text(json.dumps(self.state, indent=2), encoding="utf-8")
+
+
+class Pipeline:
+    def __init__(self, artifacts: dict[str, Path], stages: list[Stage], state_dir: Path = STATE_DIR):
+        self.artifacts = artifacts
+        self.stages    = {s.name: s for s in stages}
+        self.producer  = {out: s.name for s in stages for out in s.outputs}
+        self.store     = Store(state_dir)
+
+    def deps(self, name: str) -> set[str]:
+        return {self.producer[i] for i in self.stages[name].inputs if i in self.producer}
+
+    def closure(self, targets: list[str]) -> list[str]:
+        """Targets and everything upstream of them, in topological order."""
+        order, seen = [], set()
+
+        def visit(name):
+            if name in seen:
+                return
+            seen.add(name)
+            for dep in sorted(self.deps(name)):
+                visit(dep)
+            order.append(name)
+
+        for t in targets:
+            if t not in self.stages:
+                raise SystemExit(f"unknown stage: {t} (stages: {', '.join(self.stages)})")
+            visit(t)
+        return order
+
+    def key(self, stage: Stage) -> str:
+        h = hashlib.sha256(stage.name.encode())
+        for script in stage.scripts:
+            h.update(_file_hash(SRC_DIR / script).encode())
+        h.update(json.dumps(stage.params, sort_keys=True).encode())
+        for name in stage.inputs:
+            digest = self.store.hash(self.artifacts[name])
+            if digest is None:
+                raise SystemExit(f"stage {stage.name}: input {name} ({self.artifacts[name]}) not found")
+            h.update(f"{name}={digest}".encode())
+        return h.hexdigest()
+
+    def status(self, stage: Stage) -> str:
+        """'fresh', 'restorable' or 'stale' (inputs must exist)."""
+        last = self.store.state.get(stage.name)
+        if not last or last["key"] != self.key(stage):
+            return "stale"
+        current = {o: self.store.hash(self.artifacts[o]) for o in stage.outputs}
+        if current == last["outputs"]:
+            return "fresh"
+        return "restorable" if all(self.store.has(d) for d in last["outputs"].values()) else "stale"
+
+    def _finish(self, stage: Stage, key: str) -> None:
+        outputs = {}
+        for o in stage.outputs:
+            if not self.artifacts[o].exists():
+                raise RuntimeError(f"stage {stage.name} did not produce {self.artifacts[o]}")
+            outputs[o] = self.store.put(self.artifacts[o])
+        self.store.state[stage.name] = {"key": key, "outputs": outputs}
+        self.store.save()
+
+    def run(self, targets: list[str], jobs: int = JOBS, force: set[str] = frozenset()) -> dict[str, str]:
+        order   = self.closure(targets)
+        result  = {}
+        pending = set(order)
+        running = {}
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            while pending or running:
+                busy  = pending | {name for name, _ in running.values()}
+                ready = [n for n in order if n in pending and not self.deps(n) & busy]
+                for name in ready:
+                    pending.discard(name)
+                    stage = self.stages[name]
+                    state = "stale" if name in force else self.status(stage)
+                    if state == "fresh":
+                        result[name] = "skipped"
+                        continue
+                    if state == "restorable":
+                        for o, digest in self.store.state[name]["outputs"].items():
+                            self.store.restore(digest, self.artifacts[o])
+                        result[name] = "restored"
+                        continue
+                    print(f"▶ {name}")
+                    inputs  = {i: self.artifacts[i] for i in stage.inputs}
+                    outputs = {o: self.artifacts[o] for o in stage.outputs}
+                    running[pool.submit(stage.run, inputs, outputs, stage.params)] = (name, self.key(stage))
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, key = running.pop(future)
+                    future.result()                      # re-raise the stage's error
+                    self._finish(self.stages[name], key)
+                    result[name] = "built"
+                    print(f"✔ {name}")
+        return result
+# ---------------------------------------------------------------------------
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv()
+
+    ap = argparse.ArgumentParser(description="Build the preprocessing artifacts that are out of date")
+    ap.add_argument("targets", nargs="*", help="stages to bring up to date (default: all)")
+    ap.add_argument("--workdir", type=Path, default=Path("."))
+    ap.add_argument("--jobs", type=int, default=JOBS)
+    ap.add_argument("--force", nargs="+", default=[], help="rebuild these stages even if fresh")
+    ap.add_argument("--status", action="store_true", help="only report what would run")
+    args = ap.parse_args()
+
+    source = Path(os.getenv("CGI_PDF", "./input/cgi_cleaned.pdf")).resolve()
+    text   = os.getenv("CGI_TEXT") and Path(os.environ["CGI_TEXT"]).resolve()
+    os.chdir(args.workdir)
+    os.environ["CGI_PDF"] = str(source)
+    if text:
+        os.environ["CGI_TEXT"] = str(text)
+    artifacts, stages = default_stages()
+    pipeline = Pipeline(artifacts, stages)
+    targets  = args.targets or [name for name, stage in pipeline.stages.items() if stage.default]
+
+    if args.status:
+        for name in pipeline.closure(targets):
+            stage = pipeline.stages[name]
+            ready = all(artifacts[i].exists() for i in stage.inputs)
+            print(f"{name:<10} {pipeline.status(stage) if ready else 'waiting'}")
+        return
+
+    result = pipeline.run(targets, jobs=args.jobs, force=set(args.force))
+    print("  ".join(f"{name}: {state}" for name, state in result.items()))
+
+if __name__ == "__main__":
+    main()
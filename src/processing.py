@@ -66,8 +66,8 @@ def extract_articles(pdf_path):
     """
     Extracts PREAMBULE and ARTICLE sections into list of dicts.
     """
-    doc = fitz.open(pdf_path)
-    text = "\n".join(p.get_text() for p in doc)
+    with fitz.open(pdf_path) as doc:
+        text = "\n".join(p.get_text() for p in doc)
 
     entries = []
     pat = re.compile(
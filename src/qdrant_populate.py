@@ -5,48 +5,55 @@ from pathlib import Path
 
 import spacy
 from transformers import AutoTokenizer
-from sentence_transformers import SentenceTransformer
 from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams, PointStruct
+from qdrant_client.http.models import Distance, VectorParams, PointStruct, PayloadSchemaType
+
+from embedding_backend import load_embedder
+from embedding_pool import EmbeddingPool
+from near_dedup import NearDuplicateIndex
+from structure_chunker import HIERARCHY, article_number, chunk_structure, iter_articles
 
 # ─── Configuration ─────────────────────────────────────────────────────────────
 
 JSON_PATH        = "articles.json"
+STRUCTURE_PATH   = "cgi_structure.json"
+CHUNKING         = "structure"      # "structure" (article/paragraph aware) or "sentences"
 # QDRANT_URL       = os.getenv("QDRANT_URL")
 # QDRANT_API_KEY   = os.getenv("QDRANT_API_KEY")
 # COLLECTION_NAME  = "articles"
 
 EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-MAX_TOKENS           = 512
 OVERLAP_TOKENS       = 128
 BATCH_SIZE           = 32
-
-# ─── Load & Initialize ─────────────────────────────────────────────────────────
-
-# 1. Load articles JSON
-with open(JSON_PATH, encoding="utf-8") as f:
-    articles = json.load(f)
-
-# 2. spaCy for sentence splitting (French model; switch if needed)
-nlp = spacy.load("fr_core_news_md")
-
-# 3. HuggingFace tokenizer for MiniLM
-tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME)
-
-# 4. SentenceTransformer embedder
-embedder = SentenceTransformer(EMBEDDING_MODEL_NAME)
-
-# 5. Qdrant client & (re)create collection
-# client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
-# vector_dim = embedder.get_sentence_embedding_dimension()
-# client.recreate_collection(
-#     collection_name=COLLECTION_NAME,
-#     vectors_config=VectorParams(size=vector_dim, distance=Distance.COSINE)
-# )
+WORKERS              = int(os.getenv("EMBEDDING_WORKERS", "1"))   # >1: encode in a process pool
+DEDUP                = os.getenv("DEDUP", "1") == "1"              # index one copy of near-duplicate chunks
+DEDUP_THRESHOLD      = float(os.getenv("DEDUP_THRESHOLD", "0.9"))
+
+# ─── Helper: Hierarchy payload ─────────────────────────────────────────────────
+
+def hierarchy_by_number(structure_path=STRUCTURE_PATH):
+    """Article number → its TITRE / CHAPITRE / Article payload, from cgi_structure.json."""
+    if not Path(structure_path).exists():
+        return {}
+    with open(structure_path, encoding="utf-8") as f:
+        structure = json.load(f)
+    by_number = {}
+    for art in iter_articles(structure):
+        if art["number"]:
+            by_number.setdefault(art["number"], {"titre": art["titre"], "chapitre": art["chapitre"],
+                                                 "article": art["id"], "number": art["number"]})
+    return by_number
+
+
+def create_payload_indexes(client, collection_name):
+    """Keyword indexes on the hierarchy fields, so filtered searches skip other titres."""
+    for field_name in HIERARCHY:
+        client.create_payload_index(collection_name=collection_name, field_name=field_name,
+                                    field_schema=PayloadSchemaType.KEYWORD)
 
 # ─── Helper: Chunk with Overlap ─────────────────────────────────────────────────
 
-def chunk_text(sentences, max_tokens=MAX_TOKENS, overlap=OVERLAP_TOKENS):
+def chunk_text(sentences, tokenizer, max_tokens, overlap=OVERLAP_TOKENS):
     chunks = []
     current_sents = []
     current_len = 0
@@ -79,36 +86,98 @@ def chunk_text(sentences, max_tokens=MAX_TOKENS, overlap=OVERLAP_TOKENS):
 
     return chunks
 
-# ─── Main: Embed & Upload ───────────────────────────────────────────────────────
-
-buffer = []
-
-for art_idx, art in enumerate(articles):
-    title   = art["title"]
-    content = art["content"]
-
-    # Sentence-split
-    doc = nlp(content)
-    sents = [s.text.strip() for s in doc.sents if s.text.strip()]
-
-    # Chunk with overlap
-    text_chunks = chunk_text(sents)
-    with open("log.txt", "a",encoding="utf-8") as log_file:
-        log_file.write(f"Article {art_idx}: {title}\n")
-        for chunk in text_chunks:
-            log_file.write(f"  - {chunk}\n")
+# ─── Main ───────────────────────────────────────────────────────────────────────
+
+def main():
+    # ── Load & Initialize ──
+    # 1. Load articles JSON (flat list, or the TITRE/CHAPITRE tree for structure chunking)
+    with open(STRUCTURE_PATH if CHUNKING == "structure" else JSON_PATH, encoding="utf-8") as f:
+        articles = json.load(f)
+
+    # 2. spaCy for sentence splitting (French model; switch if needed)
+    if CHUNKING == "sentences":
+        nlp = spacy.load("fr_core_news_md")
+
+    # 3. HuggingFace tokenizer for MiniLM
+    tokenizer = AutoTokenizer.from_pretrained(EMBEDDING_MODEL_NAME)
+
+    # 4. Embedder (PyTorch or ONNX Runtime, see embedding_backend.py)
+    # with EMBEDDING_WORKERS > 1 each worker process loads its own copy
+    embedder = (EmbeddingPool(EMBEDDING_MODEL_NAME, workers=WORKERS, batch_size=BATCH_SIZE)
+                if WORKERS > 1 else load_embedder(EMBEDDING_MODEL_NAME))
+
+    # 5. Qdrant client & (re)create collection
+    # client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+    # vector_dim = embedder.get_sentence_embedding_dimension()
+    # client.recreate_collection(
+    #     collection_name=COLLECTION_NAME,
+    #     vectors_config=VectorParams(size=vector_dim, distance=Distance.COSINE)
+    # )
+    # create_payload_indexes(client, COLLECTION_NAME)
+
+    # ── Embed & Upload ──
+    def count_tokens(text):
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    # The embedder truncates its input at max_seq_length wordpieces, [CLS]/[SEP] included;
+    # chunk_structure charges the heading path against what is left
+    max_tokens = embedder.max_seq_length - tokenizer.num_special_tokens_to_add()
+
+    # Every chunk is {"id", "text" (embedded), "body" (compared), "payload"}
+    if CHUNKING == "structure":
+        # Chunks never cross an article and carry their TITRE > CHAPITRE > Article path
+        chunks = [
+            {"id": c["id"], "text": c["text"], "body": c["body"],
+             "payload": {"title": c["article"], "path": c["path"], **{f: c[f] for f in HIERARCHY},
+                         "chunk_index": c["chunk_index"], "text": c["body"]}}
+            for c in chunk_structure(articles, max_tokens=max_tokens, count=count_tokens)
+        ]
+        with open("log.txt", "a", encoding="utf-8") as log_file:
+            for chunk in chunks:
+                log_file.write(f"{chunk['id']}: {chunk['text']}\n")
+    else:
+        # articles.json is flat: the hierarchy comes from cgi_structure.json when it exists
+        hierarchy = hierarchy_by_number()
+        chunks = []
+        for art_idx, art in enumerate(articles):
+            title   = art["title"]
+            content = art["content"]
+
+            # Sentence-split
+            doc = nlp(content)
+            sents = [s.text.strip() for s in doc.sents if s.text.strip()]
+
+            # Chunk with overlap
+            text_chunks = chunk_text(sents, tokenizer, max_tokens)
+            with open("log.txt", "a",encoding="utf-8") as log_file:
+                log_file.write(f"Article {art_idx}: {title}\n")
+                for chunk in text_chunks:
+                    log_file.write(f"  - {chunk}\n")
+
+            chunks.extend(
+                {"id": f"{art_idx}#{chunk_idx}", "text": chunk, "body": chunk,
+                 "payload": {"title": title, "article_index": art_idx, "chunk_index": chunk_idx,
+                             **hierarchy.get(article_number(title), {})}}
+                for chunk_idx, chunk in enumerate(text_chunks)
+            )
+
+    # Boilerplate paragraphs repeated across articles are embedded once; the indexed
+    # copy lists the ids of the chunks it stands for
+    if DEDUP:
+        dedup = NearDuplicateIndex(threshold=DEDUP_THRESHOLD)
+        chunks = [c for c in chunks if dedup.add(c["body"], c["id"]) is None]
+        for chunk in chunks:
+            chunk["payload"]["duplicates"] = dedup.duplicates.get(chunk["id"], [])
+        print(f"{dedup.suppressed} near-duplicate chunks referenced, {len(chunks)} to embed")
 
     # Embed & prepare points
-    embeddings = embedder.encode(text_chunks, batch_size=BATCH_SIZE, show_progress_bar=False)
-    for chunk_idx, vec in enumerate(embeddings):
+    buffer = []
+    embeddings = embedder.encode([c["text"] for c in chunks], batch_size=BATCH_SIZE, show_progress_bar=False)
+    for chunk, vec in zip(chunks, embeddings):
         pt = PointStruct(
             id=str(uuid.uuid4()),
             vector=vec.tolist(),
-            payload={
-                "title": title,
-                "article_index": art_idx,
-                "chunk_index": chunk_idx
-            }
+            payload=chunk["payload"]
         )
         buffer.append(pt)
 
@@ -116,13 +185,20 @@ for art_idx, art in enumerate(articles):
             #client.upsert(collection_name=COLLECTION_NAME, points=buffer)
             buffer = []
 
-# Final flush
-# if buffer:
-    #client.upsert(collection_name=COLLECTION_NAME, points=buffer)
-    #flush to log.txt
-    # with open("log.txt", "a") as log_file:
-    #     for point in buffer:
-    #         log_file.write(f"{point}\n")
-    # buffer = []
+    # Final flush
+    # if buffer:
+        #client.upsert(collection_name=COLLECTION_NAME, points=buffer)
+        #flush to log.txt
+        # with open("log.txt", "a") as log_file:
+        #     for point in buffer:
+        #         log_file.write(f"{point}\n")
+        # buffer = []
+
+    if WORKERS > 1:
+        embedder.close()
+
+    #print(f"✅ Uploaded {sum(len(chunk_text(nlp(a['content']).sents)) for a in articles)} chunks into '{COLLECTION_NAME}'.")
 
-#print(f"✅ Uploaded {sum(len(chunk_text(nlp(a['content']).sents)) for a in articles)} chunks into '{COLLECTION_NAME}'.")
+# spawned embedding workers re-import this module, so nothing runs at import time
+if __name__ == "__main__":
+    main()
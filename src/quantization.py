@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Compact vector index: int8 scalar codes + sign-bit codes for the scan,
+float32 vectors only for re-ranking the final candidates.
+
+Search modes
+------------
+float   exact inner product over the float32 matrix (reference)
+int8    scan int8 codes, re-rank the best `rerank` hits with float32
+binary  Hamming pre-filter on (centred) sign bits → int8 re-score → float32 re-rank
+
+Filtered search
+---------------
+Each vector may carry a payload (its TITRE / CHAPITRE / Article, see
+structure_chunker.HIERARCHY). The payload fields get an inverted index
+value → rows, so `search(..., where={"titre": [...]})` intersects a few
+posting lists and scans only those rows instead of filtering the top-k
+afterwards: fewer rows to score, and no relevant hit crowded out by
+chunks of other titres.
+
+Vectors are expected L2-normalised (cosine == inner product), which is what
+`SentenceTransformer.encode(..., normalize_embeddings=True)` returns.
+
+On disk an index is a directory of .npy files; `load()` memory-maps the
+float32 matrix so only the rows touched by re-ranking are paged in, while
+the int8 (4× smaller) and binary (32× smaller) codes stay in RAM.
+
+pip install numpy
+"""
+from __future__ import annotations
+import json
+from pathlib import Path
+import numpy as np
+# ────────────────────────────────────────────────────────────────────────────
+BINARY_CANDIDATES = 200      # survivors of the Hamming pre-filter
+RERANK            = 40       # int8 survivors re-scored with float32
+INT8_BLOCK        = 4096     # int8 rows upcast to float32 at a time during a scan
+INDEXED_FIELDS    = ("titre", "chapitre", "article", "number")
+# ────────────────────────────────────────────────────────────────────────────
+POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _top(scores: np.ndarray, k: int, largest: bool = True) -> np.ndarray:
+    """Indices of the k best scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    keyed = -scores if largest else scores
+    part = np.argpartition(keyed, k - 1)[:k]
+    return part[np.argsort(keyed[part], kind="stable")]
+
+
+class PayloadIndex:
+    """Per-row payload dicts plus value → rows posting lists for the indexed fields."""
+
+    def __init__(self, payloads: list[dict], fields: tuple[str, ...] = INDEXED_FIELDS):
+        self.payloads = payloads
+        self.fields   = fields
+        postings: dict[str, dict] = {f: {} for f in fields}
+        for row, payload in enumerate(payloads):
+            for f in fields:
+                if payload.get(f) is not None:
+                    postings[f].setdefault(payload[f], []).append(row)
+        self.postings = {f: {v: np.asarray(r, dtype=np.int64) for v, r in values.items()}
+                         for f, values in postings.items()}
+
+    def values(self, field: str) -> list:
+        """Distinct values of an indexed field, in first-seen order."""
+        return list(self.postings[field])
+
+    def rows(self, where: dict) -> np.ndarray:
+        """Sorted rows whose payload matches every `field: value | [values]` condition."""
+        rows = None
+        for f, accepted in where.items():
+            accepted = accepted if isinstance(accepted, (list, tuple, set)) else [accepted]
+            if f in self.postings:
+                hits = [self.postings[f][v] for v in accepted if v in self.postings[f]]
+                match = np.unique(np.concatenate(hits)) if hits else np.empty(0, dtype=np.int64)
+            else:                                   # not indexed: scan the payloads
+                accepted = set(accepted)
+                match = np.asarray([i for i, p in enumerate(self.payloads) if p.get(f) in accepted],
+                                   dtype=np.int64)
+            rows = match if rows is None else np.intersect1d(rows, match, assume_unique=True)
+        return np.arange(len(self.payloads)) if rows is None else rows
+
+
+class QuantizedIndex:
+    def __init__(self, vectors: np.ndarray, ids: list[str] | None = None,
+                 scale: np.ndarray | None = None, codes: np.ndarray | None = None,
+                 bits: np.ndarray | None = None, center: np.ndarray | None = None,
+                 payloads: list[dict] | None = None):
+        self.vectors = vectors
+        self.ids     = list(ids) if ids is not None else [str(i) for i in range(len(vectors))]
+        self.payload = PayloadIndex(payloads) if payloads is not None else None
+        if scale is None:
+            # symmetric per-dimension scale: the largest |x| maps to 127
+            peak  = np.abs(vectors).max(axis=0) if len(vectors) else np.ones(vectors.shape[1])
+            scale = np.where(peak > 0, peak / 127.0, 1.0).astype(np.float32)
+        if center is None:
+            # sign bits of centred vectors split each dimension evenly
+            center = (vectors.mean(axis=0) if len(vectors) else np.zeros(vectors.shape[1])).astype(np.float32)
+        self.scale  = scale
+        self.center = center
+        self.codes  = codes if codes is not None else self._int8(vectors)
+        self.bits   = bits if bits is not None else np.packbits(vectors > center, axis=1)
+
+    # ── encoding ──────────────────────────────────────────────────────────
+    def _int8(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors / self.scale), -127, 127).astype(np.int8)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def nbytes(self) -> dict:
+        return {"float32": int(self.vectors.nbytes), "int8": int(self.codes.nbytes),
+                "binary": int(self.bits.nbytes)}
+
+    # ── scoring stages ────────────────────────────────────────────────────
+    def _hamming(self, query: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        qbits = np.packbits(query > self.center)
+        bits  = self.bits if rows is None else self.bits[rows]
+        return POPCOUNT[np.bitwise_xor(bits, qbits)].sum(axis=1, dtype=np.int32)
+
+    def _int8_scores(self, query: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        # BLAS has no int8 kernel: scoring block by block bounds the float32 copy to INT8_BLOCK rows
+        q = (query * self.scale).astype(np.float32)
+        n = len(self) if rows is None else len(rows)
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, INT8_BLOCK):
+            span  = slice(start, start + INT8_BLOCK)
+            codes = self.codes[span] if rows is None else self.codes[rows[span]]
+            scores[span] = codes.astype(np.float32) @ q
+        return scores
+
+    def _float_scores(self, query: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        if rows is None:
+            return np.asarray(self.vectors, dtype=np.float32) @ query
+        # read memmapped rows in file order, then put the scores back in `rows` order
+        order  = np.argsort(rows)
+        scores = np.asarray(self.vectors[rows[order]], dtype=np.float32) @ query
+        out = np.empty_like(scores)
+        out[order] = scores
+        return out
+
+    # ── search ────────────────────────────────────────────────────────────
+    def search(self, query: np.ndarray, k: int = 10, mode: str = "binary",
+               rows: np.ndarray | None = None, binary_candidates: int = BINARY_CANDIDATES,
+               rerank: int = RERANK, where: dict | None = None) -> list[tuple[str, float]]:
+        """Return the top-k (id, cosine) pairs; `rows` and the payload filter `where` restrict the scan."""
+        query = np.asarray(query, dtype=np.float32).ravel()
+        rows  = np.arange(len(self)) if rows is None else np.asarray(rows)
+        if where:
+            if self.payload is None:
+                raise ValueError("filtered search needs an index built with payloads")
+            rows = rows[np.isin(rows, self.payload.rows(where))]
+
+        if mode == "float":
+            best = rows[_top(self._float_scores(query, rows), k)]
+        elif mode in ("int8", "binary"):
+            cand = rows
+            if mode == "binary":
+                cand = cand[_top(self._hamming(query, cand), max(binary_candidates, k), largest=False)]
+            cand = cand[_top(self._int8_scores(query, cand), max(rerank, k))]
+            best = cand[_top(self._float_scores(query, cand), k)]
+        else:
+            raise ValueError(f"unknown search mode: {mode}")
+
+        scores = self._float_scores(query, best) if len(best) else []
+        return [(self.ids[i], float(s)) for i, s in zip(best, scores)]
+
+    # ── persistence ───────────────────────────────────────────────────────
+    def save(self, directory: Path) -> None:
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        np.save(directory / "vectors.npy", np.asarray(self.vectors, dtype=np.float32))
+        np.save(directory / "codes.npy", self.codes)
+        np.save(directory / "bits.npy", self.bits)
+        np.save(directory / "scale.npy", self.scale)
+        np.save(directory / "center.npy", self.center)
+        (directory / "ids.json").write_text(json.dumps(self.ids, ensure_ascii=False), encoding="utf-8")
+        if self.payload is not None:
+            (directory / "payloads.json").write_text(json.dumps(self.payload.payloads, ensure_ascii=False),
+                                                     encoding="utf-8")
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> "QuantizedIndex":
+        directory = Path(directory)
+        payloads  = directory / "payloads.json"
+        return cls(
+            vectors=np.load(directory / "vectors.npy", mmap_mode="r" if mmap else None),
+            ids=json.loads((directory / "ids.json").read_text(encoding="utf-8")),
+            scale=np.load(directory / "scale.npy"),
+            codes=np.load(directory / "codes.npy"),
+            bits=np.load(directory / "bits.npy"),
+            center=np.load(directory / "center.npy"),
+            payloads=json.loads(payloads.read_text(encoding="utf-8")) if payloads.exists() else None,
+        )
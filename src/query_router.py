@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Route a question to the TITRE partitions it is about before retrieval.
+
+Questions name their tax domain far more often than not ("l'IS", "la TVA",
+"droits d'enregistrement", "selon l'article 9 bis"), so a cheap router can
+narrow the search to one or two TITRE partitions (quantization.py `where=`,
+Chroma `where`). Three signals, cheapest first:
+
+    citations  "article 9 bis" → the TITRE holding that article
+    keywords   weighted rule set per tax domain (IS, IR, TVA, DE, …)
+    centroids  cosine between the query embedding and the mean vector of each
+               TITRE's chunks (only with an index built with payloads)
+
+Every signal scores TITRE labels; the partitions kept are those within
+KEEP_RATIO of the best score. When the best score is weak, or the kept
+partitions hold less than MIN_CONFIDENCE of the score mass, the route is
+empty and the caller searches the whole collection.
+
+    router = QueryRouter.from_structure(structure, index)
+    route  = router.route(question, query_vector)       # Route(titres, domains, confidence, signal)
+    hits   = index.search(query_vector, 10, where={"titre": route.titres} if route.titres else None)
+
+Usage
+-----
+python query_router.py "Quel est le taux de la TVA sur les importations ?"
+python query_router.py --eval updated_questions.json finetuning_dataset.json --structure cgi_structure.json
+
+pip install numpy
+"""
+from __future__ import annotations
+import argparse, json, re
+from dataclasses import dataclass, field
+from pathlib import Path
+import numpy as np
+
+from structure_chunker import fold, iter_articles
+# ────────────────────────────────────────────────────────────────────────────
+STRUCTURE_PATH  = Path("cgi_structure.json")
+STRONG          = 3        # domain name or acronym ("TVA", "impôt sur le revenu")
+WEAK            = 1        # vocabulary typical of the domain ("salaire", "prorata")
+CITATION        = 4        # the question cites an article of the TITRE
+MIN_SCORE       = 2        # a single weak keyword does not route
+KEEP_RATIO      = 0.5      # partitions kept: score ≥ KEEP_RATIO × best
+MIN_CONFIDENCE  = 0.6      # share of the score mass the kept partitions must hold
+MAX_PARTITIONS  = 3        # more than this is no narrowing: search globally
+CENTROID_TEMP   = 0.02     # softmax temperature over centroid cosines
+# ────────────────────────────────────────────────────────────────────────────
+# domain: (TITRE name patterns, [(keyword pattern, weight)]) — matched on fold()ed text,
+# keywords from a word start
+DOMAINS = {
+    "IS": ([r"impot sur les societes"], [
+        (r"impot sur les societes|is\b", STRONG),
+        (r"societes?\b|benefices?\b|resultat fiscal|amortissements?|provisions?\b|cooperatives?"
+         r"|holding|regime suspensif|fusions?\b|scission", WEAK)]),
+    "IR": ([r"impot sur le revenu"], [
+        (r"impot sur le revenu|ir\b", STRONG),
+        (r"salari|salaires?\b|pensions?\b|rentes?\b|revenus? (?:fonciers|agricoles|professionnels|de capitaux)"
+         r"|profits? fonciers|foyer|personnes? physiques?", WEAK)]),
+    "TVA": ([r"taxe sur la valeur ajoutee"], [
+        (r"tva\b|taxe sur la valeur ajoutee", STRONG),
+        (r"deductions?\b|prorata|importations?\b|assujettis?\b|credit de taxe|taux reduit|facturation", WEAK)]),
+    "DE": ([r"droits d.enregistrement"], [
+        (r"(?:droits? d.)?enregistrement", STRONG),
+        (r"mutations?\b|donations?\b|successions?\b|actes? (?:notaries|sous seing)|bail\b|terrains?\b", WEAK)]),
+    "timbre": ([r"droits de timbre"], [(r"timbres?\b", STRONG)]),
+    "vehicules": ([r"sur les vehicules"], [(r"vehicules?\b|vignette|automobiles?\b", STRONG)]),
+    "procedures": ([r"controle de l.impot", r"contentieux de l.impot"], [
+        (r"verification|controle fiscal|contentieux|reclamations?\b|rectification|commission (?:locale|nationale)",
+         STRONG),
+        (r"procedures?\b|notification|prescription|droit de communication|accords? a l.amiable|recours", WEAK)]),
+    "sanctions": ([r"\bsanctions\b"], [(r"sanctions?\b|amendes?\b|penalites?\b|majorations?\b", STRONG)]),
+    "CSS": ([r"contribution sociale de solidarite"], [(r"contribution sociale de solidarite", STRONG)]),
+    "assurances": ([r"contrats d.assurances"], [(r"assurances?\b", STRONG)]),
+    "aerien": ([r"taxe aerienne"], [(r"taxe aerienne|billets? d.avion|aeroports?\b", STRONG)]),
+    "ciment": ([r"\bciment\b"], [(r"ciment\b", STRONG)]),
+}
+CITE_RX = re.compile(r"\barticles?\s+(premier|\d+)(?:\s+(bis|ter|quater|quinquies|sexies|septies|octies"
+                     r"|nonies|decies))?\b(?!\s+(?:du decret|de la loi|de la lf|de l.arrete|du dahir))")
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Route:
+    titres:     list[str]                       # empty: search everything
+    domains:    list[str] = field(default_factory=list)
+    confidence: float = 0.0
+    signal:     str = "global"                  # "rules", "centroids" or "global"
+
+
+def titre_name(label: str) -> str:
+    """"TITRE III – LA TAXE … – CHAPITRE …" → "TITRE III – LA TAXE …": PDF labels run into their first chapitre."""
+    return " – ".join(label.split(" – ")[:2])
+
+
+def titre_centroids(index) -> dict[str, np.ndarray]:
+    """L2-normalised mean vector of each TITRE's rows in a QuantizedIndex built with payloads."""
+    if index is None or index.payload is None or "titre" not in index.payload.postings:
+        return {}
+    centroids = {}
+    for titre, rows in index.payload.postings["titre"].items():
+        mean = np.asarray(index.vectors[np.sort(rows)], dtype=np.float32).mean(axis=0)
+        centroids[titre] = mean / (np.linalg.norm(mean) or 1.0)
+    return centroids
+
+
+class QueryRouter:
+    def __init__(self, titres: list[str], articles: dict[str, list[str]] | None = None,
+                 centroids: dict[str, np.ndarray] | None = None, domains: dict = DOMAINS):
+        """`titres`: the partition labels, as stored in the index payloads;
+        `articles`: article number → titres holding it (from cgi_structure.json)."""
+        self.titres   = list(dict.fromkeys(t for t in titres if t))
+        self.articles = articles or {}
+        self.rules    = []                      # (domain, [titres], [(compiled pattern, weight)])
+        for name, (labels, keywords) in domains.items():
+            owned = [t for t in self.titres if any(re.search(p, fold(titre_name(t))) for p in labels)]
+            if owned:
+                self.rules.append((name, owned, [(re.compile(rf"\b(?:{p})"), w) for p, w in keywords]))
+        self.centroid_titres = list(centroids or {})
+        self.centroids = np.stack([centroids[t] for t in self.centroid_titres]) if centroids else None
+
+    @classmethod
+    def from_structure(cls, structure: list, index=None) -> "QueryRouter":
+        articles: dict[str, list[str]] = {}
+        titres = []
+        for art in iter_articles(structure):
+            titres.append(art["titre"])
+            if art["number"] and art["titre"] not in articles.setdefault(art["number"], []):
+                articles[art["number"]].append(art["titre"])
+        return cls(titres, articles, titre_centroids(index))
+
+    # -- signals ------------------------------------------------------------
+    def rule_scores(self, question: str) -> tuple[dict[str, float], list[str]]:
+        text = fold(question)
+        scores: dict[str, float] = {}
+        domains = []
+        for name, owned, keywords in self.rules:
+            score = sum(w * len(set(rx.findall(text))) for rx, w in keywords)    # distinct terms
+            if score:
+                domains.append(name)
+                for titre in owned:
+                    scores[titre] = scores.get(titre, 0.0) + score
+        for number, suffix in CITE_RX.findall(text):
+            number = "1" if number == "premier" else number
+            owners = self.articles.get(f"{number} {suffix}" if suffix else number, [])
+            for titre in owners:                # an ambiguous number splits its weight
+                scores[titre] = scores.get(titre, 0.0) + CITATION / len(owners)
+        return scores, domains
+
+    def centroid_scores(self, vector: np.ndarray) -> dict[str, float]:
+        sims  = self.centroids @ np.asarray(vector, dtype=np.float32).ravel()
+        probs = np.exp((sims - sims.max()) / CENTROID_TEMP)
+        probs /= probs.sum()
+        return dict(zip(self.centroid_titres, probs.tolist()))
+
+    # -- routing ------------------------------------------------------------
+    def select(self, scores: dict[str, float], min_score: float) -> tuple[list[str], float]:
+        """Partitions near the best score and the share of the mass they hold; ([], share) if unsure."""
+        if not scores:
+            return [], 0.0
+        best = max(scores.values())
+        kept = sorted((t for t, s in scores.items() if s >= KEEP_RATIO * best), key=lambda t: -scores[t])
+        share = sum(scores[t] for t in kept) / sum(scores.values())
+        if best < min_score or share < MIN_CONFIDENCE or len(kept) > MAX_PARTITIONS:
+            return [], share
+        return kept, share
+
+    def route(self, question: str, vector: np.ndarray | None = None) -> Route:
+        scores, domains = self.rule_scores(question)
+        titres, confidence = self.select(scores, MIN_SCORE)
+        if titres:
+            return Route(titres, domains, confidence, "rules")
+        if vector is not None and self.centroids is not None:
+            titres, share = self.select(self.centroid_scores(vector), 0.0)
+            if titres:
+                return Route(titres, domains, share, "centroids")
+        return Route([], domains, confidence)
+# ---------------------------------------------------------------------------
+
+def evaluate(router: QueryRouter, structure: list, paths: list[Path]) -> dict:
+    """Share of questions routed, and of routed ones whose cited articles lie in the kept partitions."""
+    from evaluate_retrieval import base_number, load_questions
+    titre_of: dict[str, set] = {}
+    for art in iter_articles(structure):
+        titre_of.setdefault(base_number(art["number"]), set()).add(art["titre"])
+    routed = correct = 0
+    questions = load_questions(paths)
+    for q in questions:
+        route = router.route(q["question"])
+        gold  = set().union(*(titre_of.get(base_number(n), set()) for n in q["gold"]))
+        if route.titres:
+            routed  += 1
+            correct += bool(gold & set(route.titres))
+        print(f"  {route.signal:<8} {','.join(route.domains) or '-':<14} {q['question'][:70]}")
+    return {"questions": len(questions), "routed": routed,
+            "precision": correct / routed if routed else 0.0}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Route questions to TITRE partitions")
+    ap.add_argument("question", nargs="?")
+    ap.add_argument("--structure", type=Path, default=STRUCTURE_PATH)
+    ap.add_argument("--eval", type=Path, nargs="+", metavar="QUESTIONS")
+    args = ap.parse_args()
+
+    if not args.structure.exists():
+        raise SystemExit(f"{args.structure} not found – run articles_extractor_structured.py first.")
+    structure = json.loads(args.structure.read_text(encoding="utf-8"))
+    router = QueryRouter.from_structure(structure)
+    if args.eval:
+        print(json.dumps(evaluate(router, structure, args.eval), indent=2))
+    elif args.question:
+        route = router.route(args.question)
+        print(json.dumps(route.__dict__, ensure_ascii=False, indent=2))
+    else:
+        ap.error("give a question or --eval")
+
+if __name__ == "__main__":
+    main()
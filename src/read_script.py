@@ -3,17 +3,45 @@ import chromadb
 client = chromadb.PersistentClient(path="./db")
 collection = client.get_collection(name="vector_db")
 from langchain.embeddings import HuggingFaceEmbeddings
-from sentence_transformers import SentenceTransformer
+from embedding_backend import load_embedder
+from reranker import CrossEncoderReranker, CANDIDATES, KEEP
+from structure_chunker import match_headings
+from query_router import QueryRouter
+import os
 
+RERANK = os.getenv("RERANK", "0") == "1"
+TITRE  = os.getenv("TITRE", "")      # e.g. "impot sur les societes": search that TITRE only
+ROUTE  = os.getenv("ROUTE", "0") == "1"   # pick the TITRE from the query (query_router.py)
 
-model = SentenceTransformer("louisbrulenaudet/lemone-gte-embed-max",trust_remote_code=True)
+
+model = load_embedder("louisbrulenaudet/lemone-gte-embed-max")
 
 
 query = input("Enter your query: ")
 
 query_vector = model.encode(query)
 
-results = collection.query(query_embeddings=query_vector, n_results=2 , include=["documents"])
+# Pre-filter on the page hierarchy written by write_script.py: the name is matched
+# against the stored TITRE labels and only their pages are scanned
+where = None
+if TITRE or ROUTE:
+    stored = [m.get("titre", "") for m in collection.get(include=["metadatas"])["metadatas"]]
+    if TITRE:
+        titres = match_headings(TITRE, stored)
+        if not titres:
+            raise SystemExit(f"No TITRE matches {TITRE!r}")
+    else:
+        # an unsure router returns no titres and the whole collection is searched
+        titres = QueryRouter(stored).route(query).titres
+    if titres:
+        where = {"titre": {"$in": titres}}
+
+results = collection.query(query_embeddings=query_vector, n_results=CANDIDATES if RERANK else 2 , include=["documents"],
+                           where=where)
+if RERANK:
+    reranker = CrossEncoderReranker()
+    results["documents"] = [[doc for _, doc, _ in reranker.rerank(query, docs, keep=KEEP)]
+                            for docs in results["documents"]]
 
 # Print results
 for result in results["documents"]:
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cross-encoder re-ranking of retrieved passages, with a persistent score cache.
+
+Retrieval casts a wide net (e.g. the top-30 Chroma hits); a small local
+cross-encoder then scores every (question, passage) pair jointly and only the
+best 1–2 passages are passed on to the LLM or the extractive QA model.
+
+Pair scores are stored in SQLite under sha1(model, question, passage), so
+re-running a question set only scores pairs that were never seen before.
+
+    reranker = CrossEncoderReranker()
+    best = reranker.rerank(question, hits, keep=2)      # [(index, passage, score)]
+
+Usage
+-----
+python reranker.py "Quel est le taux de l'impôt sur les sociétés ?" --db ./db --collection vector_db
+
+pip install sentence-transformers
+"""
+from __future__ import annotations
+import argparse, hashlib, sqlite3
+from pathlib import Path
+# ────────────────────────────────────────────────────────────────────────────
+MODEL_NAME = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"   # multilingual, French included
+CACHE_PATH = Path("rerank_cache.sqlite")
+CANDIDATES = 30          # passages retrieved before re-ranking
+KEEP       = 2           # passages kept after re-ranking
+BATCH_SIZE = 32
+MAX_LENGTH = 512
+# ────────────────────────────────────────────────────────────────────────────
+
+def pair_key(model_name: str, query: str, passage: str) -> str:
+    return hashlib.sha1("\0".join((model_name, query, passage)).encode("utf-8")).hexdigest()
+
+
+class ScoreCache:
+    """SQLite key → score store; lookups and inserts are done per batch."""
+
+    def __init__(self, path: Path | str = CACHE_PATH):
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, score REAL NOT NULL)")
+        self.hits = self.misses = 0
+
+    def get_many(self, keys: list[str]) -> dict[str, float]:
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        for start in range(0, len(unique), 500):          # stay under SQLite's variable limit
+            part = unique[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT key, score FROM scores WHERE key IN ({','.join('?' * len(part))})", part)
+            found.update(rows)
+        self.hits   += sum(k in found for k in keys)
+        self.misses += sum(k not in found for k in keys)
+        return found
+
+    def put_many(self, items: dict[str, float]) -> None:
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO scores VALUES (?, ?)", items.items())
+
+    def close(self):
+        self.conn.close()
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name: str = MODEL_NAME, cache_path: Path | str | None = CACHE_PATH,
+                 batch_size: int = BATCH_SIZE, max_length: int = MAX_LENGTH):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.cache = ScoreCache(cache_path) if cache_path else None
+        self._model = None
+
+    @property
+    def model(self):
+        # loaded on first cache miss: a fully cached run never touches torch
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+            self._model = CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+        return self._model
+
+    def score(self, query: str, passages: list[str]) -> list[float]:
+        """Relevance score of each passage for `query`, in input order."""
+        keys   = [pair_key(self.model_name, query, p) for p in passages]
+        scores = self.cache.get_many(keys) if self.cache else {}
+
+        # one model call per distinct uncached pair
+        missing = list({k: i for i, k in enumerate(keys) if k not in scores}.values())
+        if missing:
+            new = self.model.predict([(query, passages[i]) for i in missing],
+                                     batch_size=self.batch_size, show_progress_bar=False)
+            fresh = {keys[i]: float(s) for i, s in zip(missing, new)}
+            scores.update(fresh)
+            if self.cache:
+                self.cache.put_many(fresh)
+        return [scores[k] for k in keys]
+
+    def rerank(self, query: str, passages: list[str], keep: int = KEEP) -> list[tuple[int, str, float]]:
+        """The `keep` best passages as (original index, passage, score), best first."""
+        scores = self.score(query, passages)
+        first  = {p: i for i, p in reversed(list(enumerate(passages)))}     # drop repeated passages
+        order  = sorted(sorted(first.values()), key=lambda i: -scores[i])[:keep]
+        return [(i, passages[i], scores[i]) for i in order]
+
+    def close(self):
+        if self.cache:
+            self.cache.close()
+# ---------------------------------------------------------------------------
+
+def main():
+    import chromadb
+    from embedding_backend import load_embedder
+
+    ap = argparse.ArgumentParser(description="Retrieve a wide candidate pool and re-rank it")
+    ap.add_argument("query")
+    ap.add_argument("--db", default="./db")
+    ap.add_argument("--collection", default="vector_db")
+    ap.add_argument("--embedder", default="louisbrulenaudet/lemone-gte-embed-max")
+    ap.add_argument("--model", default=MODEL_NAME)
+    ap.add_argument("--candidates", type=int, default=CANDIDATES)
+    ap.add_argument("--keep", type=int, default=KEEP)
+    args = ap.parse_args()
+
+    collection = chromadb.PersistentClient(path=args.db).get_collection(name=args.collection)
+    q_vec = load_embedder(args.embedder).encode(args.query).tolist()
+    hits  = collection.query(query_embeddings=[q_vec], n_results=args.candidates,
+                             include=["documents"])["documents"][0]
+
+    reranker = CrossEncoderReranker(args.model)
+    for rank, (i, passage, score) in enumerate(reranker.rerank(args.query, hits, keep=args.keep), 1):
+        print(f"#{rank} (retrieval rank {i + 1}, score {score:.3f})\n{passage}\n")
+    print(f"cache: {reranker.cache.hits} hits, {reranker.cache.misses} misses")
+    reranker.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Split the articles of cgi_structure.json into retrieval chunks that never
+cross an article boundary.
+
+Inside an article the text is cut at its own enumeration levels, from the
+coarsest to the finest:
+
+    I.-  II.-      (roman paragraphs)
+    A.-  B-  C)    (lettered sub-paragraphs)
+    1°-  2°)       (numbered items)
+    a)   b)        (lettered items)
+    ; . :          (sentences, last resort)
+
+Consecutive pieces are then packed back together up to the token budget, and
+every chunk is prefixed with its TITRE > CHAPITRE > Article > paragraph path
+so it still makes sense on its own once retrieved.
+
+Usage
+-----
+python structure_chunker.py [cgi_structure.json] [chunks.json]
+"""
+from __future__ import annotations
+import json, re, sys, unicodedata
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterator
+# ────────────────────────────────────────────────────────────────────────────
+STRUCTURE_PATH = Path("cgi_structure.json")
+OUTPUT         = Path("chunks.json")
+MAX_TOKENS     = 256
+PATH_SEP       = " > "
+HIERARCHY      = ("titre", "chapitre", "article", "number")   # payload fields filters can use
+# ────────────────────────────────────────────────────────────────────────────
+MARKER = (r"[IVX]{1,5}\s?\.\s?-"                    # I.-  II. -
+          r"|[A-H]\s?(?:\.\s?-|-|\))"               # A.-  B-  C)
+          r"|\d{1,3}\s?°\s?[-)]?"                   # 1°-  2°)  3°
+          r"|[a-z]\)")                              # a)  b)
+MARKER_RX = re.compile(rf"^(?:{MARKER})(?=\s)")
+
+LEVELS = [
+    re.compile(r"(?<!\S)(?=[IVX]{1,5}\s?\.\s?-\s)"),
+    re.compile(r"(?<!\S)(?=[A-H]\s?(?:\.\s?-|-|\))\s)"),
+    re.compile(r"(?<!\S)(?=\d{1,3}\s?°\s?[-)]?\s)"),
+    re.compile(r"(?<!\S)(?=[a-z]\)\s)"),
+    re.compile(r"(?<=[.;:])\s+"),
+]
+
+TOKEN_RX   = re.compile(r"\w+|[^\w\s]")
+ARTICLE_RX = re.compile(
+    r"\barticle\s+(premier|\d+)"
+    r"(?:\s*(bis|ter|quater|quinquies|sexies|septies|octies|nonies|decies))?"
+    r"(?:\s*[-\s]\s*([A-Z])\b)?",
+    re.I,
+)
+# ---------------------------------------------------------------------------
+
+def count_words(text: str) -> int:
+    """Cheap token estimate: words and punctuation marks."""
+    return len(TOKEN_RX.findall(text))
+
+
+def clean_heading(label: str) -> str:
+    """Drop the empty and one-letter fragments the PDF heading joiner leaves."""
+    parts = [p.strip(" -–:") for p in label.split("–")]
+    return " – ".join(p for p in parts if len(p) > 1)
+
+
+def fold(text: str) -> str:
+    """Case-, accent- and spacing-insensitive form of a heading, for matching."""
+    text = unicodedata.normalize("NFKD", text)
+    return " ".join("".join(c for c in text if not unicodedata.combining(c)).lower().split())
+
+
+def match_headings(query: str, labels) -> list[str]:
+    """Labels containing `query`: "impot sur les societes" → ["TITRE III – IMPÔT SUR LES SOCIÉTÉS"]."""
+    query = fold(query)
+    return [label for label in dict.fromkeys(labels) if query in fold(label)]
+
+
+def article_number(label: str) -> str | None:
+    """'Article 9 bis – Produits…' → '9 bis', 'Article premier' → '1'."""
+    m = ARTICLE_RX.search(label)
+    if not m:
+        return None
+    num = "1" if m.group(1).lower() == "premier" else m.group(1)
+    suffix = " ".join(s for s in (m.group(2), m.group(3)) if s)
+    return f"{num} {suffix.lower() if m.group(2) else suffix}".strip()
+
+
+def iter_articles(structure: list) -> Iterator[dict]:
+    """Yield every article of cgi_structure.json with its hierarchy attached."""
+    ordinal = 0
+    for t in structure:
+        for c in t["chapitres"]:
+            for a in c["articles"]:
+                yield {
+                    "ordinal":  ordinal,
+                    "titre":    clean_heading(t["titre"]),
+                    "chapitre": clean_heading(c["chapitre"]),
+                    "id":       a["id"],
+                    "number":   article_number(a["id"]),
+                    "name":     a["name"],
+                    "content":  a["content"],
+                }
+                ordinal += 1
+# ---------------------------------------------------------------------------
+
+def _windows(text: str, budget: int, count: Callable[[str], int]) -> list[str]:
+    """Hard-split an unbreakable run of text into word windows of at most `budget`."""
+    words = text.split()
+    if count(text) <= budget or len(text) <= 1:
+        return [text]
+    if len(words) == 1:                             # "(A.L.E.M.)," at a tiny budget
+        half = len(text) // 2
+        return _windows(text[:half], budget, count) + _windows(text[half:], budget, count)
+    ratio = max(count(text) / len(words), 1e-6)
+    size  = min(max(int(budget / ratio), 1), len(words) - 1)
+    # the size is an estimate: windows still over budget are split again
+    return [w for i in range(0, len(words), size)
+            for w in _windows(" ".join(words[i:i + size]), budget, count)]
+
+
+def _split(text, context, level, room, floor, count):
+    """(context, piece) pairs whose piece fits `room(context)`, the budget left by its path."""
+    budget = room(context)
+    if count(text) <= budget:
+        return [(context, text)]
+    if level >= len(LEVELS):
+        return [(context, w) for w in _windows(text, budget, count)]
+
+    pieces = [p.strip() for p in LEVELS[level].split(text) if p.strip()]
+    if len(pieces) == 1:
+        return _split(text, context, level + 1, room, floor, count)
+
+    out = []
+    for piece in pieces:
+        m = MARKER_RX.match(piece)
+        if m and count(piece) > budget:            # its children need the label
+            labelled = context + (m.group(0).replace(" ", ""),)
+            # the label is repeated in every child's path: only while the body keeps `floor`
+            out.extend(_split(piece, labelled if room(labelled) >= floor else context,
+                              level + 1, room, floor, count))
+        else:
+            out.extend(_split(piece, context, level + 1, room, floor, count))
+    return out
+
+
+def _pack(pieces, room, count):
+    """Merge consecutive pieces while they fit under their shared path."""
+    packed = []
+    for context, text in pieces:
+        size = count(text)
+        if packed:
+            prev_ctx, prev_text, prev_size = packed[-1]
+            common = []
+            for a, b in zip(prev_ctx, context):
+                if a != b:
+                    break
+                common.append(a)
+            common = tuple(common)
+            if prev_size + size <= room(common):
+                packed[-1] = (common, f"{prev_text} {text}", prev_size + size)
+                continue
+        packed.append((context, text, size))
+    return [(context, text) for context, text, _ in packed]
+
+
+def chunk_article(article: dict, max_tokens: int = MAX_TOKENS,
+                  count: Callable[[str], int] = count_words) -> list[dict]:
+    """Split one article into prefixed chunks of at most `max_tokens`, path included."""
+    count = lru_cache(maxsize=4096)(count)          # pieces are measured twice
+    head = article["id"] if not article["name"] else f"{article['id']} – {article['name']}"
+    path = [p for p in (article["titre"], article["chapitre"], head) if p]
+    floor = max_tokens // 4
+    # a heading path leaving the body less than `floor` loses its outer levels
+    while len(path) > 1 and max_tokens - count(PATH_SEP.join(path)) < floor:
+        path = path[1:]
+    if max_tokens - count(path[0]) < floor:
+        path = [_windows(path[0], max_tokens - floor, count)[0]]
+
+    def room(context: tuple) -> int:
+        return max_tokens - count(PATH_SEP.join(path + list(context)))
+
+    content = " ".join(article["content"].split())
+    if not content:
+        return []
+
+    chunks = []
+    for i, (context, body) in enumerate(_pack(_split(content, (), 0, room, floor, count),
+                                              room, count)):
+        full_path = PATH_SEP.join(path + list(context))
+        chunks.append({
+            "id":          f"{article['ordinal']}:{article['number'] or article['id']}#{i}",
+            "titre":       article["titre"],
+            "chapitre":    article["chapitre"],
+            "article":     article["id"],
+            "number":      article["number"],
+            "chunk_index": i,
+            "path":        full_path,
+            "body":        body,
+            "text":        f"{full_path}\n{body}",
+        })
+    return chunks
+
+
+def chunk_structure(structure: list, max_tokens: int = MAX_TOKENS,
+                    count: Callable[[str], int] = count_words) -> list[dict]:
+    """Chunk every article of a cgi_structure.json tree."""
+    return [chunk
+            for article in iter_articles(structure)
+            for chunk in chunk_article(article, max_tokens, count)]
+# ---------------------------------------------------------------------------
+
+def main():
+    src = Path(sys.argv[1]) if len(sys.argv) > 1 else STRUCTURE_PATH
+    dst = Path(sys.argv[2]) if len(sys.argv) > 2 else OUTPUT
+    if not src.exists():
+        raise SystemExit(f"{src} not found – run articles_extractor_structured.py first.")
+
+    structure = json.loads(src.read_text(encoding="utf-8"))
+    chunks = chunk_structure(structure)
+    dst.write_text(json.dumps(chunks, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    sizes = sorted(count_words(c["text"]) for c in chunks)
+    summary = f" (median {sizes[len(sizes) // 2]} / max {sizes[-1]} words)" if sizes else ""
+    print(f"{len(chunks)} chunks{summary} → {dst.resolve()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+import json
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from structure_chunker import chunk_article, chunk_structure, count_words
+
+STRUCTURE = Path(__file__).resolve().parents[2] / "extracts" / "cgi_structure.json"
+
+def article(content, name="Produits imposables"):
+    return {"ordinal": 0, "titre": "TITRE PREMIER – L'IMPOT SUR LES SOCIETES",
+            "chapitre": "CHAPITRE II – BASE IMPOSABLE", "id": "Article 9", "number": "9",
+            "name": name, "content": content}
+
+def nested_content():
+    items = " ".join(f"{n}°- les produits de la catégorie {n} " + "montant imposable " * 12
+                     for n in range(1, 9))
+    return " ".join(f"{roman}.- Dispositions générales. A.- Premier cas : {items} B.- Second cas : {items}"
+                    for roman in ("I", "II", "III"))
+
+class TestChunkArticle(unittest.TestCase):
+
+    def test_chunks_fit_the_budget_with_their_path(self):
+        for max_tokens in (64, 128, 256):
+            chunks = chunk_article(article(nested_content()), max_tokens)
+            self.assertTrue(any(" > I.-" in chunk["path"] for chunk in chunks))      # labels are charged too
+            for chunk in chunks:
+                self.assertLessEqual(count_words(chunk["text"]), max_tokens)
+
+    def test_long_heading_path_keeps_room_for_the_body(self):
+        chunks = chunk_article(article(nested_content(), name="taxe " * 60), 64)
+        for chunk in chunks:
+            self.assertLessEqual(count_words(chunk["text"]), 64)
+        self.assertTrue(chunk["path"].startswith("Article 9"))
+
+    def test_no_text_is_lost(self):
+        content = nested_content()
+        bodies = " ".join(chunk["body"] for chunk in chunk_article(article(content), 64))
+        self.assertEqual(bodies.split(), content.split())
+
+    @unittest.skipUnless(STRUCTURE.exists(), "extracts/cgi_structure.json not available")
+    def test_code_chunks_fit_the_budget(self):
+        structure = json.loads(STRUCTURE.read_text(encoding="utf-8"))
+        for chunk in chunk_structure(structure, 256):
+            self.assertLessEqual(count_words(chunk["text"]), 256)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from text_structure_extractor import StructureBuilder
+
+def build(lines):
+    builder = StructureBuilder()
+    for line in ["TITRE IV", "DISPOSITIONS COMMUNES", "CHAPITRE PREMIER", "OBLIGATIONS DECLARATIVES", *lines]:
+        builder.feed(line)
+    return [a for t in builder.close() for c in t["chapitres"] for a in c["articles"]]
+
+class TestWrappedArticleHeading(unittest.TestCase):
+
+    def test_suffix_on_a_later_line_is_kept(self):
+        art, = build(["Article 150", "d'activité1052", "bis.-", "Déclaration", "de", "cessation", "temporaire",
+                      "Nonobstant toute disposition contraire, les entreprises peuvent souscrire une déclaration."])
+        self.assertEqual(art["id"], "Article 150 bis")
+        self.assertEqual(art["name"], "Déclaration de cessation temporaire d'activité")
+        self.assertTrue(art["content"].startswith("Nonobstant"))
+
+    def test_bare_article_without_suffix_keeps_its_body(self):
+        first, second = build(["Article 5", "Pour bénéficier des exonérations", "les personnes éligibles",
+                               "Article 6.- Suite", "texte."])
+        self.assertEqual((first["id"], first["name"]), ("Article 5", ""))
+        self.assertEqual(first["content"], "Pour bénéficier des exonérations les personnes éligibles")
+        self.assertEqual(second["id"], "Article 6")
+
+if __name__ == '__main__':
+    unittest.main()
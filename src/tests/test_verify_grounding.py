@@ -0,0 +1,54 @@
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from verify_grounding import ArticleIndex, verify
+
+CODE = {
+    "1": "Le présent code régit l'assiette, le recouvrement et les sanctions des impôts.",
+    "5": "Les sociétés de capitaux sont passibles de l'impôt sur les sociétés.",
+    "6": "Sont exonérées de l'impôt les associations à but non lucratif reconnues d'utilité publique.",
+    "7": "Les coopératives bénéficient d'une exonération permanente sous conditions.",
+}
+DECREE = ("Le ministre chargé des finances fixe par arrêté le modèle de la déclaration électronique "
+          "déposée auprès du receveur de l'administration fiscale.")
+
+def structure():
+    code = [{"id": f"Article {n}", "name": "", "content": text} for n, text in CODE.items()]
+    decree = [{"id": f"Article {n}", "name": "", "content": text}
+              for n, text in (("1", "Le présent décret est pris pour l'application du code."), ("6", DECREE))]
+    return [
+        {"titre": "TITRE PREMIER – L'IMPOT SUR LES SOCIETES", "chapitres": [{"chapitre": "CHAPITRE PREMIER", "articles": code}]},
+        {"titre": "ANNEXES", "chapitres": [{"chapitre": "Décret d'application", "articles": decree}]},
+    ]
+
+def answer(body, cited="Article 6"):
+    return {"question": "Q ?", "answer": f"Selon l'{cited} : {body} Références Utilisées : ({cited})"}
+
+class TestVerifyGrounding(unittest.TestCase):
+
+    def setUp(self):
+        self.index = ArticleIndex(structure())
+
+    def test_citation_resolves_to_the_code_article_only(self):
+        ordinals, missing = self.index.lookup(["6"])
+        self.assertEqual([self.index.articles[o]["content"] for o in ordinals], [CODE["6"]])
+        self.assertEqual(missing, [])
+
+    def test_answer_supported_only_by_decree_text_is_flagged(self):
+        verdict, = verify([answer(DECREE)], self.index)
+        self.assertIn("low_lexical", verdict["flags"])
+
+    def test_answer_supported_by_the_cited_article_passes(self):
+        verdict, = verify([answer(CODE["6"])], self.index)
+        self.assertEqual(verdict["flags"], [])
+
+    def test_uncited_and_unknown_articles_are_flagged(self):
+        no_citation, unknown = verify([{"question": "Q ?", "answer": "Selon l'Extrait de Contexte 1 : texte."},
+                                       answer(CODE["6"], cited="Article 99")], self.index)
+        self.assertEqual(no_citation["flags"], ["no_citation"])
+        self.assertIn("unknown_article", unknown["flags"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Extract the TITRE → CHAPITRE/Section → Article hierarchy from the plain-text
+dump of the code (CGI_FR_2025 (1)_compressed.txt) and dump it to
+cgi_structure.json, in the same shape as articles_extractor_structured.py.
+
+The PDF extractor recognises headings by their blue spans; here they are
+recognised by their typography, in one streaming pass over the lines:
+
+    TITRE II / Titre IV                 + upper-case (or wrapped) name lines
+    CHAPITRE PREMIER / Chapitre II      + name lines; PREAMBULE
+    Section I.- … / Paragraphe 2.- …    appended to the chapitre label
+    Article 9 bis.- Produits …          article id and name
+    ANNEXES …, DECRET N° …, ARRETE …    annexed texts (articles hold body text)
+
+Page numbers, amendment footnotes ("12 Article 8 de la loi de finances …")
+and the footnote markers glued to words ("gestionnaire1 ;") are dropped, and
+a suffix wrapped off its heading ("Article 150" … "bis.-") is put back.
+No layout analysis is needed: the 2025 dump parses in ~0.25 s, against ~2.8 s
+for the blue-span pass over the PDF.
+
+Known gaps against the PDF structure on the 2025 edition: "Article 234
+quinquies" is dropped (the dump lost its number: "Article" / "quinquies.-"),
+and the "ARTICLE 5" of the 2007 finance law in the preamble is not kept, as
+it comes before the first TITRE.
+
+Usage
+-----
+python text_structure_extractor.py ["CGI_FR_2025 (1)_compressed.txt"] [cgi_structure.json]
+"""
+from __future__ import annotations
+import json, re, sys, time
+from pathlib import Path
+from typing import Iterator
+# ────────────────────────────────────────────────────────────────────────────
+TEXT_PATH     = Path("CGI_FR_2025 (1)_compressed.txt")
+OUTPUT        = Path("cgi_structure.json")
+HEADING_LINES = 4          # name lines a heading may span
+# ────────────────────────────────────────────────────────────────────────────
+NUMERAL   = r"(?:PREMIER|UNIQUE|[IVX]+|\d+)"
+SUFFIX    = r"(?:bis|ter|quater|quinquies|sexies|septies|octies|nonies|decies)"
+SEPARATOR = r"(?:\.\s*-|-\s*\.|\.|-|–|:)"
+
+TITRE_RX   = re.compile(rf"^TITRE\s+{NUMERAL}\s*(?:{SEPARATOR}\s*(.*))?$", re.I)
+CHAP_RX    = re.compile(rf"^(?:CHAPITRE\s+{NUMERAL}|PREAMBULE)\s*(?:{SEPARATOR}\s*(.*))?$", re.I)
+SECTION_RX = re.compile(rf"^(SECTION|SOUS-SECTION|PARAGRAPHE)\s+{NUMERAL}\b", re.I)
+SKIP_RX    = re.compile(r"^(?:LIVRE\s+\w+|\w+\s+PARTIE)$", re.I)         # livres are not in the tree
+ANNEX_RX   = re.compile(r"^(?:ANNEXES AU CODE|TEXTES REGLEMENTAIRES)")
+ACT_RX     = re.compile(r"^(?:DISPOSITIONS FISCALES CONCERNANT|D[EÉ]CRET N|ARR[EÊ]T[EÉ] (?:DU|CONJOINT)|D[EÉ]CISION\b)")
+ARTICLE_RX = re.compile(rf"^(Article)\s+(premier|\d+)(?:\s*({SUFFIX}))?(?:\s*\d{{1,4}})?\s*(?:({SEPARATOR})\s*(.*))?$", re.I)
+SUFFIX_RX  = re.compile(rf"^({SUFFIX})\s*{SEPARATOR}\s*(.*)$")                 # "bis.-" wrapped off "Article 150"
+FOOTNOTE_RX = re.compile(r"^\d{0,4}\s*Articles?\s+(?:premier|\d+)[\w ]*?\s+(?:de la|des|du)\s+(?:lois?|décret|dahir)\b", re.I)
+MARKER_RX  = re.compile(r"(?<=[^\W\d_)])\d{1,4}(?=[\s;,.:)-]|$)")       # "gestionnaire1 ;", "(abrogé)251"
+NAME_MARKER_RX = re.compile(r"^\d{1,4}\s*-\s*")                          # "Article 42 ter.255- …"
+PAGE_RX    = re.compile(r"^\d{1,4}$")
+HEAD_MARKER_RX = re.compile(r"(?<=[A-Z])\s+(?!(?:19|20)\d\d$)\d{1,4}$")  # "LES REVENUS 1838", not years
+# upper-case lines of an annexed text that are not part of its title
+PREAMBLE_RX = re.compile(r"^(?:LE (?:PREMIER MINISTRE|CHEF DU GOUVERNEMENT|MINISTRE)|D[EÉ]CR[EÈ]TE|ARR[EÊ]TE)\b.*$|.*[,;:]$")
+
+SECTION_RANK = {"SECTION": 0, "SOUS-SECTION": 1, "PARAGRAPHE": 2}
+# ---------------------------------------------------------------------------
+
+def iter_lines(path: Path) -> Iterator[str]:
+    """Non-empty lines without page numbers or footnotes."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or PAGE_RX.match(line) or FOOTNOTE_RX.match(line):
+                continue
+            yield line
+
+
+def is_caps(line: str) -> bool:
+    return line.upper() == line and any(c.isalpha() for c in line)
+
+
+class StructureBuilder:
+    """State machine fed one line at a time; `structure` is the cgi_structure.json tree."""
+
+    def __init__(self):
+        self.structure = []
+        self.titre     = None
+        self.chapitre  = ""                 # CHAPITRE label, without sections
+        self.sections  = []                 # [(rank, label)]
+        self.heading   = None               # (level, marker, [parts]) while a heading is being read
+        self.article   = None               # {"id", "name", "content": [lines], "held", "name_lines"}
+        self.in_annex  = False
+        self.marker    = 0                  # last footnote marker seen; they are numbered in sequence
+
+    # -- tree ---------------------------------------------------------------
+    def chapitre_label(self) -> str:
+        return " – ".join([self.chapitre] * bool(self.chapitre) + [label for _, label in self.sections])
+
+    def flush_article(self):
+        art, self.article = self.article, None
+        if not (art and self.titre):                   # ignore orphan chunks
+            return
+        self.settle_name(art)
+        if not self.structure or self.structure[-1]["titre"] != self.titre:
+            self.structure.append({"titre": self.titre, "chapitres": []})
+        chapitres = self.structure[-1]["chapitres"]
+        label = self.chapitre_label()
+        if not chapitres or chapitres[-1]["chapitre"] != label:
+            chapitres.append({"chapitre": label, "articles": []})
+        chapitres[-1]["articles"].append({"id": art["id"], "name": art["name"],
+                                          "content": " ".join(art["content"]).strip()})
+
+    # -- headings -----------------------------------------------------------
+    def open_heading(self, level: str, line: str, marker: bool = True):
+        """`marker`: the line is a bare label ("TITRE II") and the name follows it."""
+        self.close_heading()
+        self.flush_article()                           # a heading ends the article before it
+        self.heading = (level, marker, [line])
+
+    def close_heading(self):
+        if not self.heading:
+            return
+        level, marker, parts = self.heading
+        self.heading = None
+        # name lines are one wrapped name: "TITRE VI – TAXE AERIENNE POUR … TOURISTIQUE"
+        label = f"{parts[0]} – {' '.join(parts[1:])}" if marker and len(parts) > 1 else " ".join(parts)
+        if level == "titre":
+            self.titre, self.chapitre, self.sections = label, "", []
+        elif level == "chapitre":
+            self.chapitre, self.sections = label, []
+
+    def continues_heading(self, line: str) -> bool:
+        level, _, parts = self.heading
+        if level == "section" or len(parts) >= HEADING_LINES or PREAMBLE_RX.match(line):
+            return False
+        if line[0].islower() or is_caps(line) or (len(parts) == 1 and len(line) < 90 and not line.endswith(".")):
+            parts.append(HEAD_MARKER_RX.sub("", line))
+            return True
+        return False
+
+    # -- wrapped article headings -------------------------------------------
+    # The dump sometimes breaks "Article 150 bis.- Déclaration de cessation
+    # temporaire d'activité" into "Article 150" / "d'activité" / "bis.-" /
+    # "Déclaration" / "de" / …: the lines after a bare "Article N" are held
+    # until a suffix line shows up (or HEADING_LINES pass without one).
+    def settle_name(self, art: dict):
+        """End the wrapped heading of `art`; held lines without a suffix were body text."""
+        if art["held"]:
+            art["content"] = art["held"] + art["content"]
+        if art["name_lines"] is not None:
+            art["name"] = " ".join(art["name_lines"] + art["tail"])
+        art["held"] = art["name_lines"] = None
+
+    def article_line(self, line: str):
+        art = self.article
+        if art["held"] is not None:
+            if m := SUFFIX_RX.match(line):
+                art["id"] += f" {m.group(1)}"
+                art["tail"], art["held"] = art["held"], None      # name words seen before the suffix
+                art["name_lines"] = [m.group(2)] if m.group(2) else []
+                return
+            art["held"].append(line)
+            if len(art["held"]) >= HEADING_LINES:
+                self.settle_name(art)
+            return
+        if art["name_lines"] is not None:
+            if len(line) < 40 and not line.endswith((".", ":", ";")):   # name wrapped a word or two per line
+                art["name_lines"].append(line)
+                return
+            self.settle_name(art)
+        art["content"].append(line)
+
+    # -- lines --------------------------------------------------------------
+    def strip_markers(self, line: str) -> str:
+        def drop(m):
+            self.marker = max(self.marker, int(m.group()))
+            return ""
+        return MARKER_RX.sub(drop, line)
+
+    def article_number(self, number: str, last: int) -> str:
+        """Cut the next footnote marker off a number it is glued to: "47277" → "47"."""
+        for step in range(1, 4):
+            ref = str(last + step)
+            if number.endswith(ref) and len(number) > len(ref):
+                self.marker = max(self.marker, last + step)
+                return number[:-len(ref)]
+        return number
+
+    def feed(self, line: str):
+        last = self.marker
+        line = self.strip_markers(line)
+        if m := ARTICLE_RX.match(line):
+            self.close_heading()
+            self.flush_article()
+            word, number, suffix, sep, rest = m.groups()
+            number = number if number.lower() == "premier" else self.article_number(number, last)
+            art_id = " ".join(filter(None, (word, number, suffix)))
+            rest = NAME_MARKER_RX.sub("", rest or "").strip()
+            # code articles have a name after ".-"; annexed texts start their body there
+            name, body = ("", rest) if self.in_annex or sep == ":" else (rest, "")
+            self.article = {"id": art_id, "name": name, "content": [body] if body else [],
+                            "held": [] if sep is None and not suffix and not self.in_annex else None,
+                            "name_lines": None, "tail": []}
+            return
+
+        if TITRE_RX.match(line):
+            self.open_heading("titre", line)
+        elif ANNEX_RX.match(line):
+            self.in_annex = True
+            self.open_heading("titre", line, marker=False)
+        elif CHAP_RX.match(line):
+            self.open_heading("chapitre", line)
+        elif self.in_annex and ACT_RX.match(line):
+            self.open_heading("chapitre", line, marker=False)
+        elif m := SECTION_RX.match(line):
+            self.close_heading()
+            self.flush_article()
+            rank = SECTION_RANK[m.group(1).upper()]
+            self.sections = [s for s in self.sections if s[0] < rank] + [(rank, line)]
+            self.heading = ("section", False, [line])
+        elif SKIP_RX.match(line):
+            self.open_heading("skip", line)
+        elif self.heading and self.continues_heading(line):
+            pass
+        else:
+            self.close_heading()
+            if self.article is not None:
+                self.article_line(line)
+
+    def close(self) -> list:
+        self.close_heading()
+        self.flush_article()
+        return self.structure
+
+
+def collect_structure(path: Path) -> list:
+    builder = StructureBuilder()
+    for line in iter_lines(path):
+        builder.feed(line)
+    return builder.close()
+# ---------------------------------------------------------------------------
+
+def main():
+    src = Path(sys.argv[1]) if len(sys.argv) > 1 else TEXT_PATH
+    dst = Path(sys.argv[2]) if len(sys.argv) > 2 else OUTPUT
+    if not src.exists():
+        raise SystemExit(f"{src} not found")
+    start = time.perf_counter()
+    data = collect_structure(src)
+    dst.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    n_articles = sum(len(c["articles"]) for t in data for c in t["chapitres"])
+    print(f"{len(data)} titres, {n_articles} articles in {time.perf_counter() - start:.2f}s "
+          f"→ {dst.resolve()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Check that generated answers are grounded in the CGI articles they cite.
+
+Answers of the fine-tuning dataset follow "Selon l'Article N : … Références
+Utilisées : (Article X, Article Y)". For every row the verifier parses the
+cited articles (evaluate_retrieval.gold_articles), looks them up in an
+index of the code's own articles in cgi_structure.json (annexed decrees
+restart their numbering and are left out), splits the answer body
+into sentences and scores each sentence against the text of the cited
+articles only:
+
+    lexical   share of the sentence's content words found in the cited articles
+    semantic  best cosine between the sentence and a chunk of the cited articles
+
+Both scores run over the whole dataset at once: lexical containment is a
+single np.isin over (row, token) keys, and the semantic score embeds every
+sentence and every cited chunk in one batch each, then takes masked maxima of
+blocked matrix products. No LLM is called.
+
+A row is flagged with any of
+
+    no_citation       no CGI article cited (context extracts only, or nothing)
+    unknown_article   a cited article number is not an article of the code
+    low_lexical       mean lexical score under --min-lexical
+    low_semantic      mean semantic score under --min-semantic
+    unsupported       a share of sentences above --max-unsupported scores under
+                      both sentence thresholds
+
+Usage
+-----
+python verify_grounding.py --dataset finetuning_dataset.json --report grounding_report.json
+python verify_grounding.py --dataset finetuning_dataset.json --filtered finetuning_dataset.grounded.json
+python verify_grounding.py --dataset finetuning_dataset.json --no-embeddings
+
+pip install numpy sentence-transformers
+"""
+from __future__ import annotations
+import argparse, json, re
+from bisect import bisect_left
+from pathlib import Path
+import numpy as np
+
+from evaluate_retrieval import base_number, gold_articles
+from structure_chunker import chunk_article, fold, iter_articles
+# ────────────────────────────────────────────────────────────────────────────
+STRUCTURE_PATH    = Path("cgi_structure.json")
+DATASET_PATH      = Path("finetuning_dataset.json")
+MODEL_NAME        = "louisbrulenaudet/lemone-gte-embed-max"
+CHUNK_TOKENS      = 128      # cited articles are compared chunk by chunk
+MIN_WORDS         = 4        # shorter sentences (list headers, "Oui.") are not scored
+MIN_LEXICAL       = 0.5      # row mean of sentence containment
+MIN_SEMANTIC      = 0.5      # row mean of sentence best-chunk cosine
+SENTENCE_LEXICAL  = 0.3      # a sentence under both of these is unsupported
+SENTENCE_SEMANTIC = 0.4
+MAX_UNSUPPORTED   = 0.34     # share of unsupported sentences a row may hold
+BLOCK             = 1024     # sentences per similarity block
+SUFFIXES          = ("bis", "ter", "quater", "quinquies", "sexies", "septies", "octies", "nonies", "decies")
+# ────────────────────────────────────────────────────────────────────────────
+PREFIX_RX   = re.compile(r"^\W*selon\s+l[’']?\s*[^:]{0,80}:\s*", re.I)
+REFS_RX     = re.compile(r"r[ée]f[ée]rences?\s+utilis[ée]es?\s*:.*$", re.I | re.S)
+CONTEXT_RX  = re.compile(r"extraits?\s+de\s+contexte", re.I)
+SENTENCE_RX = re.compile(r"(?<=[.;!?])\s+|\n+")
+WORD_RX     = re.compile(r"[a-z0-9]{3,}")
+STOPWORDS   = frozenset("""
+    les des une est sont pour par dans sur aux avec que qui ont son ses leur leurs cette ces ceux
+    celles elle elles ils pas plus sous tout tous toute toutes entre ainsi dont lors selon etre
+    peut peuvent doit doivent fait faire non ete avoir article articles cgi code general impots
+""".split())
+# ---------------------------------------------------------------------------
+
+def answer_sentences(answer: str) -> list[str]:
+    """Sentences of the answer body, without the "Selon l'Article N :" lead and the reference list."""
+    body = REFS_RX.sub("", PREFIX_RX.sub("", answer.strip(" `\n"), count=1))
+    return [s.strip(" *-•\t") for s in SENTENCE_RX.split(body)
+            if len(WORD_RX.findall(fold(s))) >= MIN_WORDS]
+
+
+def content_words(text: str) -> set[str]:
+    return {w for w in WORD_RX.findall(fold(text)) if w not in STOPWORDS}
+
+
+def code_articles(articles: list[dict]) -> list[dict]:
+    """The code's own articles: the longest run of increasing numbers in document order.
+
+    cgi_structure.json also holds the finance-law article instituting the code
+    and annexed decrees whose numbering restarts at 1, so "Article 6" alone
+    matches a dozen texts. The code's articles are the one sequence that
+    climbs through the whole document; the annexes only form short runs.
+    """
+    numbered = [a for a in articles if a["number"]]
+    keys = []
+    for a in numbered:
+        number, *suffix = base_number(a["number"]).split()
+        keys.append((int(number), SUFFIXES.index(suffix[0]) + 1 if suffix else 0))   # 9 < 9 bis < 9 ter
+    tails, tail_at, before = [], [], [-1] * len(keys)
+    for i, key in enumerate(keys):
+        j = bisect_left(tails, key)
+        before[i] = tail_at[j - 1] if j else -1
+        if j == len(tails):
+            tails.append(key)
+            tail_at.append(i)
+        else:
+            tails[j], tail_at[j] = key, i
+    run, i = [], tail_at[-1] if tail_at else -1
+    while i != -1:
+        run.append(numbered[i])
+        i = before[i]
+    return run[::-1]
+
+
+class ArticleIndex:
+    """The code's articles keyed by base number ("9 bis", "6 A" → "6")."""
+
+    def __init__(self, structure: list):
+        self.articles = list(iter_articles(structure))
+        self.by_number: dict[str, list[int]] = {}
+        for art in code_articles(self.articles):
+            self.by_number.setdefault(base_number(art["number"]), []).append(art["ordinal"])
+
+    def lookup(self, numbers: list[str]) -> tuple[list[int], list[str]]:
+        """(ordinals of the cited articles, numbers not found in the structure)."""
+        found, missing = [], []
+        for number in numbers:
+            ordinals = self.by_number.get(base_number(number) or number)
+            if ordinals:
+                found.extend(o for o in ordinals if o not in found)
+            else:
+                missing.append(number)
+        return found, missing
+# ---------------------------------------------------------------------------
+
+class Vocabulary(dict):
+    """Word → integer id, grown on demand."""
+
+    def ids(self, words) -> np.ndarray:
+        return np.fromiter((self.setdefault(w, len(self)) for w in words), dtype=np.int64)
+
+
+def lexical_scores(rows: list[dict], index: ArticleIndex) -> np.ndarray:
+    """Per sentence: share of its content words present in the row's cited articles."""
+    vocab = Vocabulary()
+    article_ids = {}
+    sent_keys, sent_of, art_keys = [], [], []
+    n_sentences = 0
+    for r, row in enumerate(rows):
+        for o in row["ordinals"]:
+            if o not in article_ids:
+                a = index.articles[o]
+                article_ids[o] = vocab.ids(content_words(f"{a['name']} {a['content']}"))
+        if row["ordinals"]:
+            art_keys.append(np.unique(np.concatenate([article_ids[o] for o in row["ordinals"]])))
+        for sentence in row["sentences"]:
+            ids = vocab.ids(content_words(sentence))
+            sent_keys.append(ids)
+            sent_of.append(np.full(len(ids), n_sentences))
+            n_sentences += 1
+    if not n_sentences:
+        return np.zeros(0)
+    # (row, word) pairs as one int64 key: a sentence word is supported if its row's articles hold it
+    width = max(len(vocab), 1)
+    row_of_sentence = np.repeat([r for r, row in enumerate(rows) for _ in row["sentences"]],
+                                [len(k) for k in sent_keys])
+    sent_keys = row_of_sentence * width + np.concatenate(sent_keys)
+    rows_with_articles = [r for r, row in enumerate(rows) if row["ordinals"]]
+    art_keys = (np.concatenate([r * width + k for r, k in zip(rows_with_articles, art_keys)])
+                if art_keys else np.zeros(0, dtype=np.int64))
+    sent_of = np.concatenate(sent_of)
+    hits  = np.bincount(sent_of, weights=np.isin(sent_keys, art_keys), minlength=n_sentences)
+    total = np.bincount(sent_of, minlength=n_sentences)
+    return np.divide(hits, total, out=np.zeros(n_sentences), where=total > 0)
+
+
+def semantic_scores(rows: list[dict], index: ArticleIndex, embedder, batch_size: int = 32) -> np.ndarray:
+    """Per sentence: best cosine with a chunk of the row's cited articles (-1 without articles)."""
+    sentences = [s for row in rows for s in row["sentences"]]
+    if not sentences:
+        return np.zeros(0)
+    cited = sorted({o for row in rows for o in row["ordinals"]})
+    chunks = [(o, c["text"]) for o in cited for c in chunk_article(index.articles[o], CHUNK_TOKENS)]
+    best = np.full(len(sentences), -1.0, dtype=np.float32)
+    if not chunks:
+        return best
+    column = {o: i for i, o in enumerate(cited)}
+    chunk_article_col = np.array([column[o] for o, _ in chunks])
+    # rows × cited articles, then sentences × chunks through the two index arrays
+    cites = np.zeros((len(rows), len(cited)), dtype=bool)
+    for r, row in enumerate(rows):
+        cites[r, [column[o] for o in row["ordinals"]]] = True
+    sentence_row = np.array([r for r, row in enumerate(rows) for _ in row["sentences"]])
+
+    S = np.asarray(embedder.encode(sentences, batch_size=batch_size, normalize_embeddings=True), dtype=np.float32)
+    C = np.asarray(embedder.encode([t for _, t in chunks], batch_size=batch_size, normalize_embeddings=True),
+                   dtype=np.float32)
+    for start in range(0, len(sentences), BLOCK):
+        stop    = min(start + BLOCK, len(sentences))
+        allowed = cites[sentence_row[start:stop]][:, chunk_article_col]
+        sims    = np.where(allowed, S[start:stop] @ C.T, -1.0)
+        best[start:stop] = sims.max(axis=1)
+    return best
+# ---------------------------------------------------------------------------
+
+def verify(items: list[dict], index: ArticleIndex, embedder=None,
+           min_lexical: float = MIN_LEXICAL, min_semantic: float = MIN_SEMANTIC,
+           max_unsupported: float = MAX_UNSUPPORTED) -> list[dict]:
+    """One verdict per dataset row: citations, scores and flags (empty flags: grounded)."""
+    rows = []
+    for item in items:
+        answer = item.get("answer") or ""
+        numbers = gold_articles(answer)
+        ordinals, missing = index.lookup(numbers)
+        rows.append({"cited": numbers, "missing": missing, "ordinals": ordinals,
+                     "contexts": bool(CONTEXT_RX.search(answer)),
+                     "sentences": answer_sentences(answer) if ordinals else []})
+
+    lexical  = lexical_scores(rows, index)
+    semantic = semantic_scores(rows, index, embedder) if embedder is not None else None
+    verdicts, start = [], 0
+    for i, (item, row) in enumerate(zip(items, rows)):
+        stop = start + len(row["sentences"])
+        flags = []
+        if not row["cited"]:
+            flags.append("no_citation")
+        if row["missing"]:
+            flags.append("unknown_article")
+        verdict = {"index": i, "question": item.get("question"), "cited": row["cited"],
+                   "missing": row["missing"], "contexts": row["contexts"],
+                   "sentences": len(row["sentences"]), "lexical": None, "semantic": None}
+        if stop > start:
+            lex = lexical[start:stop]
+            verdict["lexical"] = round(float(lex.mean()), 3)
+            if lex.mean() < min_lexical:
+                flags.append("low_lexical")
+            weak = lex < SENTENCE_LEXICAL
+            if semantic is not None:
+                sem = semantic[start:stop]
+                verdict["semantic"] = round(float(sem.mean()), 3)
+                if sem.mean() < min_semantic:
+                    flags.append("low_semantic")
+                weak &= sem < SENTENCE_SEMANTIC
+            if weak.mean() > max_unsupported:
+                flags.append("unsupported")
+        verdict["flags"] = flags
+        verdicts.append(verdict)
+        start = stop
+    return verdicts
+
+
+def summarize(verdicts: list[dict]) -> dict:
+    flags: dict[str, int] = {}
+    for v in verdicts:
+        for f in v["flags"]:
+            flags[f] = flags.get(f, 0) + 1
+    return {"rows": len(verdicts), "grounded": sum(not v["flags"] for v in verdicts), "flags": flags}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Flag dataset answers not grounded in the articles they cite")
+    ap.add_argument("--dataset", type=Path, default=DATASET_PATH)
+    ap.add_argument("--structure", type=Path, default=STRUCTURE_PATH)
+    ap.add_argument("--model", default=MODEL_NAME)
+    ap.add_argument("--no-embeddings", action="store_true", help="lexical checks only")
+    ap.add_argument("--min-lexical", type=float, default=MIN_LEXICAL)
+    ap.add_argument("--min-semantic", type=float, default=MIN_SEMANTIC)
+    ap.add_argument("--max-unsupported", type=float, default=MAX_UNSUPPORTED)
+    ap.add_argument("--report", type=Path, help="write every verdict as JSON")
+    ap.add_argument("--filtered", type=Path, help="write the grounded rows as a dataset")
+    args = ap.parse_args()
+
+    if not args.structure.exists():
+        raise SystemExit(f"{args.structure} not found – run articles_extractor_structured.py first.")
+    index = ArticleIndex(json.loads(args.structure.read_text(encoding="utf-8")))
+    items = json.loads(args.dataset.read_text(encoding="utf-8"))["questions"]
+    embedder = None
+    if not args.no_embeddings:
+        from embedding_backend import load_embedder
+        embedder = load_embedder(args.model)
+
+    verdicts = verify(items, index, embedder, args.min_lexical, args.min_semantic, args.max_unsupported)
+    for v in verdicts:
+        if v["flags"]:
+            print(f"  #{v['index']:<5} {','.join(v['flags']):<32} {(v['question'] or '')[:70]}")
+    summary = summarize(verdicts)
+    print(json.dumps(summary, indent=2))
+
+    if args.report:
+        args.report.write_text(json.dumps({"summary": summary, "rows": verdicts},
+                                          ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.filtered:
+        kept = [item for item, v in zip(items, verdicts) if not v["flags"]]
+        args.filtered.write_text(json.dumps({"questions": kept}, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"✅ {len(kept)}/{len(items)} rows → {args.filtered}")
+
+if __name__ == "__main__":
+    main()
@@ -1,41 +1,200 @@
 import os
+import queue
+import threading
+from collections import Counter
 import PyPDF2
 import chromadb
-from sentence_transformers import SentenceTransformer
+
+from embedding_backend import load_embedder
+from embedding_pool import EmbeddingPool
+from near_dedup import NearDuplicateIndex
+from structure_chunker import clean_heading
+from text_structure_extractor import FOOTNOTE_RX, PAGE_RX, StructureBuilder
+
+INPUT_DIR       = "./input"
+DB_PATH         = "./db"
+COLLECTION_NAME = "vector_db"
+MODEL_NAME      = "louisbrulenaudet/lemone-gte-embed-max"
+OVERLAP         = 100
+ENCODE_BATCH    = 32     # pages per model.encode call
+UPSERT_BATCH    = 256    # pages per collection.upsert call
+READERS         = 4      # PDFs read concurrently
+WORKERS         = int(os.getenv("EMBEDDING_WORKERS", "1"))   # >1: encode in a process pool
+QUEUE_SIZE      = 4 * ENCODE_BATCH * WORKERS
+DEDUP           = os.getenv("DEDUP", "1") == "1"                  # index one copy of near-duplicate pages
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.9"))     # MinHash similarity of a copy
+
+_DONE = object()
 
 def pdf_pages_with_overlap(file_path, overlap=100):
-    reader = PyPDF2.PdfReader(open(file_path, 'rb'))
-    prev_tail = ""
-    for i, page in enumerate(reader.pages):
-        text = page.extract_text() or ""
-        # prepend last `overlap` chars of previous page
-        if i > 0:
-            text = prev_tail + text
-        # remember this page’s tail for next iteration
-        prev_tail = text[-overlap:]
-        yield i, text
-
-# load your embedder
-model = SentenceTransformer("louisbrulenaudet/lemone-gte-embed-max", trust_remote_code=True)
-
-# init Chroma
-client     = chromadb.PersistentClient(path="./db")
-collection = client.create_collection(name="vector_db")
-
-for filename in os.listdir('./input'):
-    if not filename.lower().endswith('.pdf'):
-        continue
-
-    docs, embs, ids = [], [], []
-    for page_num, page_text in pdf_pages_with_overlap(os.path.join('./input', filename), overlap=100):
-        vec = model.encode(page_text)
-        docs.append(page_text)
-        embs.append(vec)
-        ids.append(f"{filename}#page{page_num}")
-    print(f"Page_num {page_num}")
-
-    collection.add(
-        embeddings=embs,
-        documents=docs,
-        ids=ids
-    )
+    with open(file_path, 'rb') as f:
+        reader = PyPDF2.PdfReader(f)
+        prev_tail = ""
+        for i, page in enumerate(reader.pages):
+            page_text = page.extract_text() or ""
+            # prepend last `overlap` chars of previous page
+            text = prev_tail + page_text if i > 0 else page_text
+            # remember this page’s tail for next iteration
+            prev_tail = text[-overlap:]
+            yield i, text, page_text
+
+def page_hierarchy(builder, text):
+    """Feed one page to the structure builder; return the TITRE / CHAPITRE most
+    of its lines sit under and the articles it holds text of, as Chroma metadata."""
+    under, seen = Counter(), []
+    if builder.article:
+        seen.append(builder.article)                    # continued from the previous page
+    for line in text.splitlines():
+        line = line.strip()
+        if not line or PAGE_RX.match(line) or FOOTNOTE_RX.match(line):
+            continue
+        builder.feed(line)
+        if builder.article and not any(builder.article is art for art in seen):
+            seen.append(builder.article)
+        under[(builder.titre, builder.chapitre_label())] += 1
+    builder.structure.clear()                          # only the running state is needed
+    # ids are read last: a suffix wrapped onto a later line ("bis.-") is added to the id then
+    articles = list(dict.fromkeys(art["id"] for art in seen))
+    (titre, chapitre), _ = under.most_common(1)[0] if under else ((builder.titre, ""), 0)
+    # Chroma metadata values are scalars, lists comma-separated. upsert merges metadata:
+    # an empty field is None, which removes the value an earlier run stored for the page
+    meta = {"titre": clean_heading(titre or ""), "chapitre": clean_heading(chapitre),
+            "articles": ",".join(articles)}
+    return {key: value or None for key, value in meta.items()}
+
+def read_pdfs(filenames, queues):
+    """Reader thread: feed (id, text, metadata) for each PDF it owns into that file's queue."""
+    for filename in filenames:
+        pages = queues[filename]
+        try:
+            n_pages = 0
+            builder = StructureBuilder()          # TITRE / CHAPITRE / Article state across pages
+            for page_num, text, page_text in pdf_pages_with_overlap(os.path.join(INPUT_DIR, filename),
+                                                                    overlap=OVERLAP):
+                meta = {"source": filename, "page": page_num, **page_hierarchy(builder, page_text)}
+                pages.put((f"{filename}#page{page_num}", text, meta))
+                n_pages += 1
+            print(f"{filename}: read {n_pages} pages")
+        except Exception as e:
+            pages.put(e)
+            return
+        finally:
+            pages.put(_DONE)
+
+def in_page_order(queues, filenames):
+    """Yield pages in (filename, page) order, so near-duplicate suppression always keeps the same copy.
+
+    Every file has its own bounded queue and the queues are drained in file
+    order: a reader ahead of the consumer blocks on its file's queue instead
+    of being buffered, so at most one queue per reader is ever full."""
+    for filename in filenames:
+        pages = queues[filename]
+        while True:
+            item = pages.get()
+            if item is _DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+def iter_batches(queues, filenames, size):
+    """Group queued pages, in page order, into lists of `size`."""
+    batch = []
+    for item in in_page_order(queues, filenames):
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def clear_stale_duplicates(collection, dedup):
+    """Remove pages suppressed in this run and back-references a page no longer holds,
+    so re-runs converge on the same collection."""
+    suppressed = [page_id for copies in dedup.duplicates.values() for page_id in copies] if dedup else []
+    for i in range(0, len(suppressed), UPSERT_BATCH):
+        collection.delete(ids=suppressed[i:i + UPSERT_BATCH])
+    canonical = set(dedup.duplicates) if dedup else set()
+    stale = [page_id for page_id in collection.get(where={"duplicate_count": {"$gt": 0}}, include=[])["ids"]
+             if page_id not in canonical]
+    for i in range(0, len(stale), UPSERT_BATCH):
+        batch_ids = stale[i:i + UPSERT_BATCH]
+        # upsert merges metadata; None removes a key
+        collection.update(ids=batch_ids, metadatas=[{"duplicates": None, "duplicate_count": None}] * len(batch_ids))
+
+def main():
+    filenames = sorted(f for f in os.listdir(INPUT_DIR) if f.lower().endswith('.pdf'))
+    if not filenames:
+        print(f"No PDF found in {INPUT_DIR}")
+        return
+
+    # load your embedder; a pool gets one batch per worker per encode call
+    if WORKERS > 1:
+        model = EmbeddingPool(MODEL_NAME, workers=WORKERS, batch_size=ENCODE_BATCH)
+    else:
+        model = load_embedder(MODEL_NAME)
+
+    # init Chroma; upserting on stable ids makes re-runs overwrite instead of failing
+    client     = chromadb.PersistentClient(path=DB_PATH)
+    collection = client.get_or_create_collection(name=COLLECTION_NAME)
+
+    # Bounded per-file queues keep memory flat: readers block while the encoder is busy
+    # or while earlier files are still being drained
+    queues = {filename: queue.Queue(maxsize=QUEUE_SIZE) for filename in filenames}
+    n_readers = min(READERS, len(filenames))
+    readers = [
+        threading.Thread(target=read_pdfs, args=(filenames[i::n_readers], queues), daemon=True)
+        for i in range(n_readers)
+    ]
+    for reader in readers:
+        reader.start()
+
+    # Near-duplicate pages are not embedded; their ids are attached to the indexed copy
+    dedup = NearDuplicateIndex(threshold=DEDUP_THRESHOLD) if DEDUP else None
+    indexed_metas = {}
+
+    ids, docs, embs, metas = [], [], [], []
+    total = 0
+    for batch in iter_batches(queues, filenames, ENCODE_BATCH * WORKERS):
+        if dedup:
+            batch = [item for item in batch if dedup.add(item[1], item[0]) is None]
+            indexed_metas.update((page_id, meta) for page_id, _, meta in batch)
+            if not batch:
+                continue
+        batch_ids, batch_docs, batch_metas = zip(*batch)
+        vecs = model.encode(list(batch_docs), batch_size=ENCODE_BATCH)
+        ids.extend(batch_ids)
+        docs.extend(batch_docs)
+        embs.extend(vec.tolist() for vec in vecs)
+        metas.extend(batch_metas)
+
+        if len(ids) >= UPSERT_BATCH:
+            collection.upsert(ids=ids, embeddings=embs, documents=docs, metadatas=metas)
+            total += len(ids)
+            ids, docs, embs, metas = [], [], [], []
+
+    if ids:
+        collection.upsert(ids=ids, embeddings=embs, documents=docs, metadatas=metas)
+        total += len(ids)
+
+    clear_stale_duplicates(collection, dedup)
+    # Chroma metadata values are scalars, so back-references are a comma-separated id list
+    if dedup and dedup.duplicates:
+        canonical = list(dedup.duplicates)
+        for i in range(0, len(canonical), UPSERT_BATCH):
+            batch_ids = canonical[i:i + UPSERT_BATCH]
+            collection.update(ids=batch_ids, metadatas=[
+                {**indexed_metas[page_id], "duplicates": ",".join(dedup.duplicates[page_id]),
+                 "duplicate_count": len(dedup.duplicates[page_id])}
+                for page_id in batch_ids
+            ])
+
+    for reader in readers:
+        reader.join()
+    if WORKERS > 1:
+        model.close()
+    skipped = f" ({dedup.suppressed} near-duplicate pages referenced, not embedded)" if dedup else ""
+    print(f"Upserted {total} pages from {len(filenames)} PDFs into '{COLLECTION_NAME}'{skipped}")
+
+if __name__ == "__main__":
+    main()